@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Final, Iterable, List, Optional, Sequence, Sized, Tuple, Type
+
+import numpy as np
+
+from app.data_storage.term_statistics_store import hash_term
+from app.data_storage.versioned_directory import VersionedDirectory
+
+
+@dataclass(frozen=True)
+class ArticleTerms:
+    """The terms of an article ranked by descending order of their TF-IDFs, along with their TFs and TF-IDFs."""
+
+    terms: List[str]
+    tfs: np.ndarray
+    tf_idfs: np.ndarray
+
+
+class ArticleTermIndex:
+    """A compact and memory-mapped index of the ranked terms of each corpus article by its normalized URL.
+
+    The articles are kept as a hashed URL table (like the term statistics store): a sorted array of 64-bit URL hashes
+    with aligned offsets into a blob of the URLs (used to verify the hash matches) and into the columns of the ranked
+    terms of all the articles, i.e., term IDs into a vocabulary of terms, TFs and TF-IDFs.
+    The TF-IDFs are calculated by the statistics of the given version, and the TFs are kept to rescore the terms once
+    the statistics change.
+    """
+
+    URL_HASHES_FILE_NAME: Final[str] = "url_hashes.npy"
+    URL_OFFSETS_FILE_NAME: Final[str] = "url_offsets.npy"
+    URLS_FILE_NAME: Final[str] = "urls.bin"
+    ENTRY_OFFSETS_FILE_NAME: Final[str] = "entry_offsets.npy"
+    TERM_IDS_FILE_NAME: Final[str] = "term_ids.npy"
+    TFS_FILE_NAME: Final[str] = "tfs.npy"
+    TF_IDFS_FILE_NAME: Final[str] = "tf_idfs.npy"
+    TERM_OFFSETS_FILE_NAME: Final[str] = "term_offsets.npy"
+    TERMS_FILE_NAME: Final[str] = "terms.bin"
+    METADATA_FILE_NAME: Final[str] = "metadata.json"
+
+    def __init__(self: ArticleTermIndex, directory: Path) -> None:
+        """
+        Args:
+            directory (Path): Path to the directory of an already built index.
+        """
+        self._directory = directory
+
+        with open(directory / self.METADATA_FILE_NAME) as metadata_file:
+            self._metadata = json.load(metadata_file)
+
+        self._url_hashes = np.load(directory / self.URL_HASHES_FILE_NAME, mmap_mode="r")
+        self._url_offsets = np.load(directory / self.URL_OFFSETS_FILE_NAME, mmap_mode="r")
+        self._urls = self._load_blob(directory / self.URLS_FILE_NAME, self._url_offsets)
+        self._entry_offsets = np.load(directory / self.ENTRY_OFFSETS_FILE_NAME, mmap_mode="r")
+        self._term_ids = np.load(directory / self.TERM_IDS_FILE_NAME, mmap_mode="r")
+        self._tfs = np.load(directory / self.TFS_FILE_NAME, mmap_mode="r")
+        self._tf_idfs = np.load(directory / self.TF_IDFS_FILE_NAME, mmap_mode="r")
+        self._term_offsets = np.load(directory / self.TERM_OFFSETS_FILE_NAME, mmap_mode="r")
+        self._terms = self._load_blob(directory / self.TERMS_FILE_NAME, self._term_offsets)
+
+    @property
+    def version(self: ArticleTermIndex) -> str:
+        """The unique version of the index."""
+        return self._metadata["version"]
+
+    @property
+    def statistics_version(self: ArticleTermIndex) -> str:
+        """The version of the statistics the TF-IDFs are calculated by."""
+        return self._metadata["statistics_version"]
+
+    @property
+    def article_count(self: ArticleTermIndex) -> int:
+        return len(self._url_hashes)
+
+    @classmethod
+    def exists(cls: Type[ArticleTermIndex], directory: Path) -> bool:
+        return cls.read_version(directory) is not None
+
+    @classmethod
+    def read_version(cls: Type[ArticleTermIndex], directory: Path) -> Optional[str]:
+        """Read the current version of the index in the given directory, or None if it's not built yet."""
+        return VersionedDirectory(directory).read_version()
+
+    @classmethod
+    def open(cls: Type[ArticleTermIndex], directory: Path) -> ArticleTermIndex:
+        """Open the current version of the index in the given directory.
+
+        Raises:
+            FileNotFoundError: If the index is not built yet.
+        """
+        return VersionedDirectory(directory).open(cls)[1]
+
+    @classmethod
+    def build(
+        cls: Type[ArticleTermIndex],
+        directory: Path,
+        articles: Iterable[Tuple[str, ArticleTerms]],
+        statistics_version: str,
+    ) -> ArticleTermIndex:
+        """Build an index of the given ranked terms of articles and write it into the given directory.
+
+        The index is published as a new version of the directory, so a concurrent reader never sees a partially
+        written index. Only the first article of a URL is indexed.
+
+        Args:
+            directory (Path): Path to the versioned directory in which the index is to be written.
+            articles (Iterable[Tuple[str, ArticleTerms]]): The normalized URL and the ranked terms of each article.
+            statistics_version (str): The version of the statistics the TF-IDFs are calculated by.
+
+        Returns:
+            ArticleTermIndex: The built index.
+        """
+        term_ids: Dict[str, int] = {}
+        articles_by_url: Dict[bytes, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        for url, article_terms in articles:
+            encoded_url = url.encode("utf-8")
+            if encoded_url in articles_by_url:
+                continue
+            articles_by_url[encoded_url] = (
+                np.fromiter(
+                    (term_ids.setdefault(term, len(term_ids)) for term in article_terms.terms),
+                    dtype=np.int32,
+                    count=len(article_terms.terms),
+                ),
+                np.asarray(article_terms.tfs, dtype=np.int32),
+                np.asarray(article_terms.tf_idfs, dtype=np.float32),
+            )
+
+        encoded_urls = list(articles_by_url)
+        url_hashes = np.fromiter((hash_term(url) for url in encoded_urls), dtype=np.uint64, count=len(encoded_urls))
+        order = np.argsort(url_hashes, kind="stable")
+        sorted_urls = [encoded_urls[i] for i in order]
+        sorted_articles = [articles_by_url[url] for url in sorted_urls]
+
+        versioned_directory = VersionedDirectory(directory)
+        with versioned_directory.publish() as (version, version_directory):
+            encoded_terms = [term.encode("utf-8") for term in term_ids]
+            article_term_ids = [ids for ids, _, _ in sorted_articles]
+            np.save(version_directory / cls.URL_HASHES_FILE_NAME, url_hashes[order])
+            np.save(version_directory / cls.URL_OFFSETS_FILE_NAME, get_offsets(sorted_urls))
+            np.save(version_directory / cls.ENTRY_OFFSETS_FILE_NAME, get_offsets(article_term_ids))
+            np.save(version_directory / cls.TERM_IDS_FILE_NAME, concatenate(article_term_ids, np.int32))
+            np.save(
+                version_directory / cls.TFS_FILE_NAME, concatenate([tfs for _, tfs, _ in sorted_articles], np.int32)
+            )
+            np.save(
+                version_directory / cls.TF_IDFS_FILE_NAME,
+                concatenate([tf_idfs for _, _, tf_idfs in sorted_articles], np.float32),
+            )
+            np.save(version_directory / cls.TERM_OFFSETS_FILE_NAME, get_offsets(encoded_terms))
+            with open(version_directory / cls.URLS_FILE_NAME, "wb") as urls_file:
+                urls_file.write(b"".join(sorted_urls))
+            with open(version_directory / cls.TERMS_FILE_NAME, "wb") as terms_file:
+                terms_file.write(b"".join(encoded_terms))
+            with open(version_directory / cls.METADATA_FILE_NAME, "w") as metadata_file:
+                json.dump(
+                    {
+                        "version": version,
+                        "statistics_version": statistics_version,
+                        "article_count": len(sorted_urls),
+                        "term_count": len(encoded_terms),
+                    },
+                    metadata_file,
+                )
+
+        return cls(versioned_directory.get_version_directory(version))
+
+    def contains(self: ArticleTermIndex, url: str) -> bool:
+        """Check whether the article with the given normalized URL is in the index."""
+        return self.lookup(url, 0) is not None
+
+    def lookup(self: ArticleTermIndex, url: str, limit: Optional[int] = None) -> Optional[ArticleTerms]:
+        """Get the ranked terms of the article with the given normalized URL.
+
+        Args:
+            url (str): The normalized URL of the article.
+            limit (Optional[int]): Maximum number of terms to be returned. All the terms are returned, if not given.
+
+        Returns:
+            Optional[ArticleTerms]: The ranked terms, or None if the article is not in the index.
+        """
+        encoded_url = url.encode("utf-8")
+        url_hash = hash_term(encoded_url)
+        position = int(np.searchsorted(self._url_hashes, np.uint64(url_hash)))
+
+        # Verify the hash matches against the stored URLs, so a hash collision never returns another article.
+        while position < len(self._url_hashes) and self._url_hashes[position] == url_hash:
+            if self._get_blob_item(self._urls, self._url_offsets, position) == encoded_url:
+                start, end = int(self._entry_offsets[position]), int(self._entry_offsets[position + 1])
+                if limit is not None:
+                    end = min(end, start + limit)
+
+                terms = [
+                    self._get_blob_item(self._terms, self._term_offsets, term_id).decode("utf-8")
+                    for term_id in self._term_ids[start:end].tolist()
+                ]
+                return ArticleTerms(
+                    terms,
+                    np.asarray(self._tfs[start:end], dtype=np.int64),
+                    np.asarray(self._tf_idfs[start:end], dtype=np.float64),
+                )
+            position += 1
+
+        return None
+
+    @staticmethod
+    def _load_blob(file_path: Path, offsets: np.ndarray) -> np.ndarray:
+        # An empty file can't be memory-mapped.
+        return np.memmap(file_path, dtype=np.uint8, mode="r") if offsets[-1] else np.zeros(0, dtype=np.uint8)
+
+    @staticmethod
+    def _get_blob_item(blob: np.ndarray, offsets: np.ndarray, position: int) -> bytes:
+        start, end = offsets[position], offsets[position + 1]
+        return bytes(blob[start:end])
+
+
+def get_offsets(items: Sequence[Sized]) -> np.ndarray:
+    """Get the offsets of the given items (e.g., encoded strings or arrays) once they're concatenated."""
+    offsets = np.zeros(len(items) + 1, dtype=np.int64)
+    np.cumsum(np.fromiter((len(item) for item in items), dtype=np.int64, count=len(items)), out=offsets[1:])
+
+    return offsets
+
+
+def concatenate(arrays: List[np.ndarray], dtype: type) -> np.ndarray:
+    return np.concatenate(arrays).astype(dtype, copy=False) if arrays else np.zeros(0, dtype=dtype)
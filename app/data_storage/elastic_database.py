@@ -1,11 +1,14 @@
 from __future__ import annotations
 
 import os
-from collections import deque
-from typing import List, Optional, Any, Dict
+from typing import TYPE_CHECKING, List, Optional, Any, Dict, Iterable, Iterator, Tuple
 
-from elastic_transport import ObjectApiResponse
-from elasticsearch import Elasticsearch, helpers
+from app.utility.metrics import Metrics
+
+# The Elastic client is imported once it's created (e.g., at the API startup), so it's not loaded by the API import.
+if TYPE_CHECKING:
+    from elastic_transport import ObjectApiResponse
+    from elasticsearch import Elasticsearch
 
 
 class ElasticDatabase:
@@ -14,6 +17,8 @@ class ElasticDatabase:
     @classmethod
     def get_client(cls: Any[Elasticsearch]) -> Elasticsearch:
         if not cls._client:
+            from elasticsearch import Elasticsearch
+
             cls._client = Elasticsearch(
                 os.getenv("ELASTICSEARCH_HOST", f"{os.getenv('ES_HOST')}:{os.getenv('ES_PORT')}"),
                 basic_auth=(str(os.getenv("ELASTIC_USERNAME")), str(os.getenv("ELASTIC_PASSWORD"))),
@@ -37,8 +42,18 @@ class ElasticDatabase:
         return cls.get_client().indices.exists(index=index)
 
     @classmethod
-    def insert_bulk(cls: Any[Elasticsearch], index: str, documents: List[dict]) -> deque:
-        return deque(helpers.parallel_bulk(client=cls.get_client(), actions=documents, index=index))
+    def insert_bulk(
+        cls: Any[Elasticsearch], index: str, actions: Iterable[dict], chunk_size: int = 500, thread_count: int = 4
+    ) -> Iterator[Tuple[bool, Any]]:
+        """Insert documents by parallel bulk requests lazily, as the returned results are consumed.
+
+        The actions are consumed lazily too, and only a bounded number of chunks are in flight at a time.
+        """
+        from elasticsearch import helpers
+
+        return helpers.parallel_bulk(
+            client=cls.get_client(), actions=actions, index=index, chunk_size=chunk_size, thread_count=thread_count
+        )
 
     @classmethod
     def insert_one(cls: Any[Elasticsearch], index: str, document: dict) -> ObjectApiResponse[Any]:
@@ -46,10 +61,12 @@ class ElasticDatabase:
 
     @classmethod
     def search(cls: Any[Elasticsearch], index: str, body: dict) -> ObjectApiResponse[Any]:
+        cls.count_call("search")
         return cls.get_client().search(index=index, body=body)
 
     @classmethod
     def multi_search(cls: Any[Elasticsearch], index: str, queries: List[Dict[Any, Any]]) -> ObjectApiResponse[Any]:
+        cls.count_call("multi_search")
         return cls.get_client().msearch(
             searches=queries, index=index, search_type="dfs_query_then_fetch", rest_total_hits_as_int=True
         )
@@ -64,6 +81,7 @@ class ElasticDatabase:
         field_statistics: bool = False,
         positions: bool = False,
     ) -> ObjectApiResponse[Any]:
+        cls.count_call("term_vectors")
         return cls.get_client().termvectors(
             index=index,
             doc=doc,
@@ -81,6 +99,29 @@ class ElasticDatabase:
     ) -> ObjectApiResponse[Any]:
         return cls.get_client().indices.analyze(text=text, index=index, analyzer=analyzer)
 
+    @classmethod
+    def get_index_settings(cls: Any[Elasticsearch], index: str) -> Dict[str, Any]:
+        return cls.get_client().indices.get_settings(index=index)[index]["settings"]["index"]
+
+    @classmethod
+    def update_index_settings(cls: Any[Elasticsearch], index: str, settings: dict) -> ObjectApiResponse[Any]:
+        return cls.get_client().indices.put_settings(index=index, settings=settings)
+
+    @classmethod
+    def refresh_index(cls: Any[Elasticsearch], index: str) -> ObjectApiResponse[Any]:
+        return cls.get_client().indices.refresh(index=index)
+
+    @classmethod
+    def get_index_stats(cls: Any[Elasticsearch], index: str, metrics: List[str]) -> ObjectApiResponse[Any]:
+        cls.count_call("index_stats")
+        return cls.get_client().indices.stats(index=index, metric=metrics)
+
     @classmethod
     def count(cls: Any[Elasticsearch], index: str, query: Optional[dict] = None) -> ObjectApiResponse[Any]:
+        cls.count_call("count")
         return cls.get_client().count(index=index, query=query)
+
+    @classmethod
+    def count_call(cls: Any[Elasticsearch], operation: str) -> None:
+        """Count a call of the given operation in the `elastic_calls_total` counter."""
+        Metrics.increment("elastic_calls_total", operation=operation)
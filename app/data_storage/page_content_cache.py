@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import uuid
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+from typing import Any, Dict, Hashable, Optional
+
+from app.utility.cache import LRUCache
+
+
+@dataclass(frozen=True)
+class CachedPageContent:
+    """The extracted text content of a page and the validators to revalidate it by a conditional request."""
+
+    url: str
+    content: str
+    expires_at: float
+    size: int
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    def refresh(self: CachedPageContent, expires_at: float) -> CachedPageContent:
+        return replace(self, expires_at=expires_at)
+
+
+class PageContentCache:
+    """A two-tier cache of page contents by their URL.
+
+    The most recently used contents are kept in an in-memory tier bounded by their number and their total size. The
+    contents evicted from the memory spill to a bounded disk tier, which evicts the least recently used files first.
+    The disk tier is only accessed by worker threads, so the event loop never waits for the disk.
+    """
+
+    FILE_SUFFIX = ".json"
+
+    def __init__(
+        self: PageContentCache,
+        directory: Path,
+        memory_max_size: int,
+        disk_max_size: int,
+        memory_max_bytes: Optional[int] = None,
+    ) -> None:
+        """
+        Args:
+            directory (Path): Path to the directory of the disk tier.
+            memory_max_size (int): Maximum number of contents in the memory tier.
+            disk_max_size (int): Maximum number of contents in the disk tier.
+            memory_max_bytes (Optional[int]): Maximum total size of the contents in the memory tier (in bytes of their
+                                              UTF-8 encodings). Only their number is bounded, if not given.
+        """
+        self._directory = directory
+        self._memory_cache = LRUCache(
+            memory_max_size, on_evict=self._spill, max_weight=memory_max_bytes, get_weight=self._get_content_size
+        )
+        self._disk_max_size = disk_max_size
+        # The disk tier is counted once it's first written, so it's never listed by the event loop.
+        self._disk_size: Optional[int] = None
+        self._disk_lock = threading.Lock()
+
+    async def get(self: PageContentCache, url: str) -> Optional[CachedPageContent]:
+        """Get the cached content of the given page, which may be expired.
+
+        Args:
+            url (str): The page URL.
+
+        Returns:
+            Optional[CachedPageContent]:
+        """
+        page_content = self._memory_cache.get(url)
+        if page_content is None:
+            page_content = await asyncio.to_thread(self._load, url)
+            if page_content is not None:
+                await self.set(page_content)
+
+        return page_content
+
+    async def set(self: PageContentCache, page_content: CachedPageContent) -> None:
+        """Cache the given page content, which may spill the least recently used contents to the disk tier."""
+        await asyncio.to_thread(self._memory_cache.set, page_content.url, page_content)
+
+    def _get_file_path(self: PageContentCache, url: str) -> Path:
+        return self._directory / f"{hashlib.sha256(url.encode('utf-8')).hexdigest()}{self.FILE_SUFFIX}"
+
+    def _load(self: PageContentCache, url: str) -> Optional[CachedPageContent]:
+        file_path = self._get_file_path(url)
+        try:
+            with open(file_path) as page_content_file:
+                page_content = CachedPageContent(**json.load(page_content_file))
+            # The file modification time is used to find the least recently used files.
+            os.utime(file_path)
+        except (OSError, ValueError, TypeError):
+            return None
+
+        return page_content if page_content.url == url else None
+
+    def _spill(self: PageContentCache, url: Hashable, page_content: Any) -> None:
+        file_path = self._get_file_path(str(url))
+        with self._disk_lock:
+            if self._disk_size is None:
+                self._directory.mkdir(parents=True, exist_ok=True)
+                self._disk_size = len(list(self._directory.glob(f"*{self.FILE_SUFFIX}")))
+
+        temporary_file_path = file_path.with_name(f".{file_path.name}.{uuid.uuid4().hex}")
+        with open(temporary_file_path, "w") as page_content_file:
+            json.dump(asdict(page_content), page_content_file)
+
+        with self._disk_lock:
+            if not file_path.exists():
+                self._disk_size = (self._disk_size or 0) + 1
+            os.replace(temporary_file_path, file_path)
+
+            # Evict a tenth of the disk tier at once, so the directory isn't listed per spilled content.
+            if self._disk_size > self._disk_max_size:
+                file_paths = sorted(self._directory.glob(f"*{self.FILE_SUFFIX}"), key=self._get_modification_time)
+                retained_count = int(self._disk_max_size * 0.9)
+                for evicted_file_path in file_paths[:-retained_count] if retained_count else file_paths:
+                    evicted_file_path.unlink(missing_ok=True)
+                self._disk_size = min(len(file_paths), retained_count)
+
+    @staticmethod
+    def _get_content_size(page_content: CachedPageContent) -> int:
+        return len(page_content.content.encode("utf-8"))
+
+    @staticmethod
+    def _get_modification_time(file_path: Path) -> float:
+        try:
+            return file_path.stat().st_mtime
+        except OSError:
+            # The file may be evicted by another process in the meantime.
+            return 0.0
+
+    def get_statistics(self: PageContentCache) -> Dict[str, Any]:
+        return {
+            "memory_size": len(self._memory_cache),
+            "memory_bytes": self._memory_cache.weight,
+            "disk_size": self._disk_size or 0,
+        }
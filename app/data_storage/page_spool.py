@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import json
+import os
+import uuid
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import IO, Iterable, List, Optional
+
+
+@dataclass(frozen=True)
+class SpooledPage:
+    """A scored page waiting to be written into the articles, and the terms it's scored by (if known)."""
+
+    url: str
+    content: str
+    content_hash: str
+    submitted_at: float
+    terms: Optional[List[str]] = None
+
+
+class PageSpool:
+    """A durable local spool of the pages waiting to be written, by which they're not lost if the process stops.
+
+    Each page is written into its own file (atomically, by a rename) and removed once it's written. Every process
+    spools into a slot directory of its own, which it holds by a file lock as long as it runs. So the pages left in
+    the slots of the stopped processes (i.e., which are not locked) are recovered by the next process that opens the
+    spool, but never the pages of another running process.
+    """
+
+    SLOT_PREFIX = "slot-"
+    LOCK_FILE_SUFFIX = ".lock"
+    FILE_SUFFIX = ".json"
+
+    def __init__(self: PageSpool, directory: Path) -> None:
+        """
+        Args:
+            directory (Path): Path to the directory of the slots.
+        """
+        self._directory = directory
+        self._slot_directory: Optional[Path] = None
+        self._lock_file: Optional[IO[str]] = None
+
+    @property
+    def slot_directory(self: PageSpool) -> Optional[Path]:
+        """The directory of the slot held by the spool, or None if it's not opened."""
+        return self._slot_directory
+
+    def open(self: PageSpool) -> List[SpooledPage]:
+        """Hold a free slot of the spool, and recover the pages left in it and in the other free slots.
+
+        Returns:
+            List[SpooledPage]: The recovered pages, which are moved into the held slot.
+        """
+        self._directory.mkdir(parents=True, exist_ok=True)
+        slot_index = 0
+        while True:
+            lock_file = self._lock_slot(slot_index)
+            if lock_file is not None:
+                break
+            slot_index += 1
+
+        self._lock_file = lock_file
+        self._slot_directory = self._directory / f"{self.SLOT_PREFIX}{slot_index}"
+        self._slot_directory.mkdir(exist_ok=True)
+
+        # The slots of the stopped processes beyond the current number of processes are recovered by this slot.
+        for lock_file_path in self._directory.glob(f"{self.SLOT_PREFIX}*{self.LOCK_FILE_SUFFIX}"):
+            other_slot_index = int(lock_file_path.stem.removeprefix(self.SLOT_PREFIX))
+            if other_slot_index != slot_index:
+                self._recover_slot(other_slot_index)
+
+        return self._load()
+
+    def close(self: PageSpool) -> None:
+        """Release the held slot, whose remaining pages are recovered by the next process that opens the spool."""
+        if self._lock_file is not None:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self._lock_file.close()
+        self._lock_file = None
+        self._slot_directory = None
+
+    def append(self: PageSpool, page: SpooledPage) -> None:
+        """Write the given page into the held slot, and wait until it's stored durably."""
+        file_path = self._get_file_path(page.url)
+        temporary_file_path = file_path.with_name(f".{file_path.name}.{uuid.uuid4().hex}")
+        with open(temporary_file_path, "w") as page_file:
+            json.dump(asdict(page), page_file)
+            page_file.flush()
+            os.fsync(page_file.fileno())
+        os.replace(temporary_file_path, file_path)
+
+    def remove(self: PageSpool, pages: Iterable[SpooledPage]) -> None:
+        """Remove the given pages (e.g., once they're written) from the held slot."""
+        for page in pages:
+            self._get_file_path(page.url).unlink(missing_ok=True)
+
+    def _get_file_path(self: PageSpool, url: str) -> Path:
+        if self._slot_directory is None:
+            raise RuntimeError("Page spool is not opened.")
+
+        return self._slot_directory / f"{hashlib.sha256(url.encode('utf-8')).hexdigest()}{self.FILE_SUFFIX}"
+
+    def _lock_slot(self: PageSpool, slot_index: int) -> Optional[IO[str]]:
+        """Lock the given slot, or return None if it's held by another process (or another spool)."""
+        lock_file = open(self._directory / f"{self.SLOT_PREFIX}{slot_index}{self.LOCK_FILE_SUFFIX}", "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return None
+
+        return lock_file
+
+    def _recover_slot(self: PageSpool, slot_index: int) -> None:
+        """Move the pages of the given slot into the held slot, if it's not held by another process."""
+        lock_file = self._lock_slot(slot_index)
+        if lock_file is None or self._slot_directory is None:
+            return
+
+        try:
+            slot_directory = self._directory / f"{self.SLOT_PREFIX}{slot_index}"
+            for file_path in slot_directory.glob(f"*{self.FILE_SUFFIX}"):
+                os.replace(file_path, self._slot_directory / file_path.name)
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+
+    def _load(self: PageSpool) -> List[SpooledPage]:
+        """Load the pages of the held slot, and remove the temporary files of the pages which were never spooled."""
+        if self._slot_directory is None:
+            return []
+
+        pages = []
+        for file_path in sorted(self._slot_directory.iterdir()):
+            if file_path.name.startswith("."):
+                file_path.unlink(missing_ok=True)
+                continue
+
+            try:
+                with open(file_path) as page_file:
+                    pages.append(SpooledPage(**json.load(page_file)))
+            except (OSError, ValueError, TypeError):
+                continue
+
+        return sorted(pages, key=lambda page: page.submitted_at)
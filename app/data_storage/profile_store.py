@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import cProfile
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+class ProfileStore:
+    """A bounded on-disk ring buffer of captured profiles (in pstats format) and their metadata.
+
+    The profile IDs start with their creation time, so they're sorted chronologically, and the oldest profiles are
+    removed once there are more than the maximum number of them.
+    """
+
+    PROFILE_FILE_SUFFIX = ".prof"
+    METADATA_FILE_SUFFIX = ".json"
+    PROFILE_ID_PATTERN = re.compile(r"^\d{19}-[0-9a-f]{8}$")
+
+    def __init__(self: ProfileStore, directory: Path, max_count: int) -> None:
+        """
+        Args:
+            directory (Path): Path to the directory of the profiles.
+            max_count (int): Maximum number of kept profiles.
+        """
+        self._directory = directory
+        self._max_count = max_count
+        self._lock = threading.Lock()
+        self._last_created_at = 0
+
+    def save(self: ProfileStore, profile: cProfile.Profile, metadata: Dict[str, Any]) -> str:
+        """Save the given profile along with its metadata, and remove the oldest profiles beyond the maximum count.
+
+        Args:
+            profile (cProfile.Profile): The captured profile.
+            metadata (Dict[str, Any]): The metadata of the profile (e.g., the profiled endpoint).
+
+        Returns:
+            str: ID of the saved profile.
+        """
+        with self._lock:
+            # The creation times (in nanoseconds) are kept increasing, so the profile IDs are ordered in the process.
+            self._last_created_at = max(time.time_ns(), self._last_created_at + 1)
+            profile_id = f"{self._last_created_at:019d}-{uuid.uuid4().hex[:8]}"
+        profile_file_path = self._directory / f"{profile_id}{self.PROFILE_FILE_SUFFIX}"
+        # The directory is created by the first profile, so it's not created at all if profiling is disabled.
+        self._directory.mkdir(parents=True, exist_ok=True)
+
+        # The profile is written before its metadata, so a listed profile can always be downloaded.
+        temporary_file_path = profile_file_path.with_name(f".{profile_file_path.name}.{uuid.uuid4().hex}")
+        profile.dump_stats(temporary_file_path)
+        os.replace(temporary_file_path, profile_file_path)
+        with open(self._directory / f"{profile_id}{self.METADATA_FILE_SUFFIX}", "w") as metadata_file:
+            json.dump({"id": profile_id, "created_at": time.time(), **metadata}, metadata_file)
+
+        with self._lock:
+            for evicted_profile_id in self._get_profile_ids()[: -self._max_count or None]:
+                for suffix in (self.METADATA_FILE_SUFFIX, self.PROFILE_FILE_SUFFIX):
+                    (self._directory / f"{evicted_profile_id}{suffix}").unlink(missing_ok=True)
+
+        return profile_id
+
+    def list(self: ProfileStore) -> List[Dict[str, Any]]:
+        """List the metadata of the kept profiles, the most recent first."""
+        profiles = []
+        for profile_id in reversed(self._get_profile_ids()):
+            try:
+                with open(self._directory / f"{profile_id}{self.METADATA_FILE_SUFFIX}") as metadata_file:
+                    profiles.append(json.load(metadata_file))
+            except (OSError, ValueError):
+                # The profile may be removed by another process in the meantime.
+                continue
+
+        return profiles
+
+    def get_profile_path(self: ProfileStore, profile_id: str) -> Optional[Path]:
+        """Get the path to the pstats file of the given profile, or None if it's not kept (or the ID is invalid)."""
+        if not self.PROFILE_ID_PATTERN.match(profile_id):
+            return None
+
+        profile_file_path = self._directory / f"{profile_id}{self.PROFILE_FILE_SUFFIX}"
+        return profile_file_path if profile_file_path.exists() else None
+
+    def _get_profile_ids(self: ProfileStore) -> List[str]:
+        return sorted(file_path.stem for file_path in self._directory.glob(f"*{self.METADATA_FILE_SUFFIX}"))
@@ -0,0 +1,399 @@
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import shutil
+import threading
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Collection, Dict, Final, FrozenSet, Iterable, Iterator, List, Mapping, Optional, Sequence, Set
+
+import numpy as np
+
+from app.data_storage.term_statistics_store import TermStatisticsStore, calculate_idfs
+
+
+class TermStatisticsSnapshot:
+    """A consistent view of the term statistics at a single version: a base store plus the delta stores added after it.
+
+    The DF of a term is its DF in the base plus its DFs in all the deltas, and the article count is the total number of
+    articles of all the segments.
+    """
+
+    def __init__(
+        self: TermStatisticsSnapshot, version: int, base: TermStatisticsStore, deltas: List[TermStatisticsStore]
+    ) -> None:
+        """
+        Args:
+            version (int): The manifest version the snapshot is opened at.
+            base (TermStatisticsStore): The base store.
+            deltas (List[TermStatisticsStore]): The delta stores in the order they were added.
+        """
+        self._version = version
+        self._base = base
+        self._deltas = deltas
+        self._article_count = base.article_count + sum(delta.article_count for delta in deltas)
+        self._missing_term_idf = float(
+            calculate_idfs(self._article_count, np.zeros(1), TermStatisticsStore.IDF_DECIMAL_PLACE_COUNT)[0]
+        )
+
+    @property
+    def version(self: TermStatisticsSnapshot) -> int:
+        """The version number of the statistics, which increases whenever a segment is added or compacted."""
+        return self._version
+
+    @property
+    def base_version(self: TermStatisticsSnapshot) -> str:
+        """The unique version of the base store, which changes whenever the statistics are rebuilt or compacted."""
+        return self._base.version
+
+    @property
+    def base(self: TermStatisticsSnapshot) -> TermStatisticsStore:
+        return self._base
+
+    @property
+    def delta_count(self: TermStatisticsSnapshot) -> int:
+        return len(self._deltas)
+
+    @property
+    def article_count(self: TermStatisticsSnapshot) -> int:
+        """Number of articles (documents) in all the segments, i.e., `n` in IDF formula."""
+        return self._article_count
+
+    @property
+    def missing_term_idf(self: TermStatisticsSnapshot) -> float:
+        """The IDF of a term that doesn't exist in any articles (i.e., DF is zero)."""
+        return self._missing_term_idf
+
+    def lookup(self: TermStatisticsSnapshot, terms: Sequence[str]) -> np.ndarray:
+        """Get DF (document frequency) of the given terms in all the segments.
+
+        Args:
+            terms (Sequence[str]): A collection of terms.
+
+        Returns:
+            np.ndarray: DFs of the given terms with the same order.
+        """
+        term_dfs = self._base.lookup(terms)
+        for delta in self._deltas:
+            term_dfs += delta.lookup(terms)
+
+        return term_dfs
+
+    def lookup_idfs(self: TermStatisticsSnapshot, terms: Sequence[str]) -> np.ndarray:
+        """Get IDF (inverse document frequency) of the given terms by their DFs in all the segments.
+
+        Args:
+            terms (Sequence[str]): A collection of terms.
+
+        Returns:
+            np.ndarray: IDFs of the given terms with the same order.
+        """
+        # The precomputed IDFs of the base are only valid as long as no articles are added to it.
+        if not self._deltas:
+            return self._base.lookup_idfs(terms)
+
+        return calculate_idfs(self.article_count, self.lookup(terms), TermStatisticsStore.IDF_DECIMAL_PLACE_COUNT)
+
+
+class SegmentedTermStatistics:
+    """Term statistics kept as an immutable base segment plus delta segments of the articles added incrementally.
+
+    Each segment is a term statistics store along with the keys of the articles it's calculated from. A versioned
+    manifest lists the current segments, and it's replaced atomically under a file lock whenever a segment is added,
+    so the readers always open a consistent set of segments. The deltas are compacted into a new base periodically.
+    Since the segments are immutable, the keys of the articles of each segment are read once per process.
+    """
+
+    MANIFEST_FILE_NAME: Final[str] = "manifest.json"
+    LOCK_FILE_NAME: Final[str] = "manifest.lock"
+    ARTICLE_KEYS_FILE_NAME: Final[str] = "article_keys.txt"
+    BASE_SEGMENT_PREFIX: Final[str] = "base-"
+    DELTA_SEGMENT_PREFIX: Final[str] = "delta-"
+    SNAPSHOT_OPEN_ATTEMPT_COUNT: Final[int] = 3
+
+    # The article keys of the segments by their paths, which are shared by all the instances in the process.
+    _segment_article_keys: Dict[Path, Optional[FrozenSet[str]]] = {}
+    _segment_article_keys_lock = threading.Lock()
+
+    def __init__(self: SegmentedTermStatistics, directory: Path) -> None:
+        """
+        Args:
+            directory (Path): Path to the directory of the manifest and the segments.
+        """
+        self._directory = directory
+
+    @property
+    def directory(self: SegmentedTermStatistics) -> Path:
+        return self._directory
+
+    def exists(self: SegmentedTermStatistics) -> bool:
+        return (self._directory / self.MANIFEST_FILE_NAME).exists()
+
+    def get_version(self: SegmentedTermStatistics) -> Optional[int]:
+        """Get the current version of the statistics, or None if the statistics are not built yet."""
+        manifest = self._read_manifest()
+        return manifest["version"] if manifest else None
+
+    def get_delta_count(self: SegmentedTermStatistics) -> int:
+        """Get the number of the delta segments added since the statistics were built or compacted."""
+        manifest = self._read_manifest()
+        return len(manifest["deltas"]) if manifest else 0
+
+    def open_snapshot(self: SegmentedTermStatistics) -> TermStatisticsSnapshot:
+        """Open the segments of the current version as a consistent snapshot.
+
+        Returns:
+            TermStatisticsSnapshot:
+
+        Raises:
+            FileNotFoundError: If the statistics are not built yet.
+        """
+        for attempt in range(self.SNAPSHOT_OPEN_ATTEMPT_COUNT):
+            manifest = self._read_manifest()
+            if manifest is None:
+                raise FileNotFoundError(f"Term statistics are not built in {self._directory}.")
+
+            try:
+                return TermStatisticsSnapshot(
+                    manifest["version"],
+                    TermStatisticsStore(self._directory / manifest["base"]),
+                    [TermStatisticsStore(self._directory / delta) for delta in manifest["deltas"]],
+                )
+            except FileNotFoundError:
+                # The segments may be removed by a compaction right after the manifest is read.
+                if attempt == self.SNAPSHOT_OPEN_ATTEMPT_COUNT - 1:
+                    raise
+
+        raise FileNotFoundError(f"Term statistics could not be opened in {self._directory}.")
+
+    def get_article_keys(self: SegmentedTermStatistics) -> Optional[Set[str]]:
+        """Get the keys of all the articles the statistics are calculated from.
+
+        Returns:
+            Optional[Set[str]]: The article keys, or None if the statistics are not built or their articles are not
+                                tracked.
+        """
+        manifest = self._read_manifest()
+        if manifest is None:
+            return None
+
+        article_keys: Set[str] = set()
+        for segment in [manifest["base"], *manifest["deltas"]]:
+            segment_article_keys = self._read_article_keys(segment)
+            if segment_article_keys is None:
+                return None
+            article_keys.update(segment_article_keys)
+
+        return article_keys
+
+    def rebuild(
+        self: SegmentedTermStatistics,
+        terms: Iterable[str],
+        dfs: Iterable[int],
+        article_count: int,
+        article_keys: Optional[Iterable[str]] = None,
+    ) -> int:
+        """Replace all the segments by a new base segment of the given term DFs.
+
+        Args:
+            terms (Iterable[str]): A collection of terms.
+            dfs (Iterable[int]): DF (document frequency) of each given term.
+            article_count (int): Number of articles the DFs are calculated from.
+            article_keys (Optional[Iterable[str]]): Keys of the articles the DFs are calculated from, if tracked.
+
+        Returns:
+            int: The new version of the statistics.
+        """
+        with self._lock():
+            manifest = self._read_manifest() or {"version": 0}
+            base = self._write_segment(self.BASE_SEGMENT_PREFIX, terms, dfs, article_count, article_keys)
+
+            return self._write_manifest(manifest["version"] + 1, base, [])
+
+    def add_delta(
+        self: SegmentedTermStatistics,
+        terms: Iterable[str],
+        dfs: Iterable[int],
+        article_count: int,
+        article_keys: Iterable[str],
+    ) -> int:
+        """Add a delta segment of the term DFs of new articles.
+
+        Args:
+            terms (Iterable[str]): A collection of terms.
+            dfs (Iterable[int]): DF (document frequency) of each given term in the new articles.
+            article_count (int): Number of the new articles.
+            article_keys (Iterable[str]): Keys of the new articles.
+
+        Returns:
+            int: The new version of the statistics.
+        """
+        with self._lock():
+            manifest = self._read_manifest()
+            if manifest is None:
+                raise FileNotFoundError(f"Term statistics are not built in {self._directory}.")
+
+            delta = self._write_segment(self.DELTA_SEGMENT_PREFIX, terms, dfs, article_count, article_keys)
+
+            return self._write_manifest(manifest["version"] + 1, manifest["base"], [*manifest["deltas"], delta])
+
+    def add_new_articles(self: SegmentedTermStatistics, article_terms: Mapping[str, Collection[str]]) -> List[str]:
+        """Add a delta segment of the given articles, except the articles which are already in the statistics.
+
+        The articles are checked and added under the lock of the manifest, so an article is never added twice (e.g., by
+        two processes). Only the given keys are checked, against the article keys of the segments read once.
+
+        Args:
+            article_terms (Mapping[str, Collection[str]]): The key of each article as keys and its terms as values.
+
+        Returns:
+            List[str]: Keys of the added articles.
+        """
+        with self._lock():
+            manifest = self._read_manifest()
+            if manifest is None:
+                raise FileNotFoundError(f"Term statistics are not built in {self._directory}.")
+
+            # The articles are only checked against the segments which track their articles.
+            segments = [manifest["base"], *manifest["deltas"]]
+            self._forget_article_keys(segments)
+            segment_article_keys = [self._read_article_keys(segment) for segment in segments]
+            new_article_keys = [
+                article_key
+                for article_key in article_terms
+                if not any(
+                    article_keys is not None and article_key in article_keys for article_keys in segment_article_keys
+                )
+            ]
+            if not new_article_keys:
+                return []
+
+            term_dfs: Counter = Counter()
+            for article_key in new_article_keys:
+                term_dfs.update(set(article_terms[article_key]))
+            delta = self._write_segment(
+                self.DELTA_SEGMENT_PREFIX, term_dfs.keys(), term_dfs.values(), len(new_article_keys), new_article_keys
+            )
+            self._write_manifest(manifest["version"] + 1, manifest["base"], [*manifest["deltas"], delta])
+
+            return new_article_keys
+
+    def compact(self: SegmentedTermStatistics) -> int:
+        """Merge the base segment and all the delta segments into a new base segment.
+
+        Returns:
+            int: The new version of the statistics.
+        """
+        with self._lock():
+            manifest = self._read_manifest()
+            if manifest is None:
+                raise FileNotFoundError(f"Term statistics are not built in {self._directory}.")
+            if not manifest["deltas"]:
+                return manifest["version"]
+
+            term_dfs: Counter = Counter()
+            article_count = 0
+            article_keys: Optional[Set[str]] = set()
+            for segment in [manifest["base"], *manifest["deltas"]]:
+                store = TermStatisticsStore(self._directory / segment)
+                terms, dfs = store.items()
+                term_dfs.update(dict(zip(terms, dfs.tolist())))
+                article_count += store.article_count
+
+                segment_article_keys = self._read_article_keys(segment)
+                if article_keys is not None and segment_article_keys is not None:
+                    article_keys.update(segment_article_keys)
+                else:
+                    article_keys = None
+
+            base = self._write_segment(
+                self.BASE_SEGMENT_PREFIX, term_dfs.keys(), term_dfs.values(), article_count, article_keys
+            )
+
+            return self._write_manifest(manifest["version"] + 1, base, [])
+
+    @contextmanager
+    def _lock(self: SegmentedTermStatistics) -> Iterator[None]:
+        """Hold the exclusive lock of the manifest, so only one process changes the segments at a time."""
+        self._directory.mkdir(parents=True, exist_ok=True)
+        with open(self._directory / self.LOCK_FILE_NAME, "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_manifest(self: SegmentedTermStatistics) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._directory / self.MANIFEST_FILE_NAME) as manifest_file:
+                return json.load(manifest_file)
+        except FileNotFoundError:
+            return None
+
+    def _write_manifest(self: SegmentedTermStatistics, version: int, base: str, deltas: List[str]) -> int:
+        """Replace the manifest atomically and remove the segments which are no longer referenced by it."""
+        manifest_path = self._directory / self.MANIFEST_FILE_NAME
+        temporary_manifest_path = manifest_path.with_name(f".{manifest_path.name}.{uuid.uuid4().hex}")
+        with open(temporary_manifest_path, "w") as manifest_file:
+            json.dump({"version": version, "base": base, "deltas": deltas}, manifest_file)
+        os.replace(temporary_manifest_path, manifest_path)
+
+        # The readers which already opened the removed segments keep reading them by their memory maps.
+        for segment_path in self._directory.iterdir():
+            if segment_path.name.startswith(
+                (self.BASE_SEGMENT_PREFIX, self.DELTA_SEGMENT_PREFIX)
+            ) and segment_path.name not in [base, *deltas]:
+                shutil.rmtree(segment_path, ignore_errors=True)
+        self._forget_article_keys([base, *deltas])
+
+        return version
+
+    def _write_segment(
+        self: SegmentedTermStatistics,
+        prefix: str,
+        terms: Iterable[str],
+        dfs: Iterable[int],
+        article_count: int,
+        article_keys: Optional[Iterable[str]],
+    ) -> str:
+        """Write a segment which is not referenced by the manifest yet.
+
+        Returns:
+            str: Name of the segment.
+        """
+        segment = f"{prefix}{uuid.uuid4().hex}"
+        TermStatisticsStore.build(self._directory / segment, terms, dfs, article_count)
+        if article_keys is not None:
+            article_keys = frozenset(article_keys)
+            with open(self._directory / segment / self.ARTICLE_KEYS_FILE_NAME, "w") as article_keys_file:
+                article_keys_file.writelines(f"{article_key}\n" for article_key in article_keys)
+        with SegmentedTermStatistics._segment_article_keys_lock:
+            SegmentedTermStatistics._segment_article_keys[self._directory / segment] = article_keys
+
+        return segment
+
+    def _forget_article_keys(self: SegmentedTermStatistics, segments: List[str]) -> None:
+        """Forget the article keys of the segments other than the given ones (e.g., removed by another process)."""
+        with SegmentedTermStatistics._segment_article_keys_lock:
+            for segment_path in list(SegmentedTermStatistics._segment_article_keys):
+                if segment_path.parent == self._directory and segment_path.name not in segments:
+                    del SegmentedTermStatistics._segment_article_keys[segment_path]
+
+    def _read_article_keys(self: SegmentedTermStatistics, segment: str) -> Optional[FrozenSet[str]]:
+        segment_path = self._directory / segment
+        if segment_path in SegmentedTermStatistics._segment_article_keys:
+            return SegmentedTermStatistics._segment_article_keys[segment_path]
+
+        try:
+            with open(segment_path / self.ARTICLE_KEYS_FILE_NAME) as article_keys_file:
+                article_keys: Optional[FrozenSet[str]] = frozenset(article_keys_file.read().splitlines())
+        except FileNotFoundError:
+            article_keys = None
+        with SegmentedTermStatistics._segment_article_keys_lock:
+            SegmentedTermStatistics._segment_article_keys[segment_path] = article_keys
+
+        return article_keys
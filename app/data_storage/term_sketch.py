@@ -0,0 +1,354 @@
+from __future__ import annotations
+
+import json
+import math
+from pathlib import Path
+from typing import Dict, Final, Iterable, List, Mapping, Optional, Sequence, Type
+
+import numpy as np
+
+from app.data_storage.term_statistics_store import TermStatisticsStore, calculate_idfs, hash_term
+from app.data_storage.versioned_directory import VersionedDirectory
+
+
+class TermSketch:
+    """An approximate counter of term DFs (document frequencies) in bounded memory, which is mergeable.
+
+    The DFs are kept in a Count-Min sketch (`depth` rows of `width` counters) by conservative update, plus an exact
+    table of a fixed set of heavy hitters (i.e., the most frequent terms, chosen up front), which are not added to the
+    sketch, so their DFs are exact and they don't inflate the DFs of the other terms.
+    The DF of a term is never underestimated. With the width `e/epsilon` and the depth `ln(1/delta)`, it's
+    overestimated by at most `epsilon * mass` with probability `1 - delta`, in which `mass` is the sum of the DFs
+    of all the terms in the sketch (i.e., except the heavy hitters). The conservative update only makes it tighter.
+    Two sketches of the same parameters and heavy hitters (e.g., of two corpus partitions) are merged by adding their
+    counters, which keeps the same bound by their total mass.
+    """
+
+    def __init__(
+        self: TermSketch,
+        counters: np.ndarray,
+        heavy_hitter_dfs: Dict[str, int],
+        epsilon: float,
+        delta: float,
+        article_count: int = 0,
+        mass: int = 0,
+    ) -> None:
+        """
+        Args:
+            counters (np.ndarray): The counters of the sketch, by rows.
+            heavy_hitter_dfs (Dict[str, int]): The exact DF of each heavy hitter.
+            epsilon (float): The error of the DFs relative to the mass of the sketch.
+            delta (float): The probability of a DF exceeding the error.
+            article_count (int): Number of articles the DFs are counted from.
+            mass (int): Sum of the DFs added to the counters.
+        """
+        self._counters = counters
+        self._heavy_hitter_dfs = heavy_hitter_dfs
+        self._epsilon = epsilon
+        self._delta = delta
+        self._article_count = article_count
+        self._mass = mass
+
+    @classmethod
+    def create(cls: Type[TermSketch], epsilon: float, delta: float, heavy_hitters: Iterable[str] = ()) -> TermSketch:
+        """Create an empty sketch whose DFs are overestimated by at most `epsilon * mass` with probability `1 - delta`.
+
+        Args:
+            epsilon (float): The error of the DFs relative to the mass of the sketch.
+            delta (float): The probability of a DF exceeding the error.
+            heavy_hitters (Iterable[str]): The terms to be counted exactly.
+
+        Returns:
+            TermSketch:
+        """
+        width = math.ceil(math.e / epsilon)
+        depth = max(math.ceil(math.log(1 / delta)), 1)
+        return cls(np.zeros((depth, width), dtype=np.uint32), dict.fromkeys(heavy_hitters, 0), epsilon, delta)
+
+    @property
+    def counters(self: TermSketch) -> np.ndarray:
+        return self._counters
+
+    @property
+    def heavy_hitter_dfs(self: TermSketch) -> Dict[str, int]:
+        return self._heavy_hitter_dfs
+
+    @property
+    def epsilon(self: TermSketch) -> float:
+        return self._epsilon
+
+    @property
+    def delta(self: TermSketch) -> float:
+        return self._delta
+
+    @property
+    def article_count(self: TermSketch) -> int:
+        return self._article_count
+
+    @property
+    def mass(self: TermSketch) -> int:
+        """Sum of the DFs of the terms in the sketch (i.e., except the heavy hitters)."""
+        return self._mass
+
+    @property
+    def error_bound(self: TermSketch) -> float:
+        """The maximum overestimation of a DF (with probability `1 - delta`)."""
+        return self._epsilon * self._mass
+
+    def add(self: TermSketch, term_dfs: Mapping[str, int], article_count: int) -> None:
+        """Add the DFs of the terms counted in the given number of articles.
+
+        The counters of all the terms are updated at once: the counters of each term are raised to its current
+        estimate plus its DF (i.e., conservative update), so no counter is raised more than needed by any term.
+
+        Args:
+            term_dfs (Mapping[str, int]): A collection of terms as keys and their DFs as values.
+            article_count (int): Number of articles the DFs are counted from.
+        """
+        sketch_terms: List[str] = []
+        sketch_dfs: List[int] = []
+        for term, df in term_dfs.items():
+            if term in self._heavy_hitter_dfs:
+                self._heavy_hitter_dfs[term] += df
+            else:
+                sketch_terms.append(term)
+                sketch_dfs.append(df)
+
+        self._article_count += article_count
+        if not sketch_terms:
+            return
+
+        dfs = np.asarray(sketch_dfs, dtype=np.uint32)
+        columns = get_sketch_columns(sketch_terms, *self._counters.shape)
+        estimates = self._counters[np.arange(len(columns))[:, np.newaxis], columns].min(axis=0)
+        for row, row_columns in enumerate(columns):
+            np.maximum.at(self._counters[row], row_columns, estimates + dfs)
+        self._mass += int(dfs.sum())
+
+    def merge(self: TermSketch, other: TermSketch) -> TermSketch:
+        """Add the counters and the heavy hitter DFs of the other sketch of the same parameters to this sketch.
+
+        Returns:
+            TermSketch: This sketch.
+
+        Raises:
+            ValueError: If the sketches don't have the same shape and heavy hitters.
+        """
+        if (
+            self._counters.shape != other.counters.shape
+            or self._heavy_hitter_dfs.keys() != other.heavy_hitter_dfs.keys()
+        ):
+            raise ValueError("Only the sketches of the same shape and heavy hitters can be merged.")
+
+        self._counters += other.counters
+        for term, df in other.heavy_hitter_dfs.items():
+            self._heavy_hitter_dfs[term] += df
+        self._article_count += other.article_count
+        self._mass += other.mass
+
+        return self
+
+    def estimate(self: TermSketch, terms: Sequence[str]) -> np.ndarray:
+        """Estimate the DF of the given terms (which are not heavy hitters) by the sketch."""
+        return estimate_dfs(self._counters, terms)
+
+
+class TermSketchStore:
+    """A memory-mapped store of a term sketch, by which the DFs and IDFs of terms are looked up approximately.
+
+    The counters of the sketch are kept in a single array, and the heavy hitters in a term statistics store, which
+    are all memory-mapped, so every process that loads the same store shares a single copy of it.
+    The store has the same lookup methods as the exact term statistics, so either of them can be used for the static
+    calculation.
+    """
+
+    COUNTERS_FILE_NAME: Final[str] = "counters.npy"
+    HEAVY_HITTERS_DIRECTORY_NAME: Final[str] = "heavy_hitters"
+    ARTICLE_KEYS_FILE_NAME: Final[str] = "article_keys.txt"
+    METADATA_FILE_NAME: Final[str] = "metadata.json"
+
+    def __init__(self: TermSketchStore, directory: Path) -> None:
+        """
+        Args:
+            directory (Path): Path to the directory of an already built store.
+        """
+        self._directory = directory
+
+        with open(directory / self.METADATA_FILE_NAME) as metadata_file:
+            self._metadata = json.load(metadata_file)
+
+        self._counters = np.load(directory / self.COUNTERS_FILE_NAME, mmap_mode="r")
+        self._heavy_hitters = TermStatisticsStore(directory / self.HEAVY_HITTERS_DIRECTORY_NAME)
+        self._missing_term_idf = float(
+            calculate_idfs(self.article_count, np.zeros(1), TermStatisticsStore.IDF_DECIMAL_PLACE_COUNT)[0]
+        )
+
+    @property
+    def directory(self: TermSketchStore) -> Path:
+        return self._directory
+
+    @property
+    def version(self: TermSketchStore) -> str:
+        """The unique version of the sketch, which changes whenever the sketch is rebuilt or merged."""
+        return self._metadata["version"]
+
+    @property
+    def base_version(self: TermSketchStore) -> str:
+        """The kind of the statistics, by which the versions of the approximate and exact statistics differ."""
+        return "approximate"
+
+    @property
+    def article_count(self: TermSketchStore) -> int:
+        """Number of articles (documents) the sketch is counted from, i.e., `n` in IDF formula."""
+        return self._metadata["article_count"]
+
+    @property
+    def error_bound(self: TermSketchStore) -> float:
+        """The maximum overestimation of the DF of a term (with probability `1 - delta`). Heavy hitters are exact."""
+        return self._metadata["epsilon"] * self._metadata["mass"]
+
+    @property
+    def missing_term_idf(self: TermSketchStore) -> float:
+        """The IDF of a term that doesn't exist in any articles (i.e., DF is zero)."""
+        return self._missing_term_idf
+
+    @property
+    def size(self: TermSketchStore) -> int:
+        """Size of the counters of the sketch in bytes."""
+        return self._counters.nbytes
+
+    @classmethod
+    def read_version(cls: Type[TermSketchStore], directory: Path) -> Optional[str]:
+        """Read the current version of the store in the given directory, or None if it's not built yet."""
+        return VersionedDirectory(directory).read_version()
+
+    @classmethod
+    def open(cls: Type[TermSketchStore], directory: Path) -> TermSketchStore:
+        """Open the current version of the store in the given directory.
+
+        Raises:
+            FileNotFoundError: If the store is not built yet.
+        """
+        return VersionedDirectory(directory).open(cls)[1]
+
+    @classmethod
+    def build(
+        cls: Type[TermSketchStore], directory: Path, sketch: TermSketch, article_keys: Optional[Iterable[str]] = None
+    ) -> TermSketchStore:
+        """Write the given sketch into the given directory as its new version, replacing the existing store at once.
+
+        Args:
+            directory (Path): Path to the versioned directory in which the store is to be written.
+            sketch (TermSketch): The sketch.
+            article_keys (Optional[Iterable[str]]): Keys of the articles the sketch is counted from, if tracked.
+
+        Returns:
+            TermSketchStore: The built store.
+        """
+        versioned_directory = VersionedDirectory(directory)
+        with versioned_directory.publish() as (version, version_directory):
+            np.save(version_directory / cls.COUNTERS_FILE_NAME, sketch.counters)
+            TermStatisticsStore.build(
+                version_directory / cls.HEAVY_HITTERS_DIRECTORY_NAME,
+                sketch.heavy_hitter_dfs.keys(),
+                sketch.heavy_hitter_dfs.values(),
+                sketch.article_count,
+            )
+            if article_keys is not None:
+                with open(version_directory / cls.ARTICLE_KEYS_FILE_NAME, "w") as article_keys_file:
+                    article_keys_file.writelines(f"{article_key}\n" for article_key in article_keys)
+            with open(version_directory / cls.METADATA_FILE_NAME, "w") as metadata_file:
+                json.dump(
+                    {
+                        "version": version,
+                        "article_count": sketch.article_count,
+                        "mass": sketch.mass,
+                        "epsilon": sketch.epsilon,
+                        "delta": sketch.delta,
+                        "depth": sketch.counters.shape[0],
+                        "width": sketch.counters.shape[1],
+                        "heavy_hitter_count": len(sketch.heavy_hitter_dfs),
+                    },
+                    metadata_file,
+                )
+
+        return cls(versioned_directory.get_version_directory(version))
+
+    def create_sketch(self: TermSketchStore) -> TermSketch:
+        """Create an empty sketch of the same parameters and heavy hitters (e.g., to count new articles to be merged)."""
+        return TermSketch.create(self._metadata["epsilon"], self._metadata["delta"], self._heavy_hitters.items()[0])
+
+    def load_sketch(self: TermSketchStore) -> TermSketch:
+        """Load the stored sketch into memory (e.g., to merge the sketch of new articles into it)."""
+        terms, dfs = self._heavy_hitters.items()
+        return TermSketch(
+            np.array(self._counters),
+            dict(zip(terms, dfs.tolist())),
+            self._metadata["epsilon"],
+            self._metadata["delta"],
+            self.article_count,
+            self._metadata["mass"],
+        )
+
+    def get_article_keys(self: TermSketchStore) -> Optional[List[str]]:
+        """Get the keys of the articles the sketch is counted from, or None if they're not tracked."""
+        try:
+            with open(self._directory / self.ARTICLE_KEYS_FILE_NAME) as article_keys_file:
+                return article_keys_file.read().splitlines()
+        except FileNotFoundError:
+            return None
+
+    def lookup(self: TermSketchStore, terms: Sequence[str]) -> np.ndarray:
+        """Get the approximate DF (document frequency) of the given terms, which is exact for the heavy hitters.
+
+        Args:
+            terms (Sequence[str]): A collection of terms.
+
+        Returns:
+            np.ndarray: DFs of the given terms with the same order.
+        """
+        heavy_hitter_mask = self._heavy_hitters.contains(terms)
+        term_dfs = self._heavy_hitters.lookup(terms)
+        sketch_terms = [term for term, heavy_hitter in zip(terms, heavy_hitter_mask) if not heavy_hitter]
+        if sketch_terms:
+            # A DF can't exceed the number of articles, however much it's overestimated.
+            term_dfs[~heavy_hitter_mask] = np.minimum(estimate_dfs(self._counters, sketch_terms), self.article_count)
+
+        return term_dfs
+
+    def lookup_idfs(self: TermSketchStore, terms: Sequence[str]) -> np.ndarray:
+        """Get the approximate IDF (inverse document frequency) of the given terms by their approximate DFs.
+
+        Args:
+            terms (Sequence[str]): A collection of terms.
+
+        Returns:
+            np.ndarray: IDFs of the given terms with the same order.
+        """
+        return calculate_idfs(self.article_count, self.lookup(terms), TermStatisticsStore.IDF_DECIMAL_PLACE_COUNT)
+
+
+def get_sketch_columns(terms: Sequence[str], depth: int, width: int) -> np.ndarray:
+    """Get the column of each of the given terms in each row of a sketch.
+
+    The columns are derived from two halves of the stable hash of the term by double hashing (`h1 + row * h2`), so
+    the term is only hashed once for all the rows.
+
+    Returns:
+        np.ndarray: The columns by rows, i.e., an array of shape (depth, number of terms).
+    """
+    term_hashes = np.fromiter((hash_term(term.encode("utf-8")) for term in terms), dtype=np.uint64, count=len(terms))
+    first_hashes = term_hashes & np.uint64(0xFFFFFFFF)
+    second_hashes = (term_hashes >> np.uint64(32)) | np.uint64(1)
+    rows = np.arange(depth, dtype=np.uint64)[:, np.newaxis]
+
+    return ((first_hashes + rows * second_hashes) % np.uint64(width)).astype(np.int64)
+
+
+def estimate_dfs(counters: np.ndarray, terms: Sequence[str]) -> np.ndarray:
+    """Estimate the DF of the given terms by the minimum of their counters in the rows of a sketch."""
+    if not terms:
+        return np.zeros(0, dtype=np.int64)
+
+    columns = get_sketch_columns(terms, *counters.shape)
+    return counters[np.arange(len(columns))[:, np.newaxis], columns].min(axis=0).astype(np.int64)
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Final, Iterable, List, Sequence, Tuple, Type
+
+import numpy as np
+
+
+class TermStatisticsStore:
+    """A compact and memory-mapped store of term statistics (i.e., DFs and precomputed IDFs).
+
+    The terms are kept as a hashed term-id table: a sorted array of 64-bit term hashes with aligned arrays of DFs,
+    IDFs and offsets into a blob of UTF-8 encoded terms (used to verify the hash matches).
+    All the arrays are memory-mapped, so every process (e.g., uvicorn worker) that loads the same store shares
+    a single copy of it through the OS page cache.
+    """
+
+    IDF_DECIMAL_PLACE_COUNT: Final[int] = 5
+
+    HASHES_FILE_NAME: Final[str] = "hashes.npy"
+    DFS_FILE_NAME: Final[str] = "dfs.npy"
+    IDFS_FILE_NAME: Final[str] = "idfs.npy"
+    OFFSETS_FILE_NAME: Final[str] = "offsets.npy"
+    TERMS_FILE_NAME: Final[str] = "terms.bin"
+    METADATA_FILE_NAME: Final[str] = "metadata.json"
+
+    def __init__(self: TermStatisticsStore, directory: Path) -> None:
+        """
+        Args:
+            directory (Path): Path to the directory of an already built store.
+        """
+        self._directory = directory
+
+        with open(directory / self.METADATA_FILE_NAME) as metadata_file:
+            self._metadata = json.load(metadata_file)
+
+        self._hashes = np.load(directory / self.HASHES_FILE_NAME, mmap_mode="r")
+        self._dfs = np.load(directory / self.DFS_FILE_NAME, mmap_mode="r")
+        self._idfs = np.load(directory / self.IDFS_FILE_NAME, mmap_mode="r")
+        self._offsets = np.load(directory / self.OFFSETS_FILE_NAME, mmap_mode="r")
+        # An empty file can't be memory-mapped.
+        self._terms = (
+            np.memmap(directory / self.TERMS_FILE_NAME, dtype=np.uint8, mode="r") if self._offsets[-1] else np.zeros(0)
+        )
+
+    @property
+    def directory(self: TermStatisticsStore) -> Path:
+        return self._directory
+
+    @property
+    def version(self: TermStatisticsStore) -> str:
+        """The unique version of the statistics snapshot."""
+        return self._metadata["version"]
+
+    @property
+    def article_count(self: TermStatisticsStore) -> int:
+        """Number of articles (documents) the statistics are calculated from, i.e., `n` in IDF formula."""
+        return self._metadata["article_count"]
+
+    @property
+    def term_count(self: TermStatisticsStore) -> int:
+        return len(self._hashes)
+
+    @property
+    def missing_term_idf(self: TermStatisticsStore) -> float:
+        """The IDF of a term that doesn't exist in any articles (i.e., DF is zero)."""
+        return self._metadata["missing_term_idf"]
+
+    @classmethod
+    def exists(cls: Type[TermStatisticsStore], directory: Path) -> bool:
+        return (directory / cls.METADATA_FILE_NAME).exists()
+
+    @classmethod
+    def build(
+        cls: Type[TermStatisticsStore], directory: Path, terms: Iterable[str], dfs: Iterable[int], article_count: int
+    ) -> TermStatisticsStore:
+        """Build a store from the given term DFs and write it into the given directory.
+
+        The store is written into a temporary directory first and then moved in place, so a concurrent reader never
+        sees a partially written store.
+
+        Args:
+            directory (Path): Path to the directory in which the store is to be written.
+            terms (Iterable[str]): A collection of terms.
+            dfs (Iterable[int]): DF (document frequency) of each given term.
+            article_count (int): Number of articles (documents) the DFs are calculated from.
+
+        Returns:
+            TermStatisticsStore: The built store.
+        """
+        encoded_terms = [term.encode("utf-8") for term in terms]
+        term_hashes = np.fromiter(
+            (hash_term(term) for term in encoded_terms), dtype=np.uint64, count=len(encoded_terms)
+        )
+        term_dfs = np.asarray(list(dfs), dtype=np.int64)
+
+        order = np.argsort(term_hashes, kind="stable")
+        sorted_terms = [encoded_terms[i] for i in order]
+        term_lengths = np.fromiter((len(term) for term in sorted_terms), dtype=np.int64, count=len(sorted_terms))
+        offsets = np.zeros(len(sorted_terms) + 1, dtype=np.int64)
+        np.cumsum(term_lengths, out=offsets[1:])
+
+        sorted_dfs = term_dfs[order]
+        idfs = calculate_idfs(article_count, sorted_dfs, cls.IDF_DECIMAL_PLACE_COUNT)
+
+        temporary_directory = directory.with_name(f".{directory.name}.{uuid.uuid4().hex}")
+        temporary_directory.mkdir(parents=True)
+        try:
+            np.save(temporary_directory / cls.HASHES_FILE_NAME, term_hashes[order])
+            np.save(temporary_directory / cls.DFS_FILE_NAME, sorted_dfs)
+            np.save(temporary_directory / cls.IDFS_FILE_NAME, idfs)
+            np.save(temporary_directory / cls.OFFSETS_FILE_NAME, offsets)
+            with open(temporary_directory / cls.TERMS_FILE_NAME, "wb") as terms_file:
+                terms_file.write(b"".join(sorted_terms))
+            with open(temporary_directory / cls.METADATA_FILE_NAME, "w") as metadata_file:
+                json.dump(
+                    {
+                        "version": uuid.uuid4().hex,
+                        "article_count": int(article_count),
+                        "term_count": len(sorted_terms),
+                        "missing_term_idf": float(
+                            calculate_idfs(article_count, np.zeros(1), cls.IDF_DECIMAL_PLACE_COUNT)[0]
+                        ),
+                    },
+                    metadata_file,
+                )
+
+            if directory.exists():
+                shutil.rmtree(directory)
+            os.replace(temporary_directory, directory)
+        except OSError:
+            # Another process may have built the same store concurrently, in which case we use that one.
+            shutil.rmtree(temporary_directory, ignore_errors=True)
+            if not cls.exists(directory):
+                raise
+
+        return cls(directory)
+
+    def lookup(self: TermStatisticsStore, terms: Sequence[str]) -> np.ndarray:
+        """Get DF (document frequency) of the given terms. The DF of a term missing in the store is zero.
+
+        Args:
+            terms (Sequence[str]): A collection of terms.
+
+        Returns:
+            np.ndarray: DFs of the given terms with the same order.
+        """
+        positions, found = self._find(terms)
+        term_dfs = np.zeros(len(terms), dtype=np.int64)
+        term_dfs[found] = self._dfs[positions[found]]
+
+        return term_dfs
+
+    def contains(self: TermStatisticsStore, terms: Sequence[str]) -> np.ndarray:
+        """Get a mask of whether each of the given terms is in the store."""
+        return self._find(terms)[1]
+
+    def lookup_idfs(self: TermStatisticsStore, terms: Sequence[str]) -> np.ndarray:
+        """Get the precomputed IDF (inverse document frequency) of the given terms.
+
+        Args:
+            terms (Sequence[str]): A collection of terms.
+
+        Returns:
+            np.ndarray: IDFs of the given terms with the same order.
+        """
+        positions, found = self._find(terms)
+        term_idfs = np.full(len(terms), self.missing_term_idf, dtype=np.float64)
+        term_idfs[found] = self._idfs[positions[found]]
+
+        return term_idfs
+
+    def items(self: TermStatisticsStore) -> Tuple[List[str], np.ndarray]:
+        """Get all the terms in the store and their DFs (document frequencies).
+
+        Returns:
+            Tuple[List[str], np.ndarray]: A collection of terms, and DF of each term with the same order.
+        """
+        return [self._get_term(position).decode("utf-8") for position in range(self.term_count)], np.asarray(self._dfs)
+
+    def _find(self: TermStatisticsStore, terms: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Find the position of the given terms in the store.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Positions of the terms and a mask of whether each term is found.
+        """
+        encoded_terms = [term.encode("utf-8") for term in terms]
+        term_hashes = np.fromiter(
+            (hash_term(term) for term in encoded_terms), dtype=np.uint64, count=len(encoded_terms)
+        )
+
+        positions = np.searchsorted(self._hashes, term_hashes)
+        found = positions < len(self._hashes)
+        found[found] = self._hashes[positions[found]] == term_hashes[found]
+
+        # Verify the hash matches against the stored terms, so a hash collision never returns a wrong statistic.
+        for i in np.flatnonzero(found):
+            position = positions[i]
+            while position < len(self._hashes) and self._hashes[position] == term_hashes[i]:
+                if self._get_term(position) == encoded_terms[i]:
+                    break
+                position += 1
+            else:
+                found[i] = False
+            positions[i] = position
+
+        return positions, found
+
+    def _get_term(self: TermStatisticsStore, position: int) -> bytes:
+        start, end = self._offsets[position], self._offsets[position + 1]
+        return bytes(self._terms[start:end])
+
+
+def hash_term(term: bytes) -> int:
+    """Get a stable (i.e., the same in all processes) 64-bit hash of the given encoded term."""
+    return int.from_bytes(hashlib.blake2b(term, digest_size=8).digest(), "little")
+
+
+def calculate_idfs(article_count: int, term_dfs: np.ndarray, decimal_place_count: int) -> np.ndarray:
+    """Calculate IDF (inverse document frequency) of terms by `ln((n+1)/(DF(t)+1)) + 1`.
+
+    Args:
+        article_count (int): Number of articles (documents) in the dataset, i.e., `n` in IDF formula
+        term_dfs (np.ndarray): A collection of DFs (document frequencies) of terms.
+        decimal_place_count (int): Number of decimal places to round IDFs to.
+
+    Returns:
+        np.ndarray: A collection of IDFs for the given terms.
+    """
+    return np.round(np.log((article_count + 1) / (term_dfs + 1)) + 1, decimal_place_count)
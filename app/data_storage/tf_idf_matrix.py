@@ -0,0 +1,342 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Final, Iterable, List, Optional, Sequence, Tuple, Type
+
+import numpy as np
+
+from app.data_storage.article_term_index import get_offsets
+from app.data_storage.term_statistics_store import hash_term
+from app.data_storage.versioned_directory import VersionedDirectory
+
+
+@dataclass(frozen=True)
+class TfIdfMatrixBlock:
+    """The TF-IDF vectors of a block of articles (e.g., a corpus partition) in CSR format by a local vocabulary.
+
+    The weights of each article are its TF-IDFs normalized by their L2 norm, so the dot product of two vectors is
+    their cosine similarity.
+    """
+
+    articles: List[Dict[str, Any]]
+    terms: List[str]
+    row_offsets: np.ndarray
+    term_ids: np.ndarray
+    weights: np.ndarray
+
+
+class TfIdfMatrix:
+    """A memory-mapped sparse TF-IDF matrix of the corpus articles (rows) by the terms of its vocabulary (columns).
+
+    The matrix is kept in CSR format (row offsets, column IDs and weights), along with a copy in CSC format
+    (i.e., the postings of each column), so the similarities of a query vector to all the articles are calculated
+    by only reading the postings of the query terms. The vocabulary is kept as a hashed term table (like the term
+    statistics store) aligned with the columns, and the articles as a blob of JSON encoded fields aligned with rows.
+    The large arrays are written as raw binary files while the matrix is built by streaming blocks of articles, so
+    neither building nor serving the matrix needs to load it in memory.
+    """
+
+    TRANSPOSE_CHUNK_SIZE: Final[int] = 1 << 22
+
+    ROW_OFFSETS_FILE_NAME: Final[str] = "row_offsets.bin"
+    COLUMN_IDS_FILE_NAME: Final[str] = "column_ids.bin"
+    WEIGHTS_FILE_NAME: Final[str] = "weights.bin"
+    POSTING_OFFSETS_FILE_NAME: Final[str] = "posting_offsets.npy"
+    POSTING_ROW_IDS_FILE_NAME: Final[str] = "posting_row_ids.bin"
+    POSTING_WEIGHTS_FILE_NAME: Final[str] = "posting_weights.bin"
+    TERM_HASHES_FILE_NAME: Final[str] = "term_hashes.npy"
+    TERM_COLUMN_IDS_FILE_NAME: Final[str] = "term_column_ids.npy"
+    TERM_OFFSETS_FILE_NAME: Final[str] = "term_offsets.npy"
+    TERMS_FILE_NAME: Final[str] = "terms.bin"
+    ARTICLE_OFFSETS_FILE_NAME: Final[str] = "article_offsets.bin"
+    ARTICLES_FILE_NAME: Final[str] = "articles.bin"
+    METADATA_FILE_NAME: Final[str] = "metadata.json"
+
+    def __init__(self: TfIdfMatrix, directory: Path) -> None:
+        """
+        Args:
+            directory (Path): Path to the directory of an already built matrix.
+        """
+        self._directory = directory
+
+        with open(directory / self.METADATA_FILE_NAME) as metadata_file:
+            self._metadata = json.load(metadata_file)
+
+        self._row_offsets = self._load_array(directory / self.ROW_OFFSETS_FILE_NAME, np.int64)
+        self._column_ids = self._load_array(directory / self.COLUMN_IDS_FILE_NAME, np.int32)
+        self._weights = self._load_array(directory / self.WEIGHTS_FILE_NAME, np.float32)
+        self._posting_offsets = np.load(directory / self.POSTING_OFFSETS_FILE_NAME, mmap_mode="r")
+        self._posting_row_ids = self._load_array(directory / self.POSTING_ROW_IDS_FILE_NAME, np.int32)
+        self._posting_weights = self._load_array(directory / self.POSTING_WEIGHTS_FILE_NAME, np.float32)
+        self._term_hashes = np.load(directory / self.TERM_HASHES_FILE_NAME, mmap_mode="r")
+        self._term_column_ids = np.load(directory / self.TERM_COLUMN_IDS_FILE_NAME, mmap_mode="r")
+        self._term_offsets = np.load(directory / self.TERM_OFFSETS_FILE_NAME, mmap_mode="r")
+        self._terms = self._load_array(directory / self.TERMS_FILE_NAME, np.uint8)
+        self._article_offsets = self._load_array(directory / self.ARTICLE_OFFSETS_FILE_NAME, np.int64)
+        self._articles = self._load_array(directory / self.ARTICLES_FILE_NAME, np.uint8)
+
+    @property
+    def version(self: TfIdfMatrix) -> str:
+        """The unique version of the matrix."""
+        return self._metadata["version"]
+
+    @property
+    def statistics_version(self: TfIdfMatrix) -> str:
+        """The version of the statistics the TF-IDFs are calculated by."""
+        return self._metadata["statistics_version"]
+
+    @property
+    def article_count(self: TfIdfMatrix) -> int:
+        return self._metadata["article_count"]
+
+    @property
+    def term_count(self: TfIdfMatrix) -> int:
+        return self._metadata["term_count"]
+
+    @property
+    def nonzero_count(self: TfIdfMatrix) -> int:
+        return self._metadata["nonzero_count"]
+
+    @classmethod
+    def exists(cls: Type[TfIdfMatrix], directory: Path) -> bool:
+        return cls.read_version(directory) is not None
+
+    @classmethod
+    def read_version(cls: Type[TfIdfMatrix], directory: Path) -> Optional[str]:
+        """Read the current version of the matrix in the given directory, or None if it's not built yet."""
+        return VersionedDirectory(directory).read_version()
+
+    @classmethod
+    def open(cls: Type[TfIdfMatrix], directory: Path) -> TfIdfMatrix:
+        """Open the current version of the matrix in the given directory.
+
+        Raises:
+            FileNotFoundError: If the matrix is not built yet.
+        """
+        return VersionedDirectory(directory).open(cls)[1]
+
+    @classmethod
+    def build(
+        cls: Type[TfIdfMatrix], directory: Path, blocks: Iterable[TfIdfMatrixBlock], statistics_version: str
+    ) -> TfIdfMatrix:
+        """Build a matrix of the given blocks of article vectors and write it into the given directory.
+
+        The blocks are appended to the rows one by one, so only a single block is kept in memory. Then the rows are
+        transposed to the postings of the columns in chunks. The matrix is published as a new version of the
+        directory, so a concurrent reader never sees a partially written matrix.
+
+        Args:
+            directory (Path): Path to the versioned directory in which the matrix is to be written.
+            blocks (Iterable[TfIdfMatrixBlock]): The blocks of article vectors.
+            statistics_version (str): The version of the statistics the TF-IDFs are calculated by.
+
+        Returns:
+            TfIdfMatrix: The built matrix.
+        """
+        versioned_directory = VersionedDirectory(directory)
+        with versioned_directory.publish() as (version, version_directory):
+            column_ids: Dict[str, int] = {}
+            article_count = nonzero_count = article_size = 0
+            with open(version_directory / cls.ROW_OFFSETS_FILE_NAME, "wb") as row_offsets_file, open(
+                version_directory / cls.COLUMN_IDS_FILE_NAME, "wb"
+            ) as column_ids_file, open(version_directory / cls.WEIGHTS_FILE_NAME, "wb") as weights_file, open(
+                version_directory / cls.ARTICLE_OFFSETS_FILE_NAME, "wb"
+            ) as article_offsets_file, open(
+                version_directory / cls.ARTICLES_FILE_NAME, "wb"
+            ) as articles_file:
+                write_array(row_offsets_file, np.zeros(1, dtype=np.int64))
+                write_array(article_offsets_file, np.zeros(1, dtype=np.int64))
+                for block in blocks:
+                    # Map the local term IDs of the block to the column IDs of the whole vocabulary.
+                    block_column_ids = np.fromiter(
+                        (column_ids.setdefault(term, len(column_ids)) for term in block.terms),
+                        dtype=np.int32,
+                        count=len(block.terms),
+                    )
+                    write_array(column_ids_file, block_column_ids[np.asarray(block.term_ids, dtype=np.int64)])
+                    write_array(weights_file, np.asarray(block.weights, dtype=np.float32))
+                    write_array(row_offsets_file, np.asarray(block.row_offsets[1:], dtype=np.int64) + nonzero_count)
+
+                    encoded_articles = [json.dumps(article).encode("utf-8") for article in block.articles]
+                    articles_file.write(b"".join(encoded_articles))
+                    write_array(article_offsets_file, get_offsets(encoded_articles)[1:] + article_size)
+
+                    article_count += len(block.articles)
+                    nonzero_count += int(block.row_offsets[-1])
+                    article_size += sum(len(encoded_article) for encoded_article in encoded_articles)
+
+            cls._write_postings(version_directory, len(column_ids))
+            cls._write_vocabulary(version_directory, list(column_ids))
+            with open(version_directory / cls.METADATA_FILE_NAME, "w") as metadata_file:
+                json.dump(
+                    {
+                        "version": version,
+                        "statistics_version": statistics_version,
+                        "article_count": article_count,
+                        "term_count": len(column_ids),
+                        "nonzero_count": nonzero_count,
+                    },
+                    metadata_file,
+                )
+
+        return cls(versioned_directory.get_version_directory(version))
+
+    def lookup_column_ids(self: TfIdfMatrix, terms: Sequence[str]) -> np.ndarray:
+        """Get the column ID of each of the given terms, which is -1 for the terms out of the vocabulary."""
+        column_ids = np.full(len(terms), -1, dtype=np.int64)
+        if not terms or not len(self._term_hashes):
+            return column_ids
+
+        encoded_terms = [term.encode("utf-8") for term in terms]
+        hashes = np.fromiter((hash_term(term) for term in encoded_terms), dtype=np.uint64, count=len(terms))
+        positions = np.minimum(np.searchsorted(self._term_hashes, hashes), len(self._term_hashes) - 1)
+        for i in np.flatnonzero(self._term_hashes[positions] == hashes).tolist():
+            # Verify the hash matches against the stored terms, so a hash collision never returns another column.
+            position = int(positions[i])
+            while position < len(self._term_hashes) and self._term_hashes[position] == hashes[i]:
+                column_id = int(self._term_column_ids[position])
+                if self._get_blob_item(self._terms, self._term_offsets, column_id) == encoded_terms[i]:
+                    column_ids[i] = column_id
+                    break
+                position += 1
+
+        return column_ids
+
+    def calculate_similarities(self: TfIdfMatrix, column_ids: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """Calculate the cosine similarity of the given query vector to each article by a sparse matrix-vector product.
+
+        Only the postings of the query columns are read, so the product costs as much as the number of the articles
+        which share a term with the query, rather than all the nonzero items of the matrix.
+
+        Args:
+            column_ids (np.ndarray): Column IDs of the query terms (in the vocabulary).
+            weights (np.ndarray): The L2 normalized weight of each query term with the same order.
+
+        Returns:
+            np.ndarray: The similarity of each article (row) to the query.
+        """
+        column_ids = np.asarray(column_ids, dtype=np.int64)
+        starts = np.asarray(self._posting_offsets[column_ids])
+        ends = np.asarray(self._posting_offsets[column_ids + 1])
+        posting_ids = concatenate_ranges(starts, ends)
+
+        # Each posting is weighted by the query weight of its column, and summed up by its row.
+        posting_query_weights = np.repeat(np.asarray(weights, dtype=np.float32), ends - starts)
+        return np.bincount(
+            self._posting_row_ids[posting_ids],
+            weights=self._posting_weights[posting_ids] * posting_query_weights,
+            minlength=self.article_count,
+        )
+
+    def get_article(self: TfIdfMatrix, row_id: int) -> Dict[str, Any]:
+        """Get the fields of the article of the given row."""
+        return json.loads(self._get_blob_item(self._articles, self._article_offsets, row_id))
+
+    def get_row(self: TfIdfMatrix, row_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Get the column IDs and weights of the nonzero items in the given row."""
+        start, end = self._row_offsets[row_id], self._row_offsets[row_id + 1]
+        return np.asarray(self._column_ids[start:end]), np.asarray(self._weights[start:end])
+
+    @classmethod
+    def _write_postings(cls: Type[TfIdfMatrix], directory: Path, column_count: int) -> None:
+        """Transpose the rows in the given directory to the postings of the columns (i.e., CSR to CSC format).
+
+        The rows are read in chunks of nonzero items, and the postings of each chunk are scattered into their place,
+        so the postings of each column are sorted by the row IDs.
+        """
+        row_offsets = cls._load_array(directory / cls.ROW_OFFSETS_FILE_NAME, np.int64)
+        column_ids = cls._load_array(directory / cls.COLUMN_IDS_FILE_NAME, np.int32)
+        weights = cls._load_array(directory / cls.WEIGHTS_FILE_NAME, np.float32)
+        nonzero_count = len(column_ids)
+
+        column_sizes = np.zeros(column_count, dtype=np.int64)
+        for chunk_start in range(0, nonzero_count, cls.TRANSPOSE_CHUNK_SIZE):
+            chunk_end = chunk_start + cls.TRANSPOSE_CHUNK_SIZE
+            chunk_column_ids = column_ids[chunk_start:chunk_end]
+            column_sizes += np.bincount(chunk_column_ids, minlength=column_count)
+        posting_offsets = np.zeros(column_count + 1, dtype=np.int64)
+        np.cumsum(column_sizes, out=posting_offsets[1:])
+        np.save(directory / cls.POSTING_OFFSETS_FILE_NAME, posting_offsets)
+
+        posting_row_ids = cls._create_array(directory / cls.POSTING_ROW_IDS_FILE_NAME, np.int32, nonzero_count)
+        posting_weights = cls._create_array(directory / cls.POSTING_WEIGHTS_FILE_NAME, np.float32, nonzero_count)
+        next_posting_ids = posting_offsets[:-1].copy()
+        row_count = len(row_offsets) - 1
+        start_row_id = 0
+        while start_row_id < row_count:
+            end_row_id = max(
+                int(np.searchsorted(row_offsets, row_offsets[start_row_id] + cls.TRANSPOSE_CHUNK_SIZE, "right")) - 1,
+                start_row_id + 1,
+            )
+            start, end = int(row_offsets[start_row_id]), int(row_offsets[end_row_id])
+            end_offset_id = end_row_id + 1
+            chunk_row_ids = np.repeat(
+                np.arange(start_row_id, end_row_id, dtype=np.int32), np.diff(row_offsets[start_row_id:end_offset_id])
+            )
+
+            # Sort the chunk by the columns, and place each item after the previous items of its column.
+            order = np.argsort(column_ids[start:end], kind="stable")
+            chunk_column_ids = np.asarray(column_ids[start:end])[order]
+            unique_column_ids, column_starts, chunk_column_sizes = np.unique(
+                chunk_column_ids, return_index=True, return_counts=True
+            )
+            ranks = np.arange(len(order)) - np.repeat(column_starts, chunk_column_sizes)
+            posting_ids = next_posting_ids[chunk_column_ids] + ranks
+            posting_row_ids[posting_ids] = chunk_row_ids[order]
+            posting_weights[posting_ids] = np.asarray(weights[start:end])[order]
+            next_posting_ids[unique_column_ids] += chunk_column_sizes
+
+            start_row_id = end_row_id
+
+        for array in (posting_row_ids, posting_weights):
+            if isinstance(array, np.memmap):
+                array.flush()
+
+    @classmethod
+    def _write_vocabulary(cls: Type[TfIdfMatrix], directory: Path, terms: List[str]) -> None:
+        encoded_terms = [term.encode("utf-8") for term in terms]
+        term_hashes = np.fromiter((hash_term(term) for term in encoded_terms), dtype=np.uint64, count=len(terms))
+        order = np.argsort(term_hashes, kind="stable")
+        np.save(directory / cls.TERM_HASHES_FILE_NAME, term_hashes[order])
+        np.save(directory / cls.TERM_COLUMN_IDS_FILE_NAME, order.astype(np.int32))
+        np.save(directory / cls.TERM_OFFSETS_FILE_NAME, get_offsets(encoded_terms))
+        with open(directory / cls.TERMS_FILE_NAME, "wb") as terms_file:
+            terms_file.write(b"".join(encoded_terms))
+
+    @staticmethod
+    def _load_array(file_path: Path, dtype: type) -> np.ndarray:
+        # An empty file can't be memory-mapped.
+        return np.memmap(file_path, dtype=dtype, mode="r") if file_path.stat().st_size else np.zeros(0, dtype=dtype)
+
+    @staticmethod
+    def _create_array(file_path: Path, dtype: type, size: int) -> np.ndarray:
+        if not size:
+            file_path.touch()
+            return np.zeros(0, dtype=dtype)
+
+        return np.memmap(file_path, dtype=dtype, mode="w+", shape=(size,))
+
+    @staticmethod
+    def _get_blob_item(blob: np.ndarray, offsets: np.ndarray, position: int) -> bytes:
+        start, end = offsets[position], offsets[position + 1]
+        return bytes(blob[start:end])
+
+
+def write_array(file: BinaryIO, array: np.ndarray) -> None:
+    """Append the items of the given array to the given binary file."""
+    file.write(np.ascontiguousarray(array).tobytes())
+
+
+def concatenate_ranges(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Concatenate the ranges of integers between the given starts (inclusive) and ends (exclusive)."""
+    sizes = np.asarray(ends, dtype=np.int64) - np.asarray(starts, dtype=np.int64)
+    total_size = int(sizes.sum())
+    if not total_size:
+        return np.zeros(0, dtype=np.int64)
+
+    # Each item is its range start plus its rank in the range.
+    range_offsets = np.zeros(len(sizes), dtype=np.int64)
+    np.cumsum(sizes[:-1], out=range_offsets[1:])
+    return np.repeat(np.asarray(starts, dtype=np.int64) - range_offsets, sizes) + np.arange(total_size)
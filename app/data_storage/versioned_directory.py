@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Final, Generic, Iterator, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class VersionedDirectory:
+    """A directory whose content is replaced at once by publishing a new version of it.
+
+    Each version is written into a subdirectory of its own, and a manifest names the current version. The manifest is
+    replaced atomically, so a reader never sees a partially written (or a missing) version. The versions which are
+    no longer current are removed once a newer version is published, while the readers which already opened them keep
+    reading them by their memory maps.
+    """
+
+    MANIFEST_FILE_NAME: Final[str] = "manifest.json"
+    LOCK_FILE_NAME: Final[str] = "manifest.lock"
+    VERSION_PREFIX: Final[str] = "version-"
+    OPEN_ATTEMPT_COUNT: Final[int] = 3
+
+    def __init__(self: VersionedDirectory, directory: Path) -> None:
+        """
+        Args:
+            directory (Path): Path to the directory of the manifest and the versions.
+        """
+        self._directory = directory
+
+    @property
+    def directory(self: VersionedDirectory) -> Path:
+        return self._directory
+
+    def read_version(self: VersionedDirectory) -> Optional[str]:
+        """Read the current version, or None if no version is published yet."""
+        try:
+            with open(self._directory / self.MANIFEST_FILE_NAME) as manifest_file:
+                return json.load(manifest_file)["version"]
+        except FileNotFoundError:
+            return None
+
+    def open(self: VersionedDirectory, open_version: Callable[[Path], T]) -> Tuple[str, T]:
+        """Open the current version by the given function of its directory.
+
+        Returns:
+            Tuple[str, T]: The current version and what it's opened as.
+
+        Raises:
+            FileNotFoundError: If no version is published yet.
+        """
+        for attempt in range(self.OPEN_ATTEMPT_COUNT):
+            version = self.read_version()
+            if version is None:
+                raise FileNotFoundError(f"No version is published in {self._directory}.")
+
+            try:
+                return version, open_version(self.get_version_directory(version))
+            except FileNotFoundError:
+                # The version may be removed by publishing a newer version right after the manifest is read.
+                if attempt == self.OPEN_ATTEMPT_COUNT - 1:
+                    raise
+
+        raise FileNotFoundError(f"No version could be opened in {self._directory}.")
+
+    @contextmanager
+    def publish(self: VersionedDirectory) -> Iterator[Tuple[str, Path]]:
+        """Write a new version into the yielded directory, which becomes the current version once the block exits.
+
+        The version is discarded if the block raises an exception.
+
+        Yields:
+            Tuple[str, Path]: The new version and the directory in which it's to be written.
+        """
+        version = uuid.uuid4().hex
+        temporary_directory = self._directory / f".{self.VERSION_PREFIX}{version}"
+        temporary_directory.mkdir(parents=True)
+        try:
+            yield version, temporary_directory
+
+            with self._lock():
+                os.replace(temporary_directory, self.get_version_directory(version))
+                self._write_manifest(version)
+        finally:
+            shutil.rmtree(temporary_directory, ignore_errors=True)
+
+    def get_version_directory(self: VersionedDirectory, version: str) -> Path:
+        """Get the directory of the given published version."""
+        return self._directory / f"{self.VERSION_PREFIX}{version}"
+
+    @contextmanager
+    def _lock(self: VersionedDirectory) -> Iterator[None]:
+        """Hold the exclusive lock of the manifest, so the versions published concurrently are never removed."""
+        with open(self._directory / self.LOCK_FILE_NAME, "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write_manifest(self: VersionedDirectory, version: str) -> None:
+        """Replace the manifest atomically and remove the versions which are no longer current."""
+        manifest_path = self._directory / self.MANIFEST_FILE_NAME
+        temporary_manifest_path = manifest_path.with_name(f".{manifest_path.name}.{uuid.uuid4().hex}")
+        with open(temporary_manifest_path, "w") as manifest_file:
+            json.dump({"version": version}, manifest_file)
+        os.replace(temporary_manifest_path, manifest_path)
+
+        for version_path in self._directory.iterdir():
+            if (
+                version_path.name.startswith(self.VERSION_PREFIX)
+                and version_path.name != f"{self.VERSION_PREFIX}{version}"
+            ):
+                shutil.rmtree(version_path, ignore_errors=True)
+
+
+class SharedVersion(Generic[T]):
+    """The current version of a versioned directory opened once and shared (e.g., by all the requests of a process).
+
+    The version is reopened if a newer version is published when it's checked after the refresh interval.
+    """
+
+    def __init__(self: SharedVersion[T], open_version: Callable[[Path], T]) -> None:
+        """
+        Args:
+            open_version (Callable[[Path], T]): The function opening a version by its directory.
+        """
+        self._open_version = open_version
+        self._opened: Optional[Tuple[Path, str, T]] = None
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def get(self: SharedVersion[T], directory: Path, refresh_interval: float) -> Optional[T]:
+        """Get the current version of the given versioned directory, or None if no version is published yet.
+
+        Args:
+            directory (Path): Path to the versioned directory.
+            refresh_interval (float): Number of seconds after which the version is checked again.
+
+        Returns:
+            Optional[T]: What the current version is opened as.
+        """
+        opened = self._opened
+        if time.monotonic() < self._checked_at + refresh_interval and (opened is None or opened[0] == directory):
+            return opened[2] if opened is not None else None
+
+        with self._lock:
+            versioned_directory = VersionedDirectory(directory)
+            version = versioned_directory.read_version()
+            if version is None:
+                self._opened = None
+            elif self._opened is None or self._opened[:2] != (directory, version):
+                try:
+                    self._opened = (directory, *versioned_directory.open(self._open_version))
+                except FileNotFoundError:
+                    self._opened = None
+            self._checked_at = time.monotonic()
+
+            return self._opened[2] if self._opened is not None else None
+
+    def invalidate(self: SharedVersion[T]) -> None:
+        """Check the version again on the next access (e.g., once a new version is published by this process)."""
+        with self._lock:
+            self._checked_at = float("-inf")
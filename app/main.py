@@ -1,20 +1,161 @@
-from typing import List, Dict, Any
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import List, Dict, Any, AsyncIterator, Tuple, Optional, Callable, Awaitable, Iterable, TypeVar
 
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.exceptions import HTTPException
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
 
-from app.utility.data_extraction import extract_content_from_page, validate_url
+from app.data_storage.elastic_database import ElasticDatabase
+from app.services.extraction.page_content_extraction import PageContentExtraction
+from app.services.ingestion.page_ingestion import PageIngestion
+from app.services.statistics.dynamic_statistics_cache import DynamicStatisticsCache
+from app.utility.data_extraction import normalize_url, validate_url
+from app.utility.metrics import Metrics, format_server_timing, measure_stage, record_request_stages
+from app.utility.page_fetcher import PageFetcher, PageFetchError, PageFetchTimeoutError
+from app.utility.profiling import RequestProfiler, run_profiled
+from app.utility.scoring_executor import ScoringError, ScoringExecutor, ScoringQueueFullError, ScoringTimeoutError
+from app.utility.single_flight import SingleFlight
 
 from app.services.statistics.dynamic_statistics_calculation import DynamicStatisticsCalculation
 from app.services.statistics.static_statistics_calculation import StaticStatisticsCalculation
+from app.services.statistics.statistics_calculation import StatisticsCalculation
+from app.services.statistics.term_scores import TermScores
 
 load_dotenv(".env")
 app = FastAPI()
+app.state.ready = False
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+# The concurrent identical requests in flight, which are coalesced by their normalized page URLs (and modes).
+page_content_flight = SingleFlight("page_content")
+term_scores_flight = SingleFlight("tfidf")
+
+
+def collect_cache_metrics() -> Iterable[Tuple[str, Dict[str, str], float]]:
+    """Collect the sizes and the hit/miss counters of the process-wide caches."""
+    cache_statistics = {
+        "result": StatisticsCalculation.get_result_cache().get_statistics(),
+        "dynamic_statistics": DynamicStatisticsCache.get_instance().get_statistics(),
+        "page_content": {
+            **PageContentExtraction.get_statistics(),
+            "size": PageContentExtraction.get_cache().get_statistics()["memory_size"],
+        },
+    }
+    for cache, statistics in cache_statistics.items():
+        yield "cache_size", {"cache": cache}, statistics["size"]
+        for counter in ("hits", "misses", "revalidations"):
+            if counter in statistics:
+                yield f"cache_{counter}_total", {"cache": cache}, statistics[counter]
+
+
+def collect_scoring_metrics() -> Iterable[Tuple[str, Dict[str, str], float]]:
+    """Collect the queue depth and the worker utilization of the scoring executor."""
+    statistics = ScoringExecutor.get_instance().get_statistics()
+    yield "scoring_workers", {}, statistics["workers"]
+    yield "scoring_busy_workers", {}, statistics["busy_workers"]
+    yield "scoring_worker_utilization", {}, statistics["utilization"]
+    yield "scoring_queue_depth", {}, statistics["queue_depth"]
+    yield "scoring_max_queue_size", {}, statistics["max_queue_size"]
+    yield "scoring_worker_busy_seconds_total", {}, statistics["busy_seconds"]
+
+
+def collect_ingestion_metrics() -> Iterable[Tuple[str, Dict[str, str], float]]:
+    """Collect the number of the pages waiting to be written by the page ingestion, if it's enabled."""
+    page_ingestion = PageIngestion.get_instance()
+    if page_ingestion is None:
+        return
+
+    statistics = page_ingestion.get_statistics()
+    yield "ingestion_queue_depth", {}, statistics["queue_depth"]
+    yield "ingestion_spooled_pages", {}, statistics["spooled_pages"]
+    yield "ingestion_max_queue_size", {}, statistics["max_queue_size"]
+
+
+Metrics.register_collector(collect_cache_metrics)
+Metrics.register_collector(collect_scoring_metrics)
+Metrics.register_collector(collect_ingestion_metrics)
+
+
+@app.middleware("http")
+async def add_server_timing(request: Request, call_next: Callable[[Request], Awaitable[Response]]) -> Response:
+    """Measure the duration of each request, and report the durations of its stages by a `Server-Timing` header.
+
+    The stages of a streamed response which run after its headers are sent are only reported in the metrics.
+    """
+    start_time = time.perf_counter()
+    with record_request_stages() as stage_durations:
+        response = await call_next(request)
+    duration = time.perf_counter() - start_time
+
+    # Only the path templates of the matched routes (e.g., `/profiles/{profile_id}`) are used as labels, so the number
+    # of the metrics stays bounded.
+    route = request.scope.get("route")
+    endpoint = getattr(route, "path", "unmatched")
+    Metrics.observe("http_request_duration_seconds", duration, endpoint=endpoint)
+    response.headers["Server-Timing"] = format_server_timing({**stage_durations, "total": duration})
+
+    return response
+
+
+@app.middleware("http")
+async def profile_request(request: Request, call_next: Callable[[Request], Awaitable[Response]]) -> Response:
+    """Profile a `/tfidf`, `/related_articles` or `/page_content` request, if it's opted in and profiling is enabled.
+
+    The ID of the captured profile is returned by the `X-Profile-Id` header.
+    """
+    profiler = RequestProfiler.get_instance()
+    if request.url.path not in ("/tfidf", "/related_articles", "/page_content") or not profiler.should_profile(
+        request.headers.get(profiler.PROFILE_HEADER)
+    ):
+        return await call_next(request)
+
+    with profiler.profile(request.url.path, str(request.url)) as capture:
+        response = await call_next(request)
+    if capture is not None and capture.profile_id is not None:
+        response.headers["X-Profile-Id"] = capture.profile_id
+
+    return response
+
+
+@app.on_event("startup")
+def warm_up() -> None:
+    """Load the analyzers, the static term statistics and the Elastic client once per process before serving requests.
+
+    The heavy modules (e.g., spaCy) are not imported by the API module, but loaded here, so they're loaded
+    before the API gets ready rather than by the first request. The scoring workers (if any) load them as well.
+    The page ingestion (if enabled) starts writing the pages left in its spool too.
+    """
+    StaticStatisticsCalculation.warm_up()
+    ElasticDatabase.get_client()
+    ScoringExecutor.get_instance().start()
+    page_ingestion = PageIngestion.get_instance()
+    if page_ingestion is not None:
+        page_ingestion.start()
+
+    app.state.ready = True
+
+
+@app.on_event("shutdown")
+async def close_connections() -> None:
+    """Close the pooled connections for fetching pages, and stop the scoring workers and the page ingestion."""
+    await PageFetcher.get_instance().close()
+    ScoringExecutor.get_instance().shutdown()
+    page_ingestion = PageIngestion.get_instance()
+    if page_ingestion is not None:
+        await asyncio.to_thread(page_ingestion.shutdown, float(os.getenv("INGESTION_SHUTDOWN_TIMEOUT", 10)))
 
 
 @app.get("/tfidf", name="important_terms")
-def get_terms_with_highest_tf_idf(url: str, limit: int, dynamic: bool = False) -> Dict[str, List[Dict[str, Any]]]:
+async def get_terms_with_highest_tf_idf(url: str, limit: int, dynamic: bool = False) -> JSONResponse:
     """Find terms in the content of the given page URL with highest TF-IDF.
 
     Args:
@@ -23,19 +164,233 @@ def get_terms_with_highest_tf_idf(url: str, limit: int, dynamic: bool = False) -
         dynamic (bool): Whether to use dynamic calculation (True) or static calculation (True). Defaults to True.
 
     Returns:
-        Dict[str, List[Dict[str, Any]]]: A collection of terms and their TF-IDFs sorted by descending order of TF-IDFs.
+        JSONResponse: A collection of terms and their TF-IDFs sorted by descending order of TF-IDFs (`terms`).
     """
     if not validate_url(url):
         raise HTTPException(status_code=400, detail="URL is invalid.")
 
-    article_content = extract_content_from_page(url)
+    # The pages which are corpus articles are answered by their precomputed terms, without being fetched.
+    # Looking them up may read the index from disk (or rescore them), so it doesn't block the event loop.
+    if not dynamic:
+        static_calculation_service = StaticStatisticsCalculation()
+        corpus_article_terms = await asyncio.to_thread(
+            run_profiled, static_calculation_service.rank_corpus_article_terms, url, limit
+        )
+        if corpus_article_terms is not None:
+            with measure_stage("serialize", static_calculation_service.CALCULATION_MODE):
+                return JSONResponse({"terms": corpus_article_terms})
+
     calculation_service = DynamicStatisticsCalculation() if dynamic else StaticStatisticsCalculation()
 
-    return {"terms": calculation_service.get_terms_with_highest_tf_idf(article_content, limit)}
+    # The concurrent requests of the same page and mode share the scores of its terms, but each is ranked by its limit.
+    term_scores = await term_scores_flight.run(
+        (normalize_url(url) or url, calculation_service.CALCULATION_MODE),
+        lambda: score_page_terms(calculation_service, url),
+    )
+    with measure_stage("rank", calculation_service.CALCULATION_MODE):
+        ranked_terms = term_scores.rank(limit)
+    with measure_stage("serialize", calculation_service.CALCULATION_MODE):
+        return JSONResponse({"terms": ranked_terms})
+
+
+async def score_page_terms(calculation_service: StatisticsCalculation, url: str) -> TermScores:
+    """Score the terms in the content of the given page URL by their TF-IDF.
+
+    The scored page is submitted to the page ingestion (if enabled) to be added to the articles in the background.
+
+    Args:
+        calculation_service (StatisticsCalculation): The static or dynamic calculation.
+        url (str): URL of the page whose content are to be analyzed.
+
+    Returns:
+        TermScores:
+    """
+    article_content = await fetch_page_content(url)
+    if isinstance(calculation_service, StaticStatisticsCalculation):
+        term_scores = (await score_static_contents(calculation_service, [article_content]))[0]
+    else:
+        # The dynamic calculation is blocking on the database, so it runs in a worker thread.
+        term_scores = await asyncio.to_thread(run_profiled, calculation_service.score_terms, article_content)
+
+    page_ingestion = PageIngestion.get_instance()
+    if page_ingestion is not None:
+        # The terms of the dynamic calculation are analyzed by Elastic, so the page is tokenized once it's written.
+        static = isinstance(calculation_service, StaticStatisticsCalculation)
+        page_ingestion.submit(url, article_content, term_scores.terms.tolist() if static else None)
+
+    return term_scores
+
+
+async def score_static_contents(
+    calculation_service: StaticStatisticsCalculation, contents: List[str]
+) -> List[TermScores]:
+    """Score the terms in each of the given contents by the static calculation.
+
+    The scoring workers may be other processes, so the result cache of this process is looked up and updated here,
+    and only the contents missing in the cache are submitted to the scoring executor.
+
+    Args:
+        calculation_service (StaticStatisticsCalculation): The static calculation.
+        contents (List[str]): A collection of contents in which terms are to be analyzed.
+
+    Returns:
+        List[TermScores]: The TF-IDFs of the terms in each content in the same order.
+    """
+    # The statistics version may be checked in the data lake, so the lookup doesn't block the event loop.
+    cache_keys, term_scores_by_key = await asyncio.to_thread(calculation_service.get_cached_term_scores, contents)
+
+    missing_contents = {key: content for key, content in zip(cache_keys, contents) if key not in term_scores_by_key}
+    if missing_contents:
+        missing_term_scores_batch = await run_scoring_job(
+            calculation_service.calculate_term_tf_idfs_batch, list(missing_contents.values())
+        )
+        missing_term_scores_by_key = dict(zip(missing_contents.keys(), missing_term_scores_batch))
+        StatisticsCalculation.get_result_cache().set_many(missing_term_scores_by_key)
+        term_scores_by_key.update(missing_term_scores_by_key)
+
+    return [term_scores_by_key[key] for key in cache_keys]
+
+
+class BatchTfIdfRequest(BaseModel):
+    urls: List[str] = []
+    texts: List[str] = []
+    limit: int
+    dynamic: bool = False
+
+
+@app.post("/tfidf/batch", name="important_terms_batch")
+async def get_terms_with_highest_tf_idf_batch(request: BatchTfIdfRequest) -> StreamingResponse:
+    """Find terms with highest TF-IDF in the content of each given page URL and each given text.
+
+    The pages are fetched concurrently (up to a bounded number at a time), and the contents ready at the same time are
+    analyzed together. The result of each page or text is streamed back as a JSON line (NDJSON) as soon as it's
+    analyzed.
+    Each line includes either the `url` or the `text_index` (in the given texts) of the document, and
+    either its `terms` sorted by descending order of TF-IDFs, or an `error`.
+
+    Args:
+        request (BatchTfIdfRequest): The page URLs and texts to be analyzed, maximum number of terms to be returned
+                                     for each document, and whether to use dynamic calculation.
+
+    Returns:
+        StreamingResponse:
+    """
+    max_document_count = int(os.getenv("BATCH_MAX_DOCUMENT_COUNT", 1000))
+    if len(request.urls) + len(request.texts) > max_document_count:
+        raise HTTPException(status_code=413, detail=f"At most {max_document_count} documents can be analyzed at once.")
+
+    calculation_service = DynamicStatisticsCalculation() if request.dynamic else StaticStatisticsCalculation()
+
+    return StreamingResponse(
+        stream_terms_with_highest_tf_idf(calculation_service, request), media_type="application/x-ndjson"
+    )
+
+
+async def stream_terms_with_highest_tf_idf(
+    calculation_service: StatisticsCalculation, request: BatchTfIdfRequest
+) -> AsyncIterator[str]:
+    """Analyze the documents of the given batch request as they get ready, and yield a JSON line per document."""
+    batch_size = int(os.getenv("BATCH_TOKENIZATION_SIZE", 32))
+    limit = request.limit
+    documents: asyncio.Queue[Tuple[Dict[str, Any], Optional[str], Optional[str]]] = asyncio.Queue()
+    fetch_semaphore = asyncio.Semaphore(int(os.getenv("BATCH_MAX_CONCURRENT_FETCH_COUNT", 16)))
+
+    async def fetch_document(url: str) -> None:
+        # Every document has to be put into the queue (with an error if need be), or the response never ends.
+        try:
+            if not validate_url(url):
+                raise HTTPException(status_code=400, detail="URL is invalid.")
+            async with fetch_semaphore:
+                content = await fetch_page_content(url)
+            await documents.put(({"url": url}, content, None))
+        except HTTPException as error:
+            await documents.put(({"url": url}, None, error.detail))
+        except Exception:
+            logger.exception("Extracting content of the page %s failed.", url)
+            await documents.put(({"url": url}, None, "Page content could not be extracted."))
+
+    for text_index, text in enumerate(request.texts):
+        documents.put_nowait(({"text_index": text_index}, text, None))
+    fetch_tasks = [asyncio.create_task(fetch_document(url)) for url in request.urls]
+
+    remaining_document_count = len(request.urls) + len(request.texts)
+    try:
+        while remaining_document_count:
+            # Take all the documents ready so far (up to the batch size) to analyze them together.
+            ready_documents = [await documents.get()]
+            while not documents.empty() and len(ready_documents) < batch_size:
+                ready_documents.append(documents.get_nowait())
+            remaining_document_count -= len(ready_documents)
+
+            for identifier, _, error in ready_documents:
+                if error is not None:
+                    yield json.dumps({**identifier, "error": error}) + "\n"
+
+            analyzed_documents = [
+                (identifier, content) for identifier, content, _ in ready_documents if content is not None
+            ]
+            if not analyzed_documents:
+                continue
+
+            contents = [content for _, content in analyzed_documents]
+            try:
+                if isinstance(calculation_service, StaticStatisticsCalculation):
+                    term_scores_batch = await score_static_contents(calculation_service, contents)
+                    with measure_stage("rank", calculation_service.CALCULATION_MODE):
+                        ranked_terms_batch = [term_scores.rank(limit) for term_scores in term_scores_batch]
+                else:
+                    ranked_terms_batch = await asyncio.to_thread(calculation_service.rank_terms_batch, contents, limit)
+            except Exception as error:
+                # The response is already started, so the documents which can't be analyzed get an error line.
+                if not isinstance(error, HTTPException):
+                    logger.exception("Analyzing a batch of %d documents failed.", len(analyzed_documents))
+                detail = error.detail if isinstance(error, HTTPException) else "Terms could not be analyzed."
+                for identifier, _ in analyzed_documents:
+                    yield json.dumps({**identifier, "error": detail}) + "\n"
+                continue
+
+            with measure_stage("serialize", calculation_service.CALCULATION_MODE):
+                lines = [
+                    json.dumps({**identifier, "terms": ranked_terms}) + "\n"
+                    for (identifier, _), ranked_terms in zip(analyzed_documents, ranked_terms_batch)
+                ]
+            for line in lines:
+                yield line
+    finally:
+        for fetch_task in fetch_tasks:
+            fetch_task.cancel()
+
+
+@app.get("/related_articles", name="related_articles")
+async def get_related_articles(url: str, limit: int) -> JSONResponse:
+    """Find the corpus articles which are most similar to the content of the given page URL.
+
+    The page is compared to the corpus articles by cosine similarity of their TF-IDF vectors, calculated statically.
+
+    Args:
+        url (str): URL of the page whose content are to be compared.
+        limit (int): Maximum number of articles to be returned.
+
+    Returns:
+        JSONResponse: A collection of articles (`id`, `title` and `url`) and their similarities sorted by descending
+                      order of similarity (`articles`).
+    """
+    if not validate_url(url):
+        raise HTTPException(status_code=400, detail="URL is invalid.")
+
+    article_content = await fetch_page_content(url)
+    calculation_service = StaticStatisticsCalculation()
+
+    related_articles = await run_scoring_job(calculation_service.find_related_articles, article_content, limit, url)
+    if related_articles is None:
+        raise HTTPException(status_code=503, detail="TF-IDF matrix of articles is not prepared yet.")
+
+    with measure_stage("serialize", calculation_service.CALCULATION_MODE):
+        return JSONResponse({"articles": related_articles})
 
 
 @app.get("/page_content", name="page_content")
-def get_page_content(url: str) -> Dict[str, str]:
+async def get_page_content(url: str) -> Dict[str, str]:
     """Extract content of the page with the given URL.
 
     Args:
@@ -47,7 +402,127 @@ def get_page_content(url: str) -> Dict[str, str]:
     if not validate_url(url):
         raise HTTPException(status_code=400, detail="URL is invalid.")
 
-    return {"page_content": extract_content_from_page(url)}
+    return {"page_content": await fetch_page_content(url)}
+
+
+async def run_scoring_job(function: Callable[..., T], *args: Any) -> T:
+    """Run the given CPU-bound calculation by the scoring executor, and convert its errors to HTTP errors.
+
+    Args:
+        function (Callable[..., T]): The calculation (e.g., a method of a static calculation service).
+        *args (Any): The arguments of the calculation.
+
+    Returns:
+        T: The result of the calculation.
+    """
+    try:
+        return await ScoringExecutor.get_instance().run(function, *args)
+    except ScoringQueueFullError as error:
+        raise HTTPException(status_code=503, detail=str(error), headers={"Retry-After": str(error.retry_after)})
+    except ScoringTimeoutError as error:
+        raise HTTPException(status_code=504, detail=str(error))
+    except ScoringError as error:
+        raise HTTPException(status_code=503, detail=str(error))
+
+
+async def fetch_page_content(url: str) -> str:
+    """Extract content of the page with the given URL, and convert fetch errors to HTTP errors.
+
+    The concurrent requests of the same page share a single extraction.
+
+    Args:
+        url (str): URL of the page whose content are to be extracted.
+
+    Returns:
+        str:
+    """
+    return await page_content_flight.run(normalize_url(url) or url, lambda: extract_page_content(url))
+
+
+async def extract_page_content(url: str) -> str:
+    try:
+        return await PageContentExtraction().extract_content(url)
+    except PageFetchTimeoutError as error:
+        raise HTTPException(status_code=504, detail=str(error))
+    except PageFetchError as error:
+        raise HTTPException(status_code=502, detail=str(error))
+
+
+@app.get("/metrics", name="metrics", response_class=PlainTextResponse)
+def get_metrics() -> str:
+    """Get the metrics of the API process in Prometheus text format.
+
+    These include the duration histograms of the requests and of each stage of analyzing a page (i.e., fetch, extract,
+    tokenize, DF lookup, score, rank and serialize) by calculation mode, the Elastic calls, the cache counters,
+    the queue depth and the worker utilization of the scoring executor, the number of coalesced requests, and the
+    pages and flushes of the page ingestion.
+
+    Returns:
+        str:
+    """
+    return Metrics.render()
+
+
+@app.get("/profiles", name="profiles")
+def get_profiles(request: Request) -> Dict[str, List[Dict[str, Any]]]:
+    """List the recently captured profiles of requests, the most recent first.
+
+    The request should have the `X-Profile` header set to the profiling token, if one is configured.
+
+    Args:
+        request (Request):
+
+    Returns:
+        Dict[str, List[Dict[str, Any]]]: The metadata (e.g., ID, endpoint, duration) of each profile (`profiles`).
+    """
+    profiler = get_authorized_profiler(request)
+
+    return {"profiles": profiler.store.list()}
+
+
+@app.get("/profiles/{profile_id}", name="profile")
+def get_profile(request: Request, profile_id: str) -> FileResponse:
+    """Download a captured profile of a request in pstats format (e.g., to be viewed by `snakeviz`).
+
+    The request should have the `X-Profile` header set to the profiling token, if one is configured.
+
+    Args:
+        request (Request):
+        profile_id (str): ID of the profile.
+
+    Returns:
+        FileResponse:
+    """
+    profiler = get_authorized_profiler(request)
+    profile_path = profiler.store.get_profile_path(profile_id)
+    if profile_path is None:
+        raise HTTPException(status_code=404, detail="Profile is not found.")
+
+    return FileResponse(profile_path, media_type="application/octet-stream", filename=profile_path.name)
+
+
+def get_authorized_profiler(request: Request) -> RequestProfiler:
+    """Get the profiler, if profiling is enabled and the request has the profiling token (if one is configured)."""
+    profiler = RequestProfiler.get_instance()
+    if not profiler.enabled:
+        raise HTTPException(status_code=404, detail="Profiling is not enabled.")
+    if not profiler.is_authorized(request.headers.get(profiler.PROFILE_HEADER)):
+        raise HTTPException(status_code=403, detail="Profiling token is invalid.")
+
+    return profiler
+
+
+@app.get("/ready", name="readiness")
+def get_readiness() -> Dict[str, bool]:
+    """Check whether the API is ready to serve requests, i.e., the analyzers and the statistics are loaded.
+
+    Returns:
+        Dict[str, bool]:
+    """
+    if not app.state.ready:
+        raise HTTPException(status_code=503, detail="API is not ready yet.")
+
+    return {"ready": True}
 
 
 # @app.on_event("shutdown")
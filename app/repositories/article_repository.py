@@ -1,16 +1,56 @@
 from __future__ import annotations
 
+import fcntl
+import hashlib
+import json
 import os
+import shutil
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
 from functools import lru_cache
-from typing import Dict, List
-
-import dask.dataframe as dd
-import pandas as pd
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Collection, Dict, Iterable, Iterator, List, Mapping, Optional, Set, Tuple, Union
 
+from app.data_storage.article_term_index import ArticleTermIndex, ArticleTerms
 from app.data_storage.elastic_database import ElasticDatabase
+from app.data_storage.segmented_term_statistics import SegmentedTermStatistics, TermStatisticsSnapshot
+from app.data_storage.term_sketch import TermSketch, TermSketchStore
+from app.data_storage.tf_idf_matrix import TfIdfMatrix, TfIdfMatrixBlock
+from app.data_storage.versioned_directory import SharedVersion
+
+# The corpus (i.e., dataframe) dependencies are only needed by the ETL and by building the term statistics,
+# so they're imported on demand to not be loaded by the API.
+if TYPE_CHECKING:
+    import dask.dataframe as dd
+    import pandas as pd
 
 
 class ArticleRepository:
+    # The metadata of the Parquet files of the corpus, whose name is ignored by Parquet readers.
+    CORPUS_METADATA_FILE_NAME = "_corpus_metadata.json"
+
+    # The modes of the static term statistics: exact DFs, or approximate DFs by a term sketch in bounded memory.
+    EXACT_TERM_STATISTICS_MODE = "exact"
+    APPROXIMATE_TERM_STATISTICS_MODE = "approximate"
+
+    # The term statistics snapshot is shared by all the repository instances in the process.
+    _term_statistics_snapshot: Optional[TermStatisticsSnapshot] = None
+    _term_statistics_checked_at = float("-inf")
+    _term_statistics_lock = threading.Lock()
+
+    # The index of ranked terms by article URL is shared by all the repository instances in the process too.
+    _article_term_index: SharedVersion[ArticleTermIndex] = SharedVersion(ArticleTermIndex)
+
+    # The TF-IDF matrix of the corpus articles is shared by all the repository instances in the process too.
+    _tf_idf_matrix: SharedVersion[TfIdfMatrix] = SharedVersion(TfIdfMatrix)
+
+    # The term sketch of the approximate statistics is shared by all the repository instances in the process too.
+    _term_sketch: SharedVersion[TermSketchStore] = SharedVersion(TermSketchStore)
+    _term_sketch_article_keys: Optional[Tuple[str, Optional[Set[str]]]] = None
+
     @property
     def index(self: ArticleRepository) -> str:
         return "articles"
@@ -65,10 +105,44 @@ class ArticleRepository:
     def corpus_bucket(self: ArticleRepository) -> str:
         return os.getenv("CORPUS_BUCKET", "corpus")
 
+    @property
+    def corpus_parquet_key(self: ArticleRepository) -> str:
+        return os.getenv("CORPUS_PARQUET_KEY", "corpus_parquet")
+
+    @property
+    def article_key_field(self: ArticleRepository) -> str:
+        """The corpus field which identifies each article uniquely."""
+        return os.getenv("ARTICLE_KEY_FIELD", "id")
+
     @property
     def term_statistics_key(self: ArticleRepository) -> str:
         return os.getenv("TERM_STATISTICS_KEY", "stats/term_statistics.parquet")
 
+    @property
+    def term_statistics_store_key(self: ArticleRepository) -> str:
+        return os.getenv("TERM_STATISTICS_STORE_KEY", "stats/term_statistics")
+
+    @property
+    def term_statistics_mode(self: ArticleRepository) -> str:
+        """The mode of the static term statistics (i.e., exact or approximate)."""
+        mode = os.getenv("TERM_STATISTICS_MODE", self.EXACT_TERM_STATISTICS_MODE)
+        if mode not in (self.EXACT_TERM_STATISTICS_MODE, self.APPROXIMATE_TERM_STATISTICS_MODE):
+            raise ValueError(f"Term statistics mode {mode} is not supported.")
+
+        return mode
+
+    @property
+    def term_sketch_key(self: ArticleRepository) -> str:
+        return os.getenv("TERM_SKETCH_KEY", "stats/term_sketch")
+
+    @property
+    def article_term_index_key(self: ArticleRepository) -> str:
+        return os.getenv("ARTICLE_TERM_INDEX_KEY", "stats/article_term_index")
+
+    @property
+    def tf_idf_matrix_key(self: ArticleRepository) -> str:
+        return os.getenv("TF_IDF_MATRIX_KEY", "stats/tf_idf_matrix")
+
     def create_index(self: ArticleRepository, force: bool = False) -> None:
         """Create an Elastic index for articles.
 
@@ -81,14 +155,75 @@ class ArticleRepository:
         """Check whether the article index already exists."""
         return ElasticDatabase.index_exists(self.index)
 
-    def insert_articles(self: ArticleRepository, articles: pd.DataFrame) -> None:
-        """Insert a batch of articles into the database.
+    def insert_articles(
+        self: ArticleRepository, articles: pd.DataFrame, chunk_size: int = 500, thread_count: int = 4
+    ) -> Iterator[bool]:
+        """Insert a batch of articles into the database lazily, as the returned results are consumed.
+
+        Each article is inserted by a deterministic ID, so inserting the same article again overwrites it.
 
         Args:
             articles (pd.DataFrame): A batch of articles.
+            chunk_size (int): Number of articles per bulk request.
+            thread_count (int): Number of parallel bulk requests.
+
+        Returns:
+            Iterator[bool]: Whether each article is inserted successfully.
         """
-        articles_dict = articles[["url", "content"]].to_dict(orient="records")
-        ElasticDatabase.insert_bulk(self.index, articles_dict)
+        actions = (
+            {"_id": self.get_article_id(article), "_source": {"url": article["url"], "content": article["content"]}}
+            for article in articles[[self.article_key_field, "url", "content"]].to_dict(orient="records")
+        )
+        for inserted, _ in ElasticDatabase.insert_bulk(self.index, actions, chunk_size, thread_count):
+            yield inserted
+
+    def insert_pages(self: ArticleRepository, pages: Iterable[Tuple[str, str, str]], chunk_size: int = 500) -> int:
+        """Insert the given pages (e.g., requested from the API) into the database as articles by bulk requests.
+
+        Each page is inserted by a deterministic ID of its article key (like the corpus articles), so inserting the
+        same page again overwrites it.
+
+        Args:
+            pages (Iterable[Tuple[str, str, str]]): The article key (i.e., the normalized URL), the URL and the content
+                                                    of each page.
+            chunk_size (int): Number of pages per bulk request.
+
+        Returns:
+            int: Number of the inserted pages.
+        """
+        actions = (
+            {
+                "_id": self.get_article_id({self.article_key_field: article_key}),
+                "_source": {"url": url, "content": content},
+            }
+            for article_key, url, content in pages
+        )
+        return sum(inserted for inserted, _ in ElasticDatabase.insert_bulk(self.index, actions, chunk_size, 1))
+
+    def get_article_id(self: ArticleRepository, article: Dict[str, Any]) -> str:
+        """Get the deterministic document ID of the given article by the hash of its key (or its URL if no key)."""
+        article_key = article.get(self.article_key_field) or article["url"]
+        return hashlib.blake2b(str(article_key).encode("utf-8"), digest_size=16).hexdigest()
+
+    def disable_index_refresh(self: ArticleRepository) -> Dict[str, Any]:
+        """Disable the refreshes and the replicas of the article index to speed up a bulk load.
+
+        Returns:
+            Dict[str, Any]: The previous settings to be restored by `restore_index_settings`.
+        """
+        index_settings = ElasticDatabase.get_index_settings(self.index)
+        previous_settings = {
+            "refresh_interval": index_settings.get("refresh_interval"),
+            "number_of_replicas": index_settings.get("number_of_replicas"),
+        }
+        ElasticDatabase.update_index_settings(self.index, {"refresh_interval": "-1", "number_of_replicas": 0})
+
+        return previous_settings
+
+    def restore_index_settings(self: ArticleRepository, settings: Dict[str, Any]) -> None:
+        """Restore the given settings of the article index, and make all the loaded articles searchable."""
+        ElasticDatabase.update_index_settings(self.index, settings)
+        ElasticDatabase.refresh_index(self.index)
 
     def search_articles_by_terms(
         self: ArticleRepository, terms: List[str], fields: List[str], limit: int, offset: int = 0
@@ -113,6 +248,30 @@ class ArticleRepository:
 
         return ElasticDatabase.multi_search(self.index, searches)["responses"]
 
+    def count_articles_by_terms(self: ArticleRepository, terms: List[str], field: str) -> Tuple[Dict[str, int], int]:
+        """Count articles which contain each of the given terms, and total articles in a single search.
+
+        The terms should already be analyzed (e.g., returned by term vectors), since they are matched exactly.
+
+        Args:
+            terms (List[str]): A collection of analyzed terms.
+            field (str): The article field to search for the terms.
+
+        Returns:
+            Tuple[Dict[str, int], int]: A collection of terms as keys and their article counts as values,
+                                        and the count of total articles in all shards.
+        """
+        search_body: Dict[str, Any] = {"size": 0, "track_total_hits": True, "query": {"match_all": {}}}
+        if terms:
+            # Elastic rejects a filters aggregation without filters, so only the total articles are counted then.
+            search_body["aggs"] = {
+                "term_counts": {"filters": {"filters": {term: {"term": {field: term}} for term in terms}}}
+            }
+        response = ElasticDatabase.search(self.index, search_body)
+        term_buckets = response["aggregations"]["term_counts"]["buckets"] if terms else {}
+
+        return {term: term_buckets[term]["doc_count"] for term in terms}, response["hits"]["total"]["value"]
+
     def get_article_content_term_statistics(
         self: ArticleRepository, content: str, additional_statistics: bool
     ) -> Dict[str, dict]:
@@ -125,9 +284,33 @@ class ArticleRepository:
         Returns:
             Dict[str, Any] A collection of term statistics for each term.
         """
-        return ElasticDatabase.get_term_vectors(
-            self.index, {"content": content}, fields=["content"], term_statistics=additional_statistics
-        ).body["term_vectors"]["content"]["terms"]
+        return self.get_article_content_term_vectors(content, additional_statistics)["terms"]
+
+    def get_article_content_term_vectors(
+        self: ArticleRepository, content: str, additional_statistics: bool
+    ) -> Dict[str, dict]:
+        """Get term vectors of the given content including the term statistics and the field statistics.
+
+        Args:
+            content (str): The content whose terms are being analyzed.
+            additional_statistics (bool): Whether to return additional term statistics (e.g., shard document frequency)
+                                          and field statistics (e.g., shard document count).
+
+        Returns:
+            Dict[str, dict]: The term statistics of each term (`terms`) and, if requested, the field statistics
+                             (`field_statistics`) of the shard in which the content is analyzed.
+        """
+        return (
+            ElasticDatabase.get_term_vectors(
+                self.index,
+                {"content": content},
+                fields=["content"],
+                term_statistics=additional_statistics,
+                field_statistics=additional_statistics,
+            )
+            .body["term_vectors"]
+            .get("content", {"terms": {}})
+        )
 
     def get_total_article_count(self: ArticleRepository) -> int:
         """Get count of total articles in the database in all shards.
@@ -137,34 +320,469 @@ class ArticleRepository:
         """
         return ElasticDatabase.count(self.index)["count"]
 
+    def get_index_generation(self: ArticleRepository) -> Tuple[int, int]:
+        """Get the generation of the article index, which changes whenever the searchable articles may change.
+
+        Returns:
+            Tuple[int, int]: Count of articles and count of the refreshes which made changes visible to searches.
+        """
+        primaries = ElasticDatabase.get_index_stats(self.index, ["docs", "refresh"])["_all"]["primaries"]
+
+        return primaries["docs"]["count"], primaries["refresh"].get("external_total", primaries["refresh"]["total"])
+
+    def static_articles_converted(self: ArticleRepository) -> bool:
+        """Check whether the current CSV files of the corpus are already converted to Parquet files."""
+        corpus_metadata = self._read_corpus_metadata()
+        return corpus_metadata is not None and corpus_metadata["source_files"] == self._get_corpus_source_files()
+
+    def convert_static_articles(self: ArticleRepository) -> int:
+        """Convert the CSV files of the corpus to partitioned Parquet files, to be read by columns thereafter.
+
+        The article count is stored in a metadata sidecar along with the converted CSV files.
+
+        Returns:
+            int: Number of the converted articles.
+        """
+        import pyarrow.parquet as pq
+
+        corpus_parquet_path = Path(f"{self.data_lake_path}/{self.corpus_parquet_key}")
+        temporary_corpus_parquet_path = corpus_parquet_path.with_name(f".{corpus_parquet_path.name}.{uuid.uuid4().hex}")
+
+        source_files = self._get_corpus_source_files()
+        self._read_csv_articles().to_parquet(temporary_corpus_parquet_path, write_index=False)
+        article_count = sum(
+            pq.read_metadata(file_path).num_rows for file_path in temporary_corpus_parquet_path.glob("*.parquet")
+        )
+        with open(temporary_corpus_parquet_path / self.CORPUS_METADATA_FILE_NAME, "w") as corpus_metadata_file:
+            json.dump({"article_count": article_count, "source_files": source_files}, corpus_metadata_file)
+
+        if corpus_parquet_path.exists():
+            shutil.rmtree(corpus_parquet_path)
+        os.replace(temporary_corpus_parquet_path, corpus_parquet_path)
+
+        self.get_static_articles.cache_clear()
+        self.get_static_article_count.cache_clear()
+
+        return article_count
+
     @lru_cache
-    def get_static_articles(self: ArticleRepository, file_pattern: str = "*.csv") -> dd.DataFrame:
+    def get_static_articles(self: ArticleRepository, columns: Optional[Tuple[str, ...]] = None) -> dd.DataFrame:
         """Get the articles from the corpus in the data lake.
 
+        The articles are read from the Parquet files of the corpus if it's converted, otherwise from its CSV files.
+        Only the requested columns are read.
+
         Args:
-            file_pattern (str):
+            columns (Optional[Tuple[str, ...]]): The article fields to be read. Defaults to the key, URL and content.
 
         Returns:
             dd.DataFrame: A partitioned collection of articles.
         """
-        return dd.read_csv(f"{self.data_lake_path}/{self.corpus_bucket}/{file_pattern}", dtype=object).dropna(
-            subset=["content"]
-        )
+        import dask.dataframe as dd
+
+        columns = columns or (self.article_key_field, "url", "content")
+        if self._read_corpus_metadata() is not None:
+            return dd.read_parquet(f"{self.data_lake_path}/{self.corpus_parquet_key}", columns=list(columns))
+
+        return self._read_csv_articles(columns)
 
     @lru_cache
     def get_static_article_count(self: ArticleRepository) -> int:
-        """Get count of total articles in the corpus.
+        """Get count of total articles in the corpus, from the metadata of the Parquet files if converted.
 
         Returns:
             int:
         """
-        return self.get_static_articles().shape[0].compute()
+        corpus_metadata = self._read_corpus_metadata()
+        if corpus_metadata is not None:
+            return corpus_metadata["article_count"]
 
-    @lru_cache
-    def get_static_term_statistics(self: ArticleRepository) -> pd.DataFrame:
+        return self.get_static_articles(("content",)).shape[0].compute()
+
+    def _read_csv_articles(self: ArticleRepository, columns: Optional[Tuple[str, ...]] = None) -> dd.DataFrame:
+        """Parse the articles with a content from the CSV files of the corpus."""
+        import dask.dataframe as dd
+
+        articles = dd.read_csv(
+            f"{self.data_lake_path}/{self.corpus_bucket}/*.csv",
+            dtype=object,
+            usecols=list(dict.fromkeys([*columns, "content"])) if columns else None,
+        ).dropna(subset=["content"])
+
+        return articles[list(columns)] if columns else articles
+
+    def _read_corpus_metadata(self: ArticleRepository) -> Optional[Dict[str, Any]]:
+        try:
+            with open(f"{self.data_lake_path}/{self.corpus_parquet_key}/{self.CORPUS_METADATA_FILE_NAME}") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+
+    def _get_corpus_source_files(self: ArticleRepository) -> Dict[str, int]:
+        """Get the CSV files of the corpus and their sizes, by which a change in the corpus is detected."""
+        return {
+            file_path.name: file_path.stat().st_size
+            for file_path in sorted(Path(f"{self.data_lake_path}/{self.corpus_bucket}").glob("*.csv"))
+        }
+
+    def get_static_article_keys(self: ArticleRepository, articles: dd.DataFrame) -> List[str]:
+        """Get the keys of the given corpus articles.
+
+        An article is keyed by its URL if its key is missing (like its document ID), and the articles with neither
+        of them are left out, since they can't be told apart.
+
+        Args:
+            articles (dd.DataFrame): A partitioned collection of articles.
+
+        Returns:
+            List[str]: The article keys in the same order.
+        """
+        return (
+            articles.map_partitions(
+                self._get_partition_article_keys, self.article_key_field, meta=(self.article_key_field, "object")
+            )
+            .compute()
+            .tolist()
+        )
+
+    def get_new_static_articles(
+        self: ArticleRepository, articles: dd.DataFrame, article_keys: Collection[str]
+    ) -> dd.DataFrame:
+        """Select the given corpus articles whose keys are not among the given keys (e.g., of the existing statistics).
+
+        The keys are broadcast to the partitions as a single set, rather than embedded in the task of each partition.
+        The articles without a key (nor a URL) are never selected.
+
+        Args:
+            articles (dd.DataFrame): A partitioned collection of articles.
+            article_keys (Collection[str]): The keys of the articles which are not new.
+
+        Returns:
+            dd.DataFrame: The new articles.
+        """
+        import dask
+
+        known_article_keys = dask.delayed(frozenset(article_keys), traverse=False)
+        return articles.map_partitions(
+            self._select_new_partition_articles, self.article_key_field, known_article_keys, meta=articles._meta
+        )
+
+    @staticmethod
+    def _get_partition_article_keys(articles: pd.DataFrame, article_key_field: str) -> pd.Series:
+        """Get the keys of the given articles by their key field, or by their URLs if their keys are missing."""
+        article_keys = articles[article_key_field]
+        # Integer keys are read as floats if any of them is missing, which would format them differently.
+        if article_keys.dtype.kind == "f" and (article_keys.dropna() % 1 == 0).all():
+            article_keys = article_keys.astype("Int64")
+        article_keys = article_keys.astype(object)
+        if "url" in articles:
+            article_keys = article_keys.where(article_keys.notna(), articles["url"])
+
+        return article_keys.dropna().astype(str)
+
+    @staticmethod
+    def _select_new_partition_articles(
+        articles: pd.DataFrame, article_key_field: str, known_article_keys: Collection[str]
+    ) -> pd.DataFrame:
+        article_keys = ArticleRepository._get_partition_article_keys(articles, article_key_field)
+        new_article_keys = article_keys[[article_key not in known_article_keys for article_key in article_keys]]
+
+        return articles.loc[new_article_keys.index]
+
+    def get_static_term_statistics(self: ArticleRepository) -> Union[TermStatisticsSnapshot, TermSketchStore]:
         """Get the processed term statistics (e.g. term DFs) from the data lake.
 
+        The statistics are opened once per process as a snapshot of memory-mapped segments, which is reopened if
+        the statistics version has changed (e.g., new articles are added) when checked after the refresh interval.
+        If the statistics are not built yet, they are built from the term statistics parquet file in the data lake.
+        In the approximate mode, the statistics are the term sketch instead, which has the same lookup methods.
+
+        Returns:
+            Union[TermStatisticsSnapshot, TermSketchStore]
+
+        Raises:
+            FileNotFoundError: If the term sketch is not built yet in the approximate mode.
+        """
+        if self.term_statistics_mode == self.APPROXIMATE_TERM_STATISTICS_MODE:
+            term_sketch = self.get_static_term_sketch()
+            if term_sketch is None:
+                raise FileNotFoundError(f"Term sketch is not built in {self._get_term_sketch_directory()}.")
+            return term_sketch
+
+        snapshot = ArticleRepository._term_statistics_snapshot
+        if snapshot is not None and time.monotonic() < ArticleRepository._term_statistics_checked_at + float(
+            os.getenv("TERM_STATISTICS_REFRESH_INTERVAL", 5)
+        ):
+            return snapshot
+
+        with ArticleRepository._term_statistics_lock:
+            snapshot = ArticleRepository._term_statistics_snapshot
+            if snapshot is None or snapshot.version != self.get_static_term_statistics_segments().get_version():
+                snapshot = ArticleRepository._term_statistics_snapshot = self._open_term_statistics_snapshot()
+            ArticleRepository._term_statistics_checked_at = time.monotonic()
+
+        return snapshot
+
+    def get_static_term_statistics_segments(self: ArticleRepository) -> SegmentedTermStatistics:
+        """Get the base and delta segments of the term statistics in the data lake."""
+        return SegmentedTermStatistics(Path(f"{self.data_lake_path}/{self.term_statistics_store_key}"))
+
+    def get_static_term_statistics_article_keys(self: ArticleRepository) -> Optional[Set[str]]:
+        """Get the keys of the articles the term statistics are calculated from, or None if they're not tracked."""
+        return self.get_static_term_statistics_segments().get_article_keys()
+
+    def store_static_term_statistics(
+        self: ArticleRepository,
+        term_dfs: Dict[str, int],
+        article_count: int,
+        article_keys: Optional[Iterable[str]] = None,
+    ) -> None:
+        """Store the given term statistics in the data lake, replacing all the existing statistics.
+
+        Args:
+            term_dfs (Dict[str, int]): A collection of terms as keys and DFs as values.
+            article_count (int): Number of articles the DFs are calculated from.
+            article_keys (Optional[Iterable[str]]): Keys of the articles the DFs are calculated from.
+        """
+        import pandas as pd
+
+        pd.DataFrame({"term": term_dfs.keys(), "df": term_dfs.values()}).to_parquet(
+            f"{self.data_lake_path}/{self.term_statistics_key}"
+        )
+        self.get_static_term_statistics_segments().rebuild(
+            term_dfs.keys(), term_dfs.values(), article_count, article_keys
+        )
+        self._reset_term_statistics_snapshot()
+
+    def add_static_term_statistics(
+        self: ArticleRepository, term_dfs: Dict[str, int], article_count: int, article_keys: Iterable[str]
+    ) -> None:
+        """Add the term statistics of new articles to the data lake as a delta of the existing statistics.
+
+        Args:
+            term_dfs (Dict[str, int]): A collection of terms as keys and DFs in the new articles as values.
+            article_count (int): Number of the new articles.
+            article_keys (Iterable[str]): Keys of the new articles.
+        """
+        self.get_static_term_statistics_segments().add_delta(
+            term_dfs.keys(), term_dfs.values(), article_count, article_keys
+        )
+        self._reset_term_statistics_snapshot()
+
+    def add_static_articles(self: ArticleRepository, article_terms: Mapping[str, Collection[str]]) -> List[str]:
+        """Add the given articles to the static term statistics (or the term sketch), except the already added ones.
+
+        The articles are checked and added under the lock of the statistics, so an article is never counted twice.
+        Only the given article keys are checked, against the article keys of the statistics read once per process.
+
+        Args:
+            article_terms (Mapping[str, Collection[str]]): The key of each article as keys and its terms as values.
+
+        Returns:
+            List[str]: Keys of the added articles.
+        """
+        if self.term_statistics_mode == self.APPROXIMATE_TERM_STATISTICS_MODE:
+            return self._add_term_sketch_articles(article_terms)
+
+        added_article_keys = self.get_static_term_statistics_segments().add_new_articles(article_terms)
+        if added_article_keys:
+            self._reset_term_statistics_snapshot()
+
+        return added_article_keys
+
+    def compact_static_term_statistics(self: ArticleRepository) -> None:
+        """Merge the deltas of the term statistics into their base, and store the merged DFs in the parquet file."""
+        term_statistics_segments = self.get_static_term_statistics_segments()
+        term_statistics_segments.compact()
+        self._reset_term_statistics_snapshot()
+
+        import pandas as pd
+
+        terms, dfs = term_statistics_segments.open_snapshot().base.items()
+        pd.DataFrame({"term": terms, "df": dfs}).to_parquet(f"{self.data_lake_path}/{self.term_statistics_key}")
+
+    def get_static_term_sketch(self: ArticleRepository) -> Optional[TermSketchStore]:
+        """Get the term sketch of the approximate statistics from the data lake.
+
+        The sketch is opened (i.e., memory-mapped) once per process, and reopened if it's rebuilt when checked after
+        the refresh interval.
+
+        Returns:
+            Optional[TermSketchStore]: The sketch, or None if it's not built yet.
+        """
+        return ArticleRepository._term_sketch.get(
+            self._get_term_sketch_directory(), float(os.getenv("TERM_STATISTICS_REFRESH_INTERVAL", 5))
+        )
+
+    def store_static_term_sketch(
+        self: ArticleRepository, term_sketch: TermSketch, article_keys: Optional[Iterable[str]] = None
+    ) -> TermSketchStore:
+        """Store the given term sketch in the data lake, replacing the existing sketch.
+
+        Args:
+            term_sketch (TermSketch): The sketch of the term DFs.
+            article_keys (Optional[Iterable[str]]): Keys of the articles the sketch is counted from.
+
         Returns:
-            pd.DataFrame
+            TermSketchStore: The stored sketch.
         """
-        return pd.read_parquet(f"{self.data_lake_path}/{self.term_statistics_key}").set_index("term")
+        term_sketch_store = TermSketchStore.build(self._get_term_sketch_directory(), term_sketch, article_keys)
+        ArticleRepository._term_sketch.invalidate()
+
+        return term_sketch_store
+
+    def merge_static_term_sketch(
+        self: ArticleRepository, term_sketch: TermSketch, article_keys: Iterable[str]
+    ) -> TermSketchStore:
+        """Merge the term sketch of new articles into the term sketch in the data lake.
+
+        The sketch is loaded, merged and stored under a file lock, so the articles merged concurrently by another
+        process (e.g., by the ETL and by the page ingestion of the API) are never lost.
+
+        Args:
+            term_sketch (TermSketch): The sketch of the new articles, created by `TermSketchStore.create_sketch`.
+            article_keys (Iterable[str]): Keys of the new articles.
+
+        Returns:
+            TermSketchStore: The stored sketch.
+
+        Raises:
+            FileNotFoundError: If the term sketch is not built yet.
+        """
+        with self._lock_term_sketch():
+            term_sketch_store = TermSketchStore.open(self._get_term_sketch_directory())
+            previous_article_keys = term_sketch_store.get_article_keys()
+
+            return self.store_static_term_sketch(
+                term_sketch_store.load_sketch().merge(term_sketch),
+                None if previous_article_keys is None else [*previous_article_keys, *article_keys],
+            )
+
+    def _add_term_sketch_articles(self: ArticleRepository, article_terms: Mapping[str, Collection[str]]) -> List[str]:
+        """Merge the given articles into the term sketch, except the articles already counted in it."""
+        with self._lock_term_sketch():
+            term_sketch_store = TermSketchStore.open(self._get_term_sketch_directory())
+
+            # The article keys are read only once the sketch is merged by another process.
+            cached_article_keys = ArticleRepository._term_sketch_article_keys
+            if cached_article_keys is not None and cached_article_keys[0] == term_sketch_store.version:
+                article_keys = cached_article_keys[1]
+            else:
+                stored_article_keys = term_sketch_store.get_article_keys()
+                article_keys = None if stored_article_keys is None else set(stored_article_keys)
+
+            new_article_keys = [
+                article_key for article_key in article_terms if article_keys is None or article_key not in article_keys
+            ]
+            if not new_article_keys:
+                return []
+
+            term_dfs: Counter = Counter()
+            for article_key in new_article_keys:
+                term_dfs.update(set(article_terms[article_key]))
+            term_sketch = term_sketch_store.load_sketch()
+            new_term_sketch = term_sketch_store.create_sketch()
+            new_term_sketch.add(term_dfs, len(new_article_keys))
+
+            if article_keys is not None:
+                article_keys.update(new_article_keys)
+            term_sketch_store = self.store_static_term_sketch(term_sketch.merge(new_term_sketch), article_keys)
+            ArticleRepository._term_sketch_article_keys = (term_sketch_store.version, article_keys)
+
+            return new_article_keys
+
+    @contextmanager
+    def _lock_term_sketch(self: ArticleRepository) -> Iterator[None]:
+        """Hold the exclusive lock of the term sketch, so only one process merges into it at a time."""
+        directory = self._get_term_sketch_directory()
+        directory.parent.mkdir(parents=True, exist_ok=True)
+        with open(directory.with_name(f"{directory.name}.lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _get_term_sketch_directory(self: ArticleRepository) -> Path:
+        return Path(f"{self.data_lake_path}/{self.term_sketch_key}")
+
+    def get_article_term_index(self: ArticleRepository) -> Optional[ArticleTermIndex]:
+        """Get the index of the ranked terms of the corpus articles by their normalized URL from the data lake.
+
+        The index is opened once per process, and reopened if it's rebuilt when checked after the refresh interval.
+
+        Returns:
+            Optional[ArticleTermIndex]: The index, or None if it's not built yet.
+        """
+        return ArticleRepository._article_term_index.get(
+            self._get_article_term_index_directory(), float(os.getenv("TERM_STATISTICS_REFRESH_INTERVAL", 5))
+        )
+
+    def store_article_term_index(
+        self: ArticleRepository, articles: Iterable[Tuple[str, ArticleTerms]], statistics_version: str
+    ) -> ArticleTermIndex:
+        """Store the ranked terms of the given articles in the data lake as an index by their normalized URL.
+
+        Args:
+            articles (Iterable[Tuple[str, ArticleTerms]]): The normalized URL and the ranked terms of each article.
+            statistics_version (str): The version of the statistics the TF-IDFs are calculated by.
+
+        Returns:
+            ArticleTermIndex: The stored index.
+        """
+        article_term_index = ArticleTermIndex.build(
+            self._get_article_term_index_directory(), articles, statistics_version
+        )
+        ArticleRepository._article_term_index.invalidate()
+
+        return article_term_index
+
+    def _get_article_term_index_directory(self: ArticleRepository) -> Path:
+        return Path(f"{self.data_lake_path}/{self.article_term_index_key}")
+
+    def get_tf_idf_matrix(self: ArticleRepository) -> Optional[TfIdfMatrix]:
+        """Get the sparse TF-IDF matrix of the corpus articles from the data lake.
+
+        The matrix is opened (i.e., memory-mapped) once per process, and reopened if it's rebuilt when checked after
+        the refresh interval.
+
+        Returns:
+            Optional[TfIdfMatrix]: The matrix, or None if it's not built yet.
+        """
+        return ArticleRepository._tf_idf_matrix.get(
+            self._get_tf_idf_matrix_directory(), float(os.getenv("TERM_STATISTICS_REFRESH_INTERVAL", 5))
+        )
+
+    def store_tf_idf_matrix(
+        self: ArticleRepository, blocks: Iterable[TfIdfMatrixBlock], statistics_version: str
+    ) -> TfIdfMatrix:
+        """Store the TF-IDF vectors of the given blocks of articles in the data lake as a sparse matrix.
+
+        Args:
+            blocks (Iterable[TfIdfMatrixBlock]): The blocks of article vectors.
+            statistics_version (str): The version of the statistics the TF-IDFs are calculated by.
+
+        Returns:
+            TfIdfMatrix: The stored matrix.
+        """
+        tf_idf_matrix = TfIdfMatrix.build(self._get_tf_idf_matrix_directory(), blocks, statistics_version)
+        ArticleRepository._tf_idf_matrix.invalidate()
+
+        return tf_idf_matrix
+
+    def _get_tf_idf_matrix_directory(self: ArticleRepository) -> Path:
+        return Path(f"{self.data_lake_path}/{self.tf_idf_matrix_key}")
+
+    def _open_term_statistics_snapshot(self: ArticleRepository) -> TermStatisticsSnapshot:
+        segments = self.get_static_term_statistics_segments()
+        if not segments.exists():
+            import pandas as pd
+
+            term_statistics = pd.read_parquet(f"{self.data_lake_path}/{self.term_statistics_key}")
+            segments.rebuild(term_statistics["term"], term_statistics["df"].to_numpy(), self.get_static_article_count())
+
+        return segments.open_snapshot()
+
+    def _reset_term_statistics_snapshot(self: ArticleRepository) -> None:
+        with ArticleRepository._term_statistics_lock:
+            ArticleRepository._term_statistics_snapshot = None
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import string
+from abc import ABC, abstractmethod
+from typing import Iterable, List, Optional
+
+# The noisy characters (e.g. digits, punctuations, whitespaces) which are removed from terms.
+# - and . are only allowed as infix characters.
+NOISE_CHARACTER_TABLE = str.maketrans("", "", string.digits + string.whitespace + r"""!"#$%&'()*+,/:;<=>?@[\]^_`{|}~""")
+NOISE_SUFFIX_PREFIX_CHARACTERS = r"-."
+
+
+class Analyzer(ABC):
+    """An analyzer which tokenizes text into terms in our desired format (i.e., lower case lemmas of non-stopwords)."""
+
+    @property
+    @abstractmethod
+    def name(self: Analyzer) -> str:
+        """Name of the analyzer, by which it's configured."""
+        pass
+
+    @abstractmethod
+    def analyze(self: Analyzer, text: str) -> List[str]:
+        """Tokenize the given text into terms.
+
+        Args:
+            text (str):
+
+        Returns:
+            List[str]: A collection of terms.
+        """
+        pass
+
+    def analyze_batch(self: Analyzer, texts: Iterable[str], batch_size: int) -> List[List[str]]:
+        """Tokenize the given texts into terms in batches.
+
+        Args:
+            texts (Iterable[str]):
+            batch_size (int): Number of texts to be tokenized together.
+
+        Returns:
+            List[List[str]]: A collection of terms for each text in the same order.
+        """
+        return [self.analyze(text) for text in texts]
+
+    def warm_up(self: Analyzer) -> None:
+        """Run the analyzer once, so the first request doesn't pay the load costs."""
+        self.analyze("Warming up the analyzer.")
+
+
+class AnalyzerError(Exception):
+    """Raise when an analyzer can't be built."""
+
+    def __init__(self: AnalyzerError, error_message: str) -> None:
+        super(AnalyzerError, self).__init__(error_message)
+
+
+def clean_term(lemma: str) -> Optional[str]:
+    """Convert the given lemma to a term in our desired format if possible.
+
+    Args:
+        lemma (str):
+
+    Returns:
+        (str, optional): A textual term in our desired format.
+    """
+    # The desired term format is the word lemma in lower case, without the noisy characters.
+    term = lemma.lower().translate(NOISE_CHARACTER_TABLE).strip(NOISE_SUFFIX_PREFIX_CHARACTERS)
+
+    # Terms should have more than one character.
+    return term if len(term) > 1 else None
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Final, List, Optional, Tuple, Type, cast
+
+from app.services.analysis.analyzer import Analyzer, AnalyzerError
+from app.services.analysis.rule_based_analyzer import RuleBasedAnalyzer
+from app.services.analysis.spacy_analyzer import SpacyAnalyzer
+
+
+class AnalyzerRegistry:
+    """A process-wide registry of the analyzers for text tokenization.
+
+    Each configured analyzer is built only once per process and shared by the request path and the ETL process.
+    The analyzers are built by the backend configured for the deployment: either the full spaCy pipeline, or the
+    rule-based analyzer whose tables are precomputed from the spaCy pipeline (by the ETL process).
+    spaCy is only imported once a spaCy analyzer is built (e.g., by `warm_up` at the API startup), which keeps it out
+    of the import time of the API.
+    """
+
+    SPACY_BACKEND: Final[str] = "spacy"
+    RULE_BASED_BACKEND: Final[str] = "rule_based"
+
+    _analyzers: Dict[Tuple[str, str], Analyzer] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_backend(cls: Type[AnalyzerRegistry]) -> str:
+        """Get the configured analyzer backend (i.e., spacy or rule_based)."""
+        backend = os.getenv("ANALYZER_BACKEND", cls.SPACY_BACKEND)
+        if backend not in (cls.SPACY_BACKEND, cls.RULE_BASED_BACKEND):
+            raise AnalyzerError(f"Analyzer backend {backend} is not supported.")
+
+        return backend
+
+    @classmethod
+    def get_default_analyzer_name(cls: Type[AnalyzerRegistry]) -> str:
+        return os.getenv("ANALYZER_MODEL", "en_core_web_sm")
+
+    @classmethod
+    def get_analyzer_names(cls: Type[AnalyzerRegistry]) -> List[str]:
+        """Get names of all the configured analyzers."""
+        analyzer_names = os.getenv("ANALYZER_MODELS", cls.get_default_analyzer_name())
+        return [analyzer_name.strip() for analyzer_name in analyzer_names.split(",") if analyzer_name.strip()]
+
+    @classmethod
+    def get_analyzer(
+        cls: Type[AnalyzerRegistry], name: Optional[str] = None, backend: Optional[str] = None
+    ) -> Analyzer:
+        """Get an analyzer by its name and build it, if it's not built yet.
+
+        Args:
+            name (Optional[str]): Name of the analyzer (i.e., spaCy model name). Defaults to the configured analyzer.
+            backend (Optional[str]): The analyzer backend. Defaults to the configured backend.
+
+        Returns:
+            Analyzer:
+        """
+        key = (backend or cls.get_backend(), name or cls.get_default_analyzer_name())
+        if key not in cls._analyzers:
+            with cls._lock:
+                if key not in cls._analyzers:
+                    cls._analyzers[key] = cls._build_analyzer(*key)
+
+        return cls._analyzers[key]
+
+    @classmethod
+    def get_rule_based_tables_path(cls: Type[AnalyzerRegistry], name: str) -> Path:
+        """Get the path to the file of the precomputed tables of the rule-based analyzer of the given name."""
+        return Path(os.getenv("ANALYZER_TABLES_PATH", "data_lake/analysis")) / f"{name}.json"
+
+    @classmethod
+    def build_rule_based_analyzer(
+        cls: Type[AnalyzerRegistry], name: str, texts: List[str], batch_size: int
+    ) -> RuleBasedAnalyzer:
+        """Build and save the tables of the rule-based analyzer of the given name, by the spaCy analyzer of the name.
+
+        Args:
+            name (str): Name of the analyzer (i.e., spaCy model name).
+            texts (List[str]): A sample of texts (e.g., corpus articles) to find the lemmas in.
+            batch_size (int): Number of texts to be analyzed together.
+
+        Returns:
+            RuleBasedAnalyzer:
+        """
+        spacy_analyzer = cast(SpacyAnalyzer, cls.get_analyzer(name, cls.SPACY_BACKEND))
+        analyzer = RuleBasedAnalyzer.build(spacy_analyzer, texts, batch_size)
+        analyzer.save(cls.get_rule_based_tables_path(name))
+        with cls._lock:
+            cls._analyzers[(cls.RULE_BASED_BACKEND, name)] = analyzer
+
+        return analyzer
+
+    @classmethod
+    def is_loaded(cls: Type[AnalyzerRegistry]) -> bool:
+        """Check whether all the configured analyzers are built."""
+        backend = cls.get_backend()
+        return all((backend, name) in cls._analyzers for name in cls.get_analyzer_names())
+
+    @classmethod
+    def warm_up(cls: Type[AnalyzerRegistry]) -> None:
+        """Build all the configured analyzers and run them once, so the first request doesn't pay the load costs."""
+        for name in cls.get_analyzer_names():
+            cls.get_analyzer(name).warm_up()
+
+    @classmethod
+    def _build_analyzer(cls: Type[AnalyzerRegistry], backend: str, name: str) -> Analyzer:
+        if backend == cls.RULE_BASED_BACKEND:
+            return RuleBasedAnalyzer.load(cls.get_rule_based_tables_path(name))
+
+        return SpacyAnalyzer.load(name)
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import uuid
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import DefaultDict, Dict, Final, Iterable, List, Set, Type
+
+from app.services.analysis.analyzer import Analyzer, AnalyzerError, clean_term
+from app.services.analysis.spacy_analyzer import SpacyAnalyzer
+
+
+class RuleBasedAnalyzer(Analyzer):
+    """A fast analyzer by a compiled regex tokenizer, a precomputed lemma lookup table and a stopword set.
+
+    The tokenizer follows the customized tokenizer of the spaCy analyzer: hyphenated words and abbreviations are kept
+    together, and the English clitics (e.g., n't and 's) are split from their words. The lemma of each token is looked
+    up in a table precomputed by the spaCy analyzer on a sample of the corpus (its most frequent lemma), so no tagger
+    runs per token. The tokens are looked up as they are, since their case tells apart e.g. proper nouns, and the
+    tokens out of the table are taken as their own lemmas.
+    """
+
+    CLITIC_PATTERN: Final[str] = r"['’](?:s|m|d|ll|re|ve)\b"
+    WORD_PATTERN: Final[str] = r"[^\W_]+(?:[-.][^\W_]+|['’](?!(?:s|m|d|ll|re|ve|t)\b)[^\W_]+)*"
+    TOKEN_PATTERN: Final[re.Pattern] = re.compile(
+        rf"[^\W_]+?(?=n['’]t\b)|n['’]t\b|{CLITIC_PATTERN}|{WORD_PATTERN}", re.IGNORECASE
+    )
+
+    def __init__(self: RuleBasedAnalyzer, name: str, lemmas: Dict[str, str], stopwords: Iterable[str]) -> None:
+        """
+        Args:
+            name (str): Name of the analyzer (i.e., the spaCy model whose tables are used).
+            lemmas (Dict[str, str]): The lower case lemma of each token, which is different from the lower case token.
+            stopwords (Iterable[str]): The lower case stopwords.
+        """
+        self._name = name
+        self._lemmas = lemmas
+        self._stopwords = frozenset(stopwords)
+
+    @property
+    def name(self: RuleBasedAnalyzer) -> str:
+        return self._name
+
+    @classmethod
+    def build(
+        cls: Type[RuleBasedAnalyzer], spacy_analyzer: SpacyAnalyzer, texts: Iterable[str], batch_size: int
+    ) -> RuleBasedAnalyzer:
+        """Build the tables of an analyzer by the lemmas the given spaCy analyzer finds in the given texts.
+
+        Args:
+            spacy_analyzer (SpacyAnalyzer): The spaCy analyzer to be followed.
+            texts (Iterable[str]): A sample of texts (e.g., corpus articles) to find the lemmas in.
+            batch_size (int): Number of texts to be analyzed together.
+
+        Returns:
+            RuleBasedAnalyzer:
+        """
+        lemma_counts: DefaultDict[str, Counter] = defaultdict(Counter)
+        for document in spacy_analyzer.language.pipe(texts, batch_size=batch_size):
+            for token in document:
+                lemma_counts[token.text][token.lemma_.lower()] += 1
+
+        lemmas: Dict[str, str] = {}
+        for text, text_lemma_counts in lemma_counts.items():
+            lemma = text_lemma_counts.most_common(1)[0][0]
+            if lemma != text.lower():
+                lemmas[text] = lemma
+
+        stopwords: Set[str] = {stopword.lower() for stopword in spacy_analyzer.language.Defaults.stop_words}
+        return cls(spacy_analyzer.name, lemmas, stopwords)
+
+    @classmethod
+    def load(cls: Type[RuleBasedAnalyzer], file_path: Path) -> RuleBasedAnalyzer:
+        """Load the analyzer from the tables in the given file.
+
+        Raises:
+            AnalyzerError: If the tables are not built yet.
+        """
+        try:
+            with open(file_path) as tables_file:
+                tables = json.load(tables_file)
+        except FileNotFoundError:
+            raise AnalyzerError(f"Tables of the rule-based analyzer are not built yet ({file_path}).")
+
+        return cls(tables["name"], tables["lemmas"], tables["stopwords"])
+
+    def save(self: RuleBasedAnalyzer, file_path: Path) -> None:
+        """Save the tables of the analyzer in the given file, replacing it at once."""
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_file_path = file_path.with_name(f".{file_path.name}.{uuid.uuid4().hex}")
+        with open(temporary_file_path, "w") as tables_file:
+            json.dump(
+                {"name": self._name, "lemmas": self._lemmas, "stopwords": sorted(self._stopwords)},
+                tables_file,
+                ensure_ascii=False,
+            )
+        os.replace(temporary_file_path, file_path)
+
+    def analyze(self: RuleBasedAnalyzer, text: str) -> List[str]:
+        terms = []
+        for token in self.TOKEN_PATTERN.findall(text):
+            lower_token = token.lower()
+            if lower_token not in self._stopwords and (term := clean_term(self._lemmas.get(token, lower_token))):
+                terms.append(term)
+
+        return terms
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Iterable, List, Optional, Type
+
+from app.services.analysis.analyzer import Analyzer, clean_term
+
+if TYPE_CHECKING:
+    from spacy import Language
+    from spacy.tokens import Token
+
+
+class SpacyAnalyzer(Analyzer):
+    """An analyzer by a full spaCy pipeline, whose tagger and lemmatizer find the lemma of each token by its context."""
+
+    def __init__(self: SpacyAnalyzer, language: Language, name: Optional[str] = None) -> None:
+        """
+        Args:
+            language (Language): The spaCy pipeline.
+            name (Optional[str]): Name of the analyzer. Defaults to the name of the pipeline.
+        """
+        self._language = language
+        self._name = name or f"{language.meta['lang']}_{language.meta['name']}"
+
+    @property
+    def name(self: SpacyAnalyzer) -> str:
+        return self._name
+
+    @property
+    def language(self: SpacyAnalyzer) -> Language:
+        return self._language
+
+    @classmethod
+    def load(cls: Type[SpacyAnalyzer], model_name: str) -> SpacyAnalyzer:
+        """Load the spaCy model of the given name, and customize its tokenizer to keep hyphenated words together.
+
+        spaCy is only imported here, which keeps it out of the import time of the API.
+
+        Args:
+            model_name (str): Name of the spaCy model (e.g., en_core_web_sm).
+
+        Returns:
+            SpacyAnalyzer:
+        """
+        import spacy
+        from spacy.lang.char_classes import LIST_ELLIPSES, LIST_ICONS, ALPHA_LOWER, ALPHA_UPPER, CONCAT_QUOTES, ALPHA
+        from spacy.util import compile_infix_regex
+
+        language = spacy.load(model_name, disable=["parser", "ner"])
+        infixes = (
+            LIST_ELLIPSES
+            + LIST_ICONS
+            + [
+                r"(?<=[0-9])[+\-\*^](?=[0-9-])",
+                r"(?<=[{al}{q}])\.(?=[{au}{q}])".format(al=ALPHA_LOWER, au=ALPHA_UPPER, q=CONCAT_QUOTES),
+                r"(?<=[{a}]),(?=[{a}])".format(a=ALPHA),
+                # Skip regex that splits on hyphens between letters:
+                # r"(?<=[{a}])(?:{h})(?=[{a}])".format(a=ALPHA, h=HYPHENS),
+                r"(?<=[{a}0-9])[:<>=/](?=[{a}])".format(a=ALPHA),
+            ]
+        )
+        infix_regex = compile_infix_regex(infixes)
+        language.tokenizer.infix_finditer = infix_regex.finditer
+
+        return cls(language, model_name)
+
+    def analyze(self: SpacyAnalyzer, text: str) -> List[str]:
+        return [term for token in self._language(text) if (term := self.convert_token_to_term(token))]
+
+    def analyze_batch(self: SpacyAnalyzer, texts: Iterable[str], batch_size: int) -> List[List[str]]:
+        return [
+            [term for token in document if (term := self.convert_token_to_term(token))]
+            for document in self._language.pipe(texts, batch_size=batch_size)
+        ]
+
+    def convert_token_to_term(self: SpacyAnalyzer, token: Token) -> Optional[str]:
+        """Convert the given token to a term in our desired format if possible.
+
+        Args:
+            token (Token):
+
+        Returns:
+            (str, optional): A textual term in our desired format.
+        """
+        if token.is_stop:
+            return None
+
+        return clean_term(token.lemma_)
@@ -1,13 +1,15 @@
 from __future__ import annotations
 
+import json
 import os
-from typing import Dict, Any
+import time
+from typing import Dict, Any, Optional
 
-import pandas as pd
 from pathlib import Path
 from tqdm import tqdm
 
 from app.repositories.article_repository import ArticleRepository
+from app.services.analysis.analyzer_registry import AnalyzerRegistry
 from app.services.statistics.static_statistics_calculation import StaticStatisticsCalculation
 from app.utility.file_management import remove_directory_content, get_directory_file_paths, decompress
 
@@ -15,18 +17,34 @@ from app.utility.file_management import remove_directory_content, get_directory_
 class ArticleETL:
     """Performing ETL process on article data."""
 
-    def __init__(self: ArticleETL, reset_data: bool = False, reset_statistics: bool = False) -> None:
+    def __init__(
+        self: ArticleETL, reset_data: bool = False, reset_statistics: bool = False, incremental_statistics: bool = False
+    ) -> None:
         """
         Args:
             reset_data (bool): Whether to reset data in our data storage platforms (e.g. Elastic database and local data lake)
             reset_statistics (bool): Whether to redo article related statistics.
+            incremental_statistics (bool): Whether to add the statistics of the articles which are new in the corpus
+                                           to the existing statistics.
         """
         self._article_repository = ArticleRepository()
 
         self.config = {
             "reset_data": reset_data,
             "reset_statistics": reset_statistics,
+            "incremental_statistics": incremental_statistics,
+            "max_term_statistics_delta_count": int(os.getenv("TERM_STATISTICS_MAX_DELTA_COUNT", 8)),
             "source_dataset_id": os.getenv("SOURCE_DATASET_ID"),
+            "worker_count": int(os.getenv("ETL_WORKER_COUNT") or os.cpu_count() or 1),
+            "tokenization_batch_size": int(os.getenv("ETL_TOKENIZATION_BATCH_SIZE", 256)),
+            "analyzer_tables_sample_size": int(os.getenv("ANALYZER_TABLES_SAMPLE_SIZE", 5000)),
+            "term_sketch_epsilon": float(os.getenv("TERM_SKETCH_EPSILON", 1e-5)),
+            "term_sketch_delta": float(os.getenv("TERM_SKETCH_DELTA", 0.01)),
+            "term_sketch_heavy_hitter_count": int(os.getenv("TERM_SKETCH_HEAVY_HITTER_COUNT", 10000)),
+            "term_sketch_sample_size": int(os.getenv("TERM_SKETCH_SAMPLE_SIZE", 5000)),
+            "bulk_chunk_size": int(os.getenv("ETL_BULK_CHUNK_SIZE", 500)),
+            "bulk_thread_count": int(os.getenv("ETL_BULK_THREAD_COUNT", 4)),
+            "load_checkpoint_key": os.getenv("ETL_LOAD_CHECKPOINT_KEY", "etl/article_load_checkpoint.json"),
         }
 
     @property
@@ -48,9 +66,21 @@ class ArticleETL:
         print("\nExtracting articles...")
         self._extract_articles(self.config["source_dataset_id"])
 
+        print("\nConverting articles to columnar format...")
+        self._convert_articles()
+
+        print("\nPreparing analyzer...")
+        self._prepare_analyzer()
+
         print("\nPreparing statistics...")
         self._prepare_statistics()
 
+        print("\nPreparing ranked terms of articles...")
+        self._prepare_article_term_index()
+
+        print("\nPreparing TF-IDF matrix of articles...")
+        self._prepare_tf_idf_matrix()
+
         print("\nLoading articles to Elastic database...")
         self._load_articles_to_database()
 
@@ -75,41 +105,303 @@ class ArticleETL:
         # Decompress files of the corpus zip file into the same directory
         decompress(get_directory_file_paths(destination_path, "*.zip")[0])
 
+    def _convert_articles(self: ArticleETL) -> None:
+        """Convert the corpus articles to partitioned Parquet files in our data lake, to be read by columns thereafter.
+
+        The conversion is skipped if the current corpus is already converted.
+        """
+        if not self.config["reset_data"] and self.article_repository.static_articles_converted():
+            return
+
+        article_count = self.article_repository.convert_static_articles()
+        print(f"Converted {article_count} articles to Parquet files.")
+
+    def _prepare_analyzer(self: ArticleETL) -> None:
+        """Build the tables of the rule-based analyzer from a sample of the corpus, if it's the configured backend.
+
+        The tables are built by the spaCy analyzer only if they're not built yet (or the statistics are reset), and
+        before the statistics, so the statistics are calculated by the same analyzer as the API.
+        """
+        if AnalyzerRegistry.get_backend() != AnalyzerRegistry.RULE_BASED_BACKEND:
+            return
+
+        for name in AnalyzerRegistry.get_analyzer_names():
+            if not self.config["reset_statistics"] and AnalyzerRegistry.get_rule_based_tables_path(name).exists():
+                continue
+
+            contents = (
+                self.article_repository.get_static_articles(("content",))["content"]
+                .head(self.config["analyzer_tables_sample_size"], npartitions=-1)
+                .tolist()
+            )
+            print(f"Building tables of the rule-based analyzer {name} from {len(contents)} articles...")
+            AnalyzerRegistry.build_rule_based_analyzer(name, contents, self.config["tokenization_batch_size"])
+
     def _prepare_statistics(self: ArticleETL) -> None:
         """Calculate article related statistics and store it in our data lake as static calculation."""
+        if self.article_repository.term_statistics_mode == ArticleRepository.APPROXIMATE_TERM_STATISTICS_MODE:
+            self._prepare_term_sketch()
+            return
+
         term_statistics_path = Path(
             f"{self.article_repository.data_lake_path}/{self.article_repository.term_statistics_key}"
         )
 
         if not self.config["reset_statistics"] and term_statistics_path.exists():
+            if self.config["incremental_statistics"]:
+                self._update_statistics()
             return
 
+        self._calculate_statistics()
+
+    def _calculate_statistics(self: ArticleETL) -> None:
+        """Calculate the statistics of all the corpus articles, replacing the existing statistics."""
         print("Calculating static term statistics...")
         statistics_calculation = StaticStatisticsCalculation()
-        term_dfs = statistics_calculation.calculate_all_term_dfs()
+        term_dfs = statistics_calculation.calculate_all_term_dfs(
+            self.config["worker_count"], self.config["tokenization_batch_size"]
+        )
 
         print("Loading static term statistics to data lake...")
-        pd.DataFrame(
-            {
-                "term": term_dfs.keys(),
-                "df": term_dfs.values(),
-            }
-        ).to_parquet(term_statistics_path)
+        self.article_repository.store_static_term_statistics(
+            term_dfs,
+            self.article_repository.get_static_article_count(),
+            self.article_repository.get_static_article_keys(self.article_repository.get_static_articles()),
+        )
+
+    def _update_statistics(self: ArticleETL) -> None:
+        """Calculate the statistics of only the corpus articles which are new since the last calculation.
+
+        The statistics of the new articles are added as a delta of the existing statistics. Once there are too many
+        deltas, they're compacted into the base statistics.
+        """
+        article_keys = self.article_repository.get_static_term_statistics_article_keys()
+        if article_keys is None:
+            print("The articles of the existing statistics are not tracked, so all the statistics are recalculated.")
+            self._calculate_statistics()
+            return
+
+        articles = self.article_repository.get_static_articles()
+        new_articles = self.article_repository.get_new_static_articles(articles, article_keys)
+        new_article_keys = self.article_repository.get_static_article_keys(new_articles)
+        if not new_article_keys:
+            print("There are no new articles to calculate statistics for.")
+            return
+
+        print(f"Calculating static term statistics of {len(new_article_keys)} new articles...")
+        statistics_calculation = StaticStatisticsCalculation()
+        term_dfs = statistics_calculation.calculate_all_term_dfs(
+            self.config["worker_count"], self.config["tokenization_batch_size"], articles=new_articles
+        )
+
+        print("Adding static term statistics of new articles to data lake...")
+        self.article_repository.add_static_term_statistics(term_dfs, len(new_article_keys), new_article_keys)
+
+        if (
+            self.article_repository.get_static_term_statistics_segments().get_delta_count()
+            >= self.config["max_term_statistics_delta_count"]
+        ):
+            print("Compacting static term statistics...")
+            self.article_repository.compact_static_term_statistics()
+
+    def _prepare_term_sketch(self: ArticleETL) -> None:
+        """Count the approximate statistics of the corpus articles by a term sketch and store it in our data lake.
+
+        If the sketch already exists and incremental statistics are enabled, the sketch of only the new articles is
+        counted and merged into it.
+        """
+        term_sketch_store = self.article_repository.get_static_term_sketch()
+        if self.config["reset_statistics"] or term_sketch_store is None:
+            self._calculate_term_sketch()
+            return
+        if not self.config["incremental_statistics"]:
+            return
+
+        article_keys = term_sketch_store.get_article_keys()
+        if article_keys is None:
+            print("The articles of the existing term sketch are not tracked, so the whole sketch is recounted.")
+            self._calculate_term_sketch()
+            return
+
+        articles = self.article_repository.get_static_articles()
+        new_articles = self.article_repository.get_new_static_articles(articles, article_keys)
+        new_article_keys = self.article_repository.get_static_article_keys(new_articles)
+        if not new_article_keys:
+            print("There are no new articles to count statistics for.")
+            return
+
+        print(f"Counting term sketch of {len(new_article_keys)} new articles...")
+        term_sketch = term_sketch_store.create_sketch()
+        new_term_sketch = StaticStatisticsCalculation().calculate_all_term_sketch(
+            term_sketch.epsilon,
+            term_sketch.delta,
+            term_sketch.heavy_hitter_dfs.keys(),
+            self.config["worker_count"],
+            self.config["tokenization_batch_size"],
+            articles=new_articles,
+        )
+
+        # The sketch is merged under its lock, since pages may be merged into it by the API meanwhile.
+        print("Merging term sketch of new articles into the existing sketch in data lake...")
+        self.article_repository.merge_static_term_sketch(new_term_sketch, new_article_keys)
+
+    def _calculate_term_sketch(self: ArticleETL) -> None:
+        """Count the term sketch of all the corpus articles, replacing the existing sketch."""
+        statistics_calculation = StaticStatisticsCalculation()
+        contents = (
+            self.article_repository.get_static_articles(("content",))["content"]
+            .head(self.config["term_sketch_sample_size"], npartitions=-1)
+            .tolist()
+        )
+        print(f"Selecting heavy hitter terms from {len(contents)} articles...")
+        heavy_hitters = statistics_calculation.select_heavy_hitters(
+            contents, self.config["term_sketch_heavy_hitter_count"], self.config["tokenization_batch_size"]
+        )
+
+        print("Counting static term sketch...")
+        term_sketch = statistics_calculation.calculate_all_term_sketch(
+            self.config["term_sketch_epsilon"],
+            self.config["term_sketch_delta"],
+            heavy_hitters,
+            self.config["worker_count"],
+            self.config["tokenization_batch_size"],
+        )
+
+        print("Loading static term sketch to data lake...")
+        self.article_repository.store_static_term_sketch(
+            term_sketch, self.article_repository.get_static_article_keys(self.article_repository.get_static_articles())
+        )
+
+    def _prepare_article_term_index(self: ArticleETL) -> None:
+        """Rank the terms of each corpus article by TF-IDF and store them in our data lake as an index by URL.
+
+        The index is rebuilt only if it's missing or calculated by another version of the statistics, so the corpus
+        articles can be answered without being fetched or tokenized.
+        """
+        statistics_calculation = StaticStatisticsCalculation()
+        statistics_version = statistics_calculation.statistics_version
+        article_term_index = self.article_repository.get_article_term_index()
+        if (
+            not self.config["reset_statistics"]
+            and article_term_index is not None
+            and article_term_index.statistics_version == statistics_version
+        ):
+            return
+
+        articles = statistics_calculation.calculate_all_article_terms(
+            self.config["worker_count"], self.config["tokenization_batch_size"]
+        )
+
+        print("Loading ranked terms of articles to data lake...")
+        self.article_repository.store_article_term_index(articles, statistics_version)
+
+    def _prepare_tf_idf_matrix(self: ArticleETL) -> None:
+        """Calculate the TF-IDF vector of each corpus article and store them in our data lake as a sparse matrix.
+
+        The matrix is rebuilt only if it's missing or calculated by another version of the statistics. The vectors are
+        streamed from the workers into the matrix, so the whole matrix is never kept in memory.
+        """
+        statistics_calculation = StaticStatisticsCalculation()
+        statistics_version = statistics_calculation.statistics_version
+        tf_idf_matrix = self.article_repository.get_tf_idf_matrix()
+        if (
+            not self.config["reset_statistics"]
+            and tf_idf_matrix is not None
+            and tf_idf_matrix.statistics_version == statistics_version
+        ):
+            return
+
+        tf_idf_matrix = self.article_repository.store_tf_idf_matrix(
+            statistics_calculation.calculate_all_article_vectors(
+                self.config["worker_count"], self.config["tokenization_batch_size"]
+            ),
+            statistics_version,
+        )
+        print(
+            f"Stored a TF-IDF matrix of {tf_idf_matrix.article_count} articles by {tf_idf_matrix.term_count} terms "
+            f"({tf_idf_matrix.nonzero_count} nonzero items)."
+        )
 
     def _load_articles_to_database(self: ArticleETL) -> None:
-        """Create an Elastic index and insert all the corpus articles into it."""
-        if not self.config["reset_data"] and self.article_repository.article_index_exists():
+        """Create an Elastic index and insert all the corpus articles into it.
+
+        The articles are loaded partition by partition, and each loaded partition is recorded in a checkpoint.
+        An interrupted load resumes from the first partition which is not loaded, and since the articles are inserted
+        by deterministic IDs, a partially loaded partition is just overwritten. The index refreshes and replicas are
+        disabled during the load.
+        """
+        checkpoint = self._read_load_checkpoint()
+        if self.config["reset_data"] or not self.article_repository.article_index_exists():
+            self.article_repository.create_index(True)
+            checkpoint = None
+        elif checkpoint is None or checkpoint["completed"]:
             return
 
         articles = self.article_repository.get_static_articles().fillna("")
         article_count = self.article_repository.get_static_article_count()
+        if checkpoint is None or checkpoint["partition_count"] != articles.npartitions:
+            checkpoint = {
+                "partition_count": articles.npartitions,
+                "loaded_partitions": [],
+                "loaded_article_count": 0,
+                "index_settings": None,
+                "completed": False,
+            }
+        if checkpoint["index_settings"] is None:
+            # The original settings are kept in the checkpoint to be restored, even if the load is interrupted.
+            checkpoint["index_settings"] = self.article_repository.disable_index_refresh()
+            self._write_load_checkpoint(checkpoint)
+
+        progress_bar = tqdm(total=article_count, initial=checkpoint["loaded_article_count"], unit="docs")
+        progress_bar.set_description(f"    Inserting {article_count} articles into Elastic database")
+        start_time = time.perf_counter()
+        inserted_article_count = 0
+        try:
+            for partition_index in range(articles.npartitions):
+                if partition_index in checkpoint["loaded_partitions"]:
+                    continue
+
+                for _ in self.article_repository.insert_articles(
+                    articles.get_partition(partition_index).compute(),
+                    self.config["bulk_chunk_size"],
+                    self.config["bulk_thread_count"],
+                ):
+                    inserted_article_count += 1
+                    progress_bar.update()
+
+                checkpoint["loaded_partitions"].append(partition_index)
+                checkpoint["loaded_article_count"] = progress_bar.n
+                self._write_load_checkpoint(checkpoint)
+        finally:
+            progress_bar.close()
+            self.article_repository.restore_index_settings(checkpoint["index_settings"])
+            checkpoint["index_settings"] = None
+            self._write_load_checkpoint(checkpoint)
+
+        checkpoint["completed"] = True
+        self._write_load_checkpoint(checkpoint)
+
+        elapsed_time = time.perf_counter() - start_time
+        print(f"Inserted {inserted_article_count} articles ({inserted_article_count / elapsed_time:.1f} docs/sec).")
+
+    def _get_load_checkpoint_path(self: ArticleETL) -> Path:
+        return Path(f"{self.article_repository.data_lake_path}/{self.config['load_checkpoint_key']}")
 
-        self.article_repository.create_index(True)
+    def _read_load_checkpoint(self: ArticleETL) -> Optional[Dict[str, Any]]:
+        """Read the checkpoint of the last load of articles to the database, if any."""
+        try:
+            with open(self._get_load_checkpoint_path()) as checkpoint_file:
+                return json.load(checkpoint_file)
+        except FileNotFoundError:
+            return None
 
-        progress_bar = tqdm(total=article_count)
-        progress_bar.set_description(f"    Inserting {article_count} articles into Elastic database:")
-        for articles_batch in articles.partitions:
-            self.article_repository.insert_articles(articles_batch.compute())
+    def _write_load_checkpoint(self: ArticleETL, checkpoint: Dict[str, Any]) -> None:
+        checkpoint_path = self._get_load_checkpoint_path()
+        checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_checkpoint_path = checkpoint_path.with_name(f".{checkpoint_path.name}.tmp")
+        with open(temporary_checkpoint_path, "w") as checkpoint_file:
+            json.dump(checkpoint, checkpoint_file)
+        os.replace(temporary_checkpoint_path, checkpoint_path)
 
 
 class ArticleETLError(Exception):
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Type
+from urllib import parse
+
+from app.data_storage.page_content_cache import CachedPageContent, PageContentCache
+from app.utility.data_extraction import extract_content_from_html
+from app.utility.metrics import measure_stage
+from app.utility.page_fetcher import FetchedPage, PageFetcher
+from app.utility.profiling import run_profiled
+
+
+class PageContentExtraction:
+    """A class for extracting the text content of pages, which caches the extracted contents by the page URLs.
+
+    An expired content is revalidated by a conditional request (i.e., `If-None-Match` and `If-Modified-Since`),
+    so if the page is not modified, both downloading and parsing the page are skipped.
+    """
+
+    _cache: Optional[PageContentCache] = None
+    _cache_lock = threading.Lock()
+    _statistics: Dict[str, int] = {"hits": 0, "revalidations": 0, "misses": 0, "bytes_saved": 0}
+
+    def __init__(self: PageContentExtraction) -> None:
+        self._page_fetcher = PageFetcher.get_instance()
+        self._ttl = float(os.getenv("PAGE_CONTENT_CACHE_TTL", 300))
+
+    @property
+    def cache(self: PageContentExtraction) -> PageContentCache:
+        """The page content cache shared by the whole process."""
+        return self.get_cache()
+
+    @classmethod
+    def get_cache(cls: Type[PageContentExtraction]) -> PageContentCache:
+        if not cls._cache:
+            with cls._cache_lock:
+                if not cls._cache:
+                    cls._cache = PageContentCache(
+                        Path(os.getenv("PAGE_CONTENT_CACHE_PATH", "data_lake/cache/page_content")),
+                        int(os.getenv("PAGE_CONTENT_CACHE_MEMORY_MAX_SIZE", 1000)),
+                        int(os.getenv("PAGE_CONTENT_CACHE_DISK_MAX_SIZE", 100000)),
+                        int(os.getenv("PAGE_CONTENT_CACHE_MEMORY_MAX_BYTES", 67108864)),
+                    )
+
+        return cls._cache
+
+    @classmethod
+    def get_statistics(cls: Type[PageContentExtraction]) -> Dict[str, Any]:
+        """Get the hit/miss counters and the number of bytes not downloaded due to the cache."""
+        lookup_count = sum(cls._statistics[name] for name in ("hits", "revalidations", "misses"))
+        return {
+            **cls._statistics,
+            "hit_ratio": (
+                (cls._statistics["hits"] + cls._statistics["revalidations"]) / lookup_count if lookup_count else 0.0
+            ),
+        }
+
+    async def extract_content(self: PageContentExtraction, page_url: str) -> str:
+        """Get the text content of an HTML page (inside the body tag).
+
+        Args:
+            page_url (str): The page URL.
+
+        Returns:
+            str:
+        """
+        url = parse.unquote(page_url)
+        cached_page_content = await self.cache.get(url)
+        if cached_page_content and cached_page_content.expires_at > time.time():
+            self._count("hits", cached_page_content.size)
+            return cached_page_content.content
+
+        with measure_stage("fetch", "any"):
+            page = await self._page_fetcher.fetch(url, self._get_conditional_headers(cached_page_content))
+        if cached_page_content and page.status == 304:
+            self._count("revalidations", cached_page_content.size)
+            await self.cache.set(cached_page_content.refresh(self._get_expiry_time(page)))
+            return cached_page_content.content
+
+        self._count("misses")
+        with measure_stage("extract", "any"):
+            content = await asyncio.to_thread(run_profiled, extract_content_from_html, page.text)
+        if page.status == 200 and "no-store" not in page.headers.get("Cache-Control", ""):
+            await self.cache.set(
+                CachedPageContent(
+                    url=url,
+                    content=content,
+                    expires_at=self._get_expiry_time(page),
+                    size=page.size,
+                    etag=page.headers.get("ETag"),
+                    last_modified=page.headers.get("Last-Modified"),
+                )
+            )
+
+        return content
+
+    def _get_conditional_headers(
+        self: PageContentExtraction, cached_page_content: Optional[CachedPageContent]
+    ) -> Dict[str, str]:
+        headers = {}
+        if cached_page_content and cached_page_content.etag:
+            headers["If-None-Match"] = cached_page_content.etag
+        if cached_page_content and cached_page_content.last_modified:
+            headers["If-Modified-Since"] = cached_page_content.last_modified
+
+        return headers
+
+    def _get_expiry_time(self: PageContentExtraction, page: FetchedPage) -> float:
+        """Get the time until which the page content is fresh by its `Cache-Control` header or the default TTL."""
+        cache_control = page.headers.get("Cache-Control", "")
+        if "no-cache" in cache_control:
+            return 0.0
+
+        max_age = re.search(r"max-age=(\d+)", cache_control)
+        return time.time() + (int(max_age.group(1)) if max_age else self._ttl)
+
+    @classmethod
+    def _count(cls: Type[PageContentExtraction], name: str, saved_byte_count: int = 0) -> None:
+        cls._statistics[name] += 1
+        cls._statistics["bytes_saved"] += saved_byte_count
@@ -0,0 +1,302 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Type
+
+from app.data_storage.page_spool import PageSpool, SpooledPage
+from app.repositories.article_repository import ArticleRepository
+from app.utility.cache import LRUCache
+from app.utility.data_extraction import normalize_url
+from app.utility.metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+
+class PageIngestion:
+    """A write-behind pipeline which adds the scored pages to the articles, so the statistics grow with the requests.
+
+    Submitting a page never waits for any I/O: the page is only deduplicated by its URL and queued, or dropped if too
+    many pages are already waiting. A background thread spools the queued pages durably, deduplicates them by their
+    content hash, and writes them in batches (once there are enough of them, or once the oldest one has waited for the
+    flush interval) into the article index by bulk requests and into the static term statistics.
+    A spooled page is only removed once it's written, so the pages of a stopped process are written by the next one.
+    A batch which fails is retried after a growing delay. Both writes are idempotent, so a retried batch is never
+    counted twice: each page is keyed by its normalized URL in both of them, so it's indexed by the same ID again, and
+    it's skipped if its key is already in the statistics.
+    """
+
+    MAX_RETRY_DELAY = 60.0
+
+    _instance: Optional[PageIngestion] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(
+        self: PageIngestion,
+        spool_directory: Path,
+        max_queue_size: int = 1000,
+        batch_size: int = 100,
+        flush_interval: float = 5.0,
+        deduplication_cache_size: int = 100000,
+        writer: Optional[Callable[[List[SpooledPage]], Any]] = None,
+    ) -> None:
+        """
+        Args:
+            spool_directory (Path): Path to the directory of the durable spool.
+            max_queue_size (int): Maximum number of pages waiting to be written, after which new pages are dropped.
+            batch_size (int): Maximum number of pages written together.
+            flush_interval (float): Maximum number of seconds a page waits for its batch to be filled.
+            deduplication_cache_size (int): Number of the latest page URLs and content hashes kept for deduplication.
+            writer (Optional[Callable[[List[SpooledPage]], Any]]): The function writing a batch of pages. Defaults to
+                                                                   writing them into the database and the statistics.
+        """
+        self._spool = PageSpool(spool_directory)
+        self._max_queue_size = max_queue_size
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._writer = writer or self.write_pages
+        self._seen_urls = LRUCache(deduplication_cache_size)
+        self._seen_content_hashes = LRUCache(deduplication_cache_size)
+        # The queued pages are bounded by the pending count (i.e., along with the spooled pages), not by the queue.
+        self._queue: queue.Queue[Optional[SpooledPage]] = queue.Queue()
+        self._pending_count = 0
+        self._spooled_count = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def get_instance(cls: Type[PageIngestion]) -> Optional[PageIngestion]:
+        """Get the page ingestion shared by the whole process, or None if it's not enabled."""
+        if cls._instance is None and os.getenv("INGESTION_ENABLED", "false").lower() == "true":
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls(
+                        Path(os.getenv("INGESTION_SPOOL_PATH", "data_lake/spool/pages")),
+                        max_queue_size=int(os.getenv("INGESTION_MAX_QUEUE_SIZE", 1000)),
+                        batch_size=int(os.getenv("INGESTION_BATCH_SIZE", 100)),
+                        flush_interval=float(os.getenv("INGESTION_FLUSH_INTERVAL", 5)),
+                        deduplication_cache_size=int(os.getenv("INGESTION_DEDUPLICATION_CACHE_SIZE", 100000)),
+                    )
+
+        return cls._instance
+
+    def start(self: PageIngestion) -> None:
+        """Recover the pages left in the spool (e.g., by a stopped process), and start writing the pages."""
+        if self._thread is not None:
+            return
+
+        recovered_pages = self._spool.open()
+        for page in recovered_pages:
+            self._seen_urls.set(normalize_url(page.url) or page.url, True)
+        with self._lock:
+            self._pending_count += len(recovered_pages)
+
+        self._thread = threading.Thread(target=self._run, args=(recovered_pages,), name="page-ingestion", daemon=True)
+        self._thread.start()
+
+    def shutdown(self: PageIngestion, timeout: Optional[float] = None) -> None:
+        """Write the pending pages once more and stop. The pages which are not written yet stay in the spool.
+
+        The spool is closed by the writer thread once it stops, so it's never closed while a batch is still being
+        written (e.g., if it takes longer than the timeout).
+        """
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+
+        self._queue.put(None)
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.warning(
+                "Page ingestion didn't stop in %s seconds, so it stops once the current batch is written.", timeout
+            )
+
+    def submit(self: PageIngestion, url: str, content: str, terms: Optional[Iterable[str]] = None) -> bool:
+        """Queue the given page to be written, unless it's already written (or queued) or the queue is full.
+
+        Args:
+            url (str): URL of the page.
+            content (str): The extracted content of the page.
+            terms (Optional[Iterable[str]]): The terms of the content by the static analyzer, if they're known.
+                                             Otherwise the content is tokenized when it's written.
+
+        Returns:
+            bool: Whether the page is queued.
+        """
+        url_key = normalize_url(url) or url
+        if self._seen_urls.get(url_key) is not None:
+            Metrics.increment("ingestion_pages_total", result="duplicate")
+            return False
+
+        with self._lock:
+            if self._thread is None or self._pending_count >= self._max_queue_size:
+                Metrics.increment("ingestion_pages_total", result="dropped")
+                return False
+            self._pending_count += 1
+
+        self._seen_urls.set(url_key, True)
+        self._queue.put(SpooledPage(url, content, "", time.time(), None if terms is None else list(terms)))
+        Metrics.increment("ingestion_pages_total", result="queued")
+
+        return True
+
+    def get_statistics(self: PageIngestion) -> Dict[str, Any]:
+        return {
+            "queue_depth": self._pending_count,
+            "spooled_pages": self._spooled_count,
+            "max_queue_size": self._max_queue_size,
+        }
+
+    def _run(self: PageIngestion, pages: List[SpooledPage]) -> None:
+        """Write the pages by the writer thread, and close the spool once it stops."""
+        try:
+            self._write_batches(pages)
+        finally:
+            self._spool.close()
+
+    def _write_batches(self: PageIngestion, pages: List[SpooledPage]) -> None:
+        """Spool the queued pages and write them in batches, until the ingestion is stopped."""
+        self._spooled_count = len(pages)
+        flush_at = retry_at = time.monotonic()
+        retry_delay = 0.0
+        stopping = False
+        while not stopping:
+            # Wait for the next page, until the pending batch is due (or the failed batch is to be retried).
+            due_at = max(retry_at, flush_at if len(pages) < self._batch_size else 0.0)
+            try:
+                queued_pages = [self._queue.get(timeout=max(due_at - time.monotonic(), 0) if pages else None)]
+                while not self._queue.empty():
+                    queued_pages.append(self._queue.get_nowait())
+            except queue.Empty:
+                queued_pages = []
+
+            stopping = None in queued_pages
+            if not pages:
+                flush_at = time.monotonic() + self._flush_interval
+            pages.extend(self._spool_pages([page for page in queued_pages if page is not None]))
+
+            while pages and (
+                stopping
+                or time.monotonic() >= retry_at
+                and (len(pages) >= self._batch_size or time.monotonic() >= flush_at)
+            ):
+                batch_size = self._batch_size
+                batch, pages = pages[:batch_size], pages[batch_size:]
+                if not self._flush(batch):
+                    pages = batch + pages
+                    retry_delay = min(max(retry_delay * 2, self._flush_interval), self.MAX_RETRY_DELAY)
+                    retry_at = time.monotonic() + retry_delay
+                    break
+
+                retry_delay = 0.0
+                flush_at = time.monotonic() + self._flush_interval
+
+    def _spool_pages(self: PageIngestion, pages: List[SpooledPage]) -> List[SpooledPage]:
+        """Spool the given pages durably, except the pages whose contents are already seen.
+
+        Returns:
+            List[SpooledPage]: The spooled pages, along with their content hashes.
+        """
+        spooled_pages = []
+        duplicate_count = 0
+        for page in pages:
+            content_hash = hashlib.blake2b(page.content.encode("utf-8"), digest_size=16).hexdigest()
+            if self._seen_content_hashes.get(content_hash) is not None:
+                duplicate_count += 1
+                continue
+
+            self._seen_content_hashes.set(content_hash, True)
+            spooled_page = SpooledPage(page.url, page.content, content_hash, page.submitted_at, page.terms)
+            self._spool.append(spooled_page)
+            spooled_pages.append(spooled_page)
+
+        if duplicate_count:
+            Metrics.increment("ingestion_pages_total", duplicate_count, result="duplicate")
+            with self._lock:
+                self._pending_count -= duplicate_count
+        self._spooled_count += len(spooled_pages)
+
+        return spooled_pages
+
+    def _flush(self: PageIngestion, pages: List[SpooledPage]) -> bool:
+        """Write the given batch of pages, and remove them from the spool once they're written.
+
+        Returns:
+            bool: Whether the batch is written.
+        """
+        start_time = time.perf_counter()
+        try:
+            self._writer(pages)
+        except Exception:
+            logger.exception("Writing a batch of %d pages failed, so it's retried later.", len(pages))
+            Metrics.increment("ingestion_flushes_total", result="error")
+            return False
+
+        flushed_at = time.time()
+        Metrics.observe("ingestion_flush_duration_seconds", time.perf_counter() - start_time)
+        Metrics.observe("ingestion_flush_size", len(pages), bucket_bounds=Metrics.SIZE_BUCKET_BOUNDS)
+        Metrics.increment("ingestion_flushes_total", result="success")
+        Metrics.increment("ingestion_pages_total", len(pages), result="written")
+        for page in pages:
+            Metrics.observe("ingestion_write_delay_seconds", flushed_at - page.submitted_at)
+
+        self._spool.remove(pages)
+        self._spooled_count -= len(pages)
+        with self._lock:
+            self._pending_count -= len(pages)
+
+        return True
+
+    @staticmethod
+    def write_pages(pages: List[SpooledPage]) -> None:
+        """Write the given pages into the article index and the static term statistics (or term sketch).
+
+        Both are written by the same article key of a page, i.e., its normalized URL. The pages which are already
+        corpus articles (by the normalized URLs of the article term index built by the ETL) are skipped, so they're
+        never counted twice.
+
+        Args:
+            pages (List[SpooledPage]): The pages to be written.
+        """
+        from app.services.statistics.static_statistics_calculation import StaticStatisticsCalculation
+
+        article_repository = ArticleRepository()
+        article_term_index = article_repository.get_article_term_index()
+        new_pages = {normalize_url(page.url) or page.url: page for page in pages}
+        if article_term_index is not None:
+            new_pages = {
+                article_key: page
+                for article_key, page in new_pages.items()
+                if not article_term_index.contains(article_key)
+            }
+        if not new_pages:
+            return
+
+        article_repository.insert_pages(
+            (article_key, page.url, page.content) for article_key, page in new_pages.items()
+        )
+
+        # The pages scored by the static calculation are already tokenized by the same analyzer.
+        untokenized_pages = [page for page in new_pages.values() if page.terms is None]
+        tokenized_terms = iter(
+            StaticStatisticsCalculation().tokenize_batch([page.content for page in untokenized_pages])
+            if untokenized_pages
+            else []
+        )
+        article_repository.add_static_articles(
+            {
+                article_key: page.terms if page.terms is not None else next(tokenized_terms)
+                for article_key, page in new_pages.items()
+            }
+        )
+
+        if article_repository.term_statistics_mode == ArticleRepository.EXACT_TERM_STATISTICS_MODE and (
+            article_repository.get_static_term_statistics_segments().get_delta_count()
+            >= int(os.getenv("TERM_STATISTICS_MAX_DELTA_COUNT", 8))
+        ):
+            article_repository.compact_static_term_statistics()
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from app.repositories.article_repository import ArticleRepository
+from app.utility.cache import LRUCache
+
+
+class DynamicStatisticsCache:
+    """A process-wide cache of the dynamic statistics (i.e., term DFs and total article count) from Elastic database.
+
+    The cached statistics are invalidated whenever the generation of the article index (i.e., the article count or
+    the refresh count) changes. The generation is checked at most once per check interval to not add a round trip
+    to every request, and each entry also expires after a TTL to bound its staleness.
+    """
+
+    _instance: Optional[DynamicStatisticsCache] = None
+    _instance_lock = threading.Lock()
+
+    ARTICLE_COUNT_KEY = ("article_count",)
+
+    def __init__(
+        self: DynamicStatisticsCache,
+        article_repository: ArticleRepository,
+        max_size: int,
+        ttl: float,
+        generation_check_interval: float,
+    ) -> None:
+        """
+        Args:
+            article_repository (ArticleRepository): The repository to get the article index generation from.
+            max_size (int): Maximum number of cached statistics.
+            ttl (float): Number of seconds after which a cached statistic expires.
+            generation_check_interval (float): Minimum number of seconds between two checks of the index generation.
+        """
+        self._article_repository = article_repository
+        self._cache = LRUCache(max_size, ttl)
+        self._generation_check_interval = generation_check_interval
+        self._generation: Optional[Tuple[int, int]] = None
+        self._generation_checked_at = float("-inf")
+        self._generation_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls: Type[DynamicStatisticsCache]) -> DynamicStatisticsCache:
+        """Get the cache shared by the whole process."""
+        if not cls._instance:
+            with cls._instance_lock:
+                if not cls._instance:
+                    cls._instance = cls(
+                        ArticleRepository(),
+                        int(os.getenv("DYNAMIC_CACHE_MAX_SIZE", 100000)),
+                        float(os.getenv("DYNAMIC_CACHE_TTL", 300)),
+                        float(os.getenv("DYNAMIC_CACHE_GENERATION_CHECK_INTERVAL", 5)),
+                    )
+
+        return cls._instance
+
+    @property
+    def generation(self: DynamicStatisticsCache) -> Optional[Tuple[int, int]]:
+        """The last seen generation of the article index."""
+        return self._generation
+
+    def get_term_dfs(self: DynamicStatisticsCache, terms: List[str]) -> Tuple[Dict[str, int], List[str]]:
+        """Get the cached DFs of the given terms.
+
+        Args:
+            terms (List[str]): A collection of terms.
+
+        Returns:
+            Tuple[Dict[str, int], List[str]]: A collection of the cached terms as keys and DFs as values,
+                                              and a collection of the terms missing in the cache.
+        """
+        self.validate()
+        term_dfs = self._cache.get_many(terms)
+
+        return term_dfs, [term for term in terms if term not in term_dfs]
+
+    def set_term_dfs(self: DynamicStatisticsCache, term_dfs: Dict[str, int]) -> None:
+        self._cache.set_many(term_dfs)
+
+    def get_article_count(self: DynamicStatisticsCache) -> Optional[int]:
+        self.validate()
+        return self._cache.get(self.ARTICLE_COUNT_KEY)
+
+    def set_article_count(self: DynamicStatisticsCache, article_count: int) -> None:
+        self._cache.set(self.ARTICLE_COUNT_KEY, article_count)
+
+    def validate(self: DynamicStatisticsCache) -> None:
+        """Clear the cache if the generation of the article index has changed since the last check."""
+        if time.monotonic() - self._generation_checked_at < self._generation_check_interval:
+            return
+
+        with self._generation_lock:
+            if time.monotonic() - self._generation_checked_at < self._generation_check_interval:
+                return
+
+            generation = self._article_repository.get_index_generation()
+            if generation != self._generation:
+                self._cache.clear()
+                self._generation = generation
+            self._generation_checked_at = time.monotonic()
+
+    def get_statistics(self: DynamicStatisticsCache) -> Dict[str, Any]:
+        """Get the size and the hit/miss counters of the cache."""
+        return self._cache.get_statistics()
@@ -1,34 +1,162 @@
 from __future__ import annotations
 
-from typing import List, Dict
+import os
+from typing import Final, List, Dict, Optional, Tuple
 
-import pandas as pd
+import numpy as np
 
+from app.services.statistics.dynamic_statistics_cache import DynamicStatisticsCache
 from app.services.statistics.statistics_calculation import StatisticsCalculation
+from app.services.statistics.term_scores import TermScores, calculate_tf_idfs
+from app.utility.metrics import measure_stage
 
 
 class DynamicStatisticsCalculation(StatisticsCalculation):
-    """A class for providing text related statistics dynamically (i.e., in the request time) from Elastic database."""
-
-    def calculate_term_tf_idfs(self: DynamicStatisticsCalculation, content: str) -> pd.DataFrame:
-        term_tfs = self.calculate_term_tfs(content)
-        term_dfs = self.calculate_term_dfs(list(term_tfs.keys()))
-
-        term_statistics = pd.DataFrame(
-            index=term_tfs.keys(),
-            data={
-                "tf": term_tfs.values(),
-                "df": term_dfs.values(),
-            },
+    """A class for providing text related statistics dynamically (i.e., in the request time) from Elastic database.
+
+    The DFs (document frequencies) can be calculated in one of the following modes:
+        - exact: Cluster-exact DFs and article count by a single search of term filters, after the term vectors call.
+                 Only the DFs missing in the process-wide cache are searched.
+        - shard_local: TFs, DFs and article count all from a single term vectors call. The DFs and the article count
+                       are of the shard in which the content is analyzed, which estimate the cluster ones for
+                       evenly distributed articles.
+        - multi_search: One search per term missing in the process-wide cache by a multi-search call,
+                        plus a count call if the article count is not cached (the former approach).
+    """
+
+    CALCULATION_MODE = "dynamic"
+
+    EXACT_DF_MODE: Final[str] = "exact"
+    SHARD_LOCAL_DF_MODE: Final[str] = "shard_local"
+    MULTI_SEARCH_DF_MODE: Final[str] = "multi_search"
+    DF_MODES: Final[Tuple[str, ...]] = (EXACT_DF_MODE, SHARD_LOCAL_DF_MODE, MULTI_SEARCH_DF_MODE)
+
+    def __init__(self: DynamicStatisticsCalculation, df_mode: Optional[str] = None) -> None:
+        """
+        Args:
+            df_mode (Optional[str]): The mode of calculating DFs. Defaults to `DYNAMIC_DF_MODE` variable or exact mode.
+        """
+        super().__init__()
+
+        self._df_mode = df_mode or os.getenv("DYNAMIC_DF_MODE") or self.EXACT_DF_MODE
+        if self._df_mode not in self.DF_MODES:
+            raise DynamicStatisticsCalculationError(f"DF mode should be one of {', '.join(self.DF_MODES)}.")
+
+    @property
+    def df_mode(self: DynamicStatisticsCalculation) -> str:
+        return self._df_mode
+
+    @property
+    def statistics_cache(self: DynamicStatisticsCalculation) -> DynamicStatisticsCache:
+        """The process-wide cache of cluster-wide DFs and article count."""
+        return DynamicStatisticsCache.get_instance()
+
+    @property
+    def statistics_version(self: DynamicStatisticsCalculation) -> str:
+        # The article index generation changes whenever the articles may change.
+        self.statistics_cache.validate()
+        return f"dynamic:{self.df_mode}:{self.statistics_cache.generation}"
+
+    def calculate_term_tf_idfs(self: DynamicStatisticsCalculation, content: str) -> TermScores:
+        return self.calculate_term_tf_idfs_batch([content])[0]
+
+    def calculate_term_tf_idfs_batch(self: DynamicStatisticsCalculation, contents: List[str]) -> List[TermScores]:
+        if self.df_mode == self.SHARD_LOCAL_DF_MODE:
+            # The TFs and the DFs are returned by the same call, which is measured as the DF lookup.
+            with measure_stage("df_lookup", self.CALCULATION_MODE):
+                term_statistics_batch = [self.calculate_shard_term_statistics(content) for content in contents]
+            with measure_stage("score", self.CALCULATION_MODE):
+                return [self.create_term_tf_idfs(*term_statistics) for term_statistics in term_statistics_batch]
+
+        # The cluster-wide DFs of the terms in all the contents are calculated at once.
+        with measure_stage("tokenize", self.CALCULATION_MODE):
+            term_tfs_batch = [self.calculate_term_tfs(content) for content in contents]
+        with measure_stage("df_lookup", self.CALCULATION_MODE):
+            term_dfs, total_article_count = self.calculate_cluster_term_statistics(
+                list(dict.fromkeys(term for term_tfs in term_tfs_batch for term in term_tfs))
+            )
+
+        with measure_stage("score", self.CALCULATION_MODE):
+            return [self.create_term_tf_idfs(term_tfs, term_dfs, total_article_count) for term_tfs in term_tfs_batch]
+
+    def create_term_tf_idfs(
+        self: DynamicStatisticsCalculation, term_tfs: Dict[str, int], term_dfs: Dict[str, int], article_count: int
+    ) -> TermScores:
+        """Calculate TF-IDF of the given terms by their TFs and DFs.
+
+        Args:
+            term_tfs (Dict[str, int]): A collection of terms as keys and TFs as values.
+            term_dfs (Dict[str, int]): A collection of terms (including the given terms) as keys and DFs as values.
+            article_count (int): Total number of articles.
+
+        Returns:
+            TermScores:
+        """
+        tfs = np.fromiter(term_tfs.values(), dtype=np.int64, count=len(term_tfs))
+        dfs = np.fromiter((term_dfs[term] for term in term_tfs), dtype=np.int64, count=len(term_tfs))
+
+        return TermScores.create(
+            list(term_tfs),
+            calculate_tf_idfs(tfs, self.calculate_term_idfs(article_count, dfs), self.TF_IDF_DECIMAL_PLACE_COUNT),
         )
 
-        total_article_count = self.article_repository.get_total_article_count()
-        term_statistics["tf-idf"] = round(
-            term_statistics["tf"] * self.calculate_term_idfs(total_article_count, term_statistics["df"]),
-            self.TF_IDF_DECIMAL_PLACE_COUNT,
+    def calculate_shard_term_statistics(
+        self: DynamicStatisticsCalculation, content: str
+    ) -> Tuple[Dict[str, int], Dict[str, int], int]:
+        """Calculate TF and shard DF of each term in the given text content, and total number of articles in the shard.
+
+        Args:
+            content (str): The text content whose terms should be analyzed.
+
+        Returns:
+            Tuple[Dict[str, int], Dict[str, int], int]: A collection of terms as keys and TFs as values,
+                                                        a collection of terms as keys and DFs as values,
+                                                        and the total number of articles.
+        """
+        term_vectors = self.article_repository.get_article_content_term_vectors(content, True)
+        term_statistics = term_vectors["terms"]
+
+        return (
+            {term: term_statistic["term_freq"] for term, term_statistic in term_statistics.items()},
+            {term: term_statistic.get("doc_freq", 0) for term, term_statistic in term_statistics.items()},
+            term_vectors.get("field_statistics", {}).get("doc_count", 0),
         )
 
-        return term_statistics[["tf-idf"]]
+    def calculate_cluster_term_statistics(
+        self: DynamicStatisticsCalculation, terms: List[str]
+    ) -> Tuple[Dict[str, int], int]:
+        """Calculate the cluster-wide DF of each given term, and total number of articles.
+
+        The DFs and the article count are served from the cache as much as possible.
+
+        Args:
+            terms (List[str]): A collection of analyzed terms.
+
+        Returns:
+            Tuple[Dict[str, int], int]: A collection of terms as keys and DFs as values, and the total number of articles.
+        """
+        term_dfs, missing_terms = self.statistics_cache.get_term_dfs(terms)
+        total_article_count = self.statistics_cache.get_article_count()
+
+        if self.df_mode == self.EXACT_DF_MODE:
+            if missing_terms or total_article_count is None:
+                missing_term_dfs, total_article_count = self.article_repository.count_articles_by_terms(
+                    missing_terms, "content"
+                )
+                term_dfs.update(missing_term_dfs)
+                self.statistics_cache.set_term_dfs(missing_term_dfs)
+                self.statistics_cache.set_article_count(total_article_count)
+
+            return term_dfs, total_article_count
+
+        missing_term_dfs = self.calculate_term_dfs(missing_terms)
+        term_dfs.update(missing_term_dfs)
+        self.statistics_cache.set_term_dfs(missing_term_dfs)
+        if total_article_count is None:
+            total_article_count = self.article_repository.get_total_article_count()
+            self.statistics_cache.set_article_count(total_article_count)
+
+        return term_dfs, total_article_count
 
     def calculate_term_tfs(self: DynamicStatisticsCalculation, content: str) -> Dict[str, int]:
         """Calculate TF (term frequency) for each term in the given text content.
@@ -43,7 +171,7 @@ class DynamicStatisticsCalculation(StatisticsCalculation):
         return {term: term_statistic["term_freq"] for term, term_statistic in term_statistics.items()}
 
     def calculate_term_dfs(self: DynamicStatisticsCalculation, terms: List[str]) -> Dict[str, int]:
-        """Calculate DF (document frequency) for the given terms.
+        """Calculate DF (document frequency) for the given terms by one search per term.
 
         Args:
             terms (List[str]): The text content whose terms should be analyzed.
@@ -51,6 +179,16 @@ class DynamicStatisticsCalculation(StatisticsCalculation):
         Returns:
             Dict[str, int]: A collection of terms as keys and DFs as values.
         """
+        if not terms:
+            return {}
+
         term_search_results = self.article_repository.search_articles_by_terms(terms, ["content"], 0)
 
         return {terms[i]: term_search_results[i]["hits"]["total"] for i in range(len(terms))}
+
+
+class DynamicStatisticsCalculationError(Exception):
+    """Raise when dynamic statistics can not be calculated."""
+
+    def __init__(self: DynamicStatisticsCalculationError, error_message: str) -> None:
+        super(DynamicStatisticsCalculationError, self).__init__(error_message)
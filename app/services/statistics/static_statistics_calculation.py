@@ -1,61 +1,167 @@
 from __future__ import annotations
 
-import string
-from collections import Counter, defaultdict
-from functools import cached_property
-from typing import Dict, Optional, List
-
-import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-import spacy
-from spacy import Language
-from spacy.lang.char_classes import LIST_ELLIPSES, LIST_ICONS, ALPHA_LOWER, ALPHA_UPPER, CONCAT_QUOTES, ALPHA
-from spacy.tokens import Token
-from spacy.util import compile_infix_regex
-from tqdm import tqdm
-
+import os
+import time
+from collections import Counter
+from typing import TYPE_CHECKING, Any, Callable, Dict, Final, Iterable, Iterator, Optional, List, Tuple, Type
+
+import numpy as np
+
+from app.data_storage.article_term_index import ArticleTerms
+from app.data_storage.term_sketch import TermSketch
+from app.data_storage.tf_idf_matrix import TfIdfMatrixBlock
+from app.services.analysis.analyzer import Analyzer
+from app.services.analysis.analyzer_registry import AnalyzerRegistry
 from app.services.statistics.statistics_calculation import StatisticsCalculation
+from app.services.statistics.term_scores import TermScores, calculate_tf_idfs, select_top_term_ids
+from app.utility.data_extraction import normalize_url
+from app.utility.metrics import Metrics, measure_stage
+
+if TYPE_CHECKING:
+    import dask.dataframe as dd
+    import pandas as pd
 
 
 class StaticStatisticsCalculation(StatisticsCalculation):
     """A class for providing text related statistics using the statically processed data in data lake."""
 
-    @cached_property
-    def analyzer(self: StaticStatisticsCalculation) -> Language:
-        """The analyzer for text tokenization."""
-        analyzer = spacy.load("en_core_web_sm", disable=["parser", "ner"])
-        infixes = (
-            LIST_ELLIPSES
-            + LIST_ICONS
-            + [
-                r"(?<=[0-9])[+\-\*^](?=[0-9-])",
-                r"(?<=[{al}{q}])\.(?=[{au}{q}])".format(al=ALPHA_LOWER, au=ALPHA_UPPER, q=CONCAT_QUOTES),
-                r"(?<=[{a}]),(?=[{a}])".format(a=ALPHA),
-                # Skip regex that splits on hyphens between letters:
-                # r"(?<=[{a}])(?:{h})(?=[{a}])".format(a=ALPHA, h=HYPHENS),
-                r"(?<=[{a}0-9])[:<>=/](?=[{a}])".format(a=ALPHA),
-            ]
-        )
-        infix_regex = compile_infix_regex(infixes)
-        analyzer.tokenizer.infix_finditer = infix_regex.finditer
+    CALCULATION_MODE = "static"
+
+    TOKENIZATION_BATCH_SIZE: Final[int] = 32
+    DF_MERGE_FAN_IN: Final[int] = 4
+
+    @property
+    def analyzer(self: StaticStatisticsCalculation) -> Analyzer:
+        """The analyzer for text tokenization (by the configured backend), which is shared by the whole process."""
+        return AnalyzerRegistry.get_analyzer()
+
+    @property
+    def statistics_version(self: StaticStatisticsCalculation) -> str:
+        term_statistics = self.article_repository.get_static_term_statistics()
+        return f"static:{term_statistics.base_version}:{term_statistics.version}"
+
+    @classmethod
+    def warm_up(cls: Type[StaticStatisticsCalculation]) -> None:
+        """Load the analyzers and the static term statistics of the process (e.g., of each scoring worker)."""
+        AnalyzerRegistry.warm_up()
+        cls().article_repository.get_static_term_statistics()
+
+    def calculate_term_tf_idfs(self: StaticStatisticsCalculation, content: str) -> TermScores:
+        return self.calculate_term_tf_idfs_batch([content])[0]
+
+    def calculate_term_tf_idfs_batch(self: StaticStatisticsCalculation, contents: List[str]) -> List[TermScores]:
+        with measure_stage("tokenize", self.CALCULATION_MODE):
+            term_tfs_batch = [Counter(terms) for terms in self.tokenize_batch(contents)]
+
+        # Only the terms of the given contents are looked up in the term statistics (all at once),
+        # whose IDFs are precomputed by the DFs and the total number of articles in the corpus.
+        # The IDF for the terms which doesn't exist in any articles is calculated by zero DF.
+        with measure_stage("df_lookup", self.CALCULATION_MODE):
+            terms = list(dict.fromkeys(term for term_tfs in term_tfs_batch for term in term_tfs))
+            term_statistics = self.article_repository.get_static_term_statistics()
+            term_idfs = dict(zip(terms, term_statistics.lookup_idfs(terms).tolist()))
+
+        term_tf_idfs_batch = []
+        with measure_stage("score", self.CALCULATION_MODE):
+            for term_tfs in term_tfs_batch:
+                tfs = np.fromiter(term_tfs.values(), dtype=np.int64, count=len(term_tfs))
+                idfs = np.fromiter((term_idfs[term] for term in term_tfs), dtype=np.float64, count=len(term_tfs))
+                term_tf_idfs_batch.append(
+                    TermScores.create(list(term_tfs), calculate_tf_idfs(tfs, idfs, self.TF_IDF_DECIMAL_PLACE_COUNT))
+                )
+
+        return term_tf_idfs_batch
+
+    def rank_corpus_article_terms(
+        self: StaticStatisticsCalculation, url: str, limit: Optional[int] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Rank the terms of the corpus article with the given URL by the precomputed index, if it's in the index.
+
+        The precomputed ranking is returned as is while the statistics are of the same version it's calculated by.
+        Otherwise, the precomputed TFs are rescored by the current statistics, so the page is still not tokenized.
+
+        Args:
+            url (str): URL of the page.
+            limit (Optional[int]): Maximum number of terms to be returned. All the terms are returned, if not given.
 
-        return analyzer
+        Returns:
+            Optional[List[Dict[str, Any]]]: A collection of terms and their TF-IDFs sorted by descending order of
+                                            TF-IDFs, or None if the page is not a corpus article in the index.
+        """
+        article_term_index = self.article_repository.get_article_term_index()
+        normalized_url = normalize_url(url)
+        if article_term_index is None or not normalized_url:
+            return None
 
-    def calculate_term_tf_idfs(self: StaticStatisticsCalculation, content: str) -> pd.DataFrame:
-        term_tfs_dict = self.calculate_term_tfs(content)
-        term_tfs = pd.DataFrame(index=term_tfs_dict.keys(), data=term_tfs_dict.values(), columns=["tf"])
+        with measure_stage("index_lookup", self.CALCULATION_MODE):
+            up_to_date = article_term_index.statistics_version == self.statistics_version
+            article_terms = article_term_index.lookup(normalized_url, limit if up_to_date else None)
+        Metrics.increment("article_term_index_lookups_total", result="miss" if article_terms is None else "hit")
+        if article_terms is None:
+            return None
 
-        term_dfs = self.article_repository.get_static_term_statistics()
+        with measure_stage("rank", self.CALCULATION_MODE):
+            if up_to_date:
+                return [
+                    {"term": term, "tf-idf": tf_idf}
+                    for term, tf_idf in zip(
+                        article_terms.terms,
+                        np.round(article_terms.tf_idfs, self.TF_IDF_DECIMAL_PLACE_COUNT).tolist(),
+                    )
+                ]
+
+            idfs = self.article_repository.get_static_term_statistics().lookup_idfs(article_terms.terms)
+            return TermScores.create(
+                article_terms.terms,
+                calculate_tf_idfs(article_terms.tfs, idfs, self.TF_IDF_DECIMAL_PLACE_COUNT),
+            ).rank(limit)
+
+    def find_related_articles(
+        self: StaticStatisticsCalculation, content: str, limit: int, url: Optional[str] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Find the corpus articles which are most similar to the given content by cosine similarity of TF-IDFs.
+
+        The content is vectorized by the same tokenizer and statistics as the corpus articles in the TF-IDF matrix.
 
-        # The DF (document frequency) for the terms which doesn't exist in any articles is zero.
-        term_statistics = term_tfs.join(term_dfs, how="left").fillna(0)
+        Args:
+            content (str): The text content to be compared.
+            limit (int): Maximum number of articles to be returned.
+            url (Optional[str]): URL of the page of the content, whose own corpus article is excluded if any.
 
-        total_article_counts = self.article_repository.get_static_article_count()
-        term_statistics["tf-idf"] = round(
-            term_statistics["tf"] * self.calculate_term_idfs(total_article_counts, term_statistics["df"]), 1
-        )
+        Returns:
+            Optional[List[Dict[str, Any]]]: A collection of articles and their similarities sorted by descending order
+                                            of similarity, or None if the TF-IDF matrix is not built yet.
+        """
+        tf_idf_matrix = self.article_repository.get_tf_idf_matrix()
+        if tf_idf_matrix is None:
+            return None
 
-        return term_statistics[["tf-idf"]]
+        with measure_stage("tokenize", self.CALCULATION_MODE):
+            term_tfs = Counter(self.tokenize(content))
+
+        with measure_stage("df_lookup", self.CALCULATION_MODE):
+            terms = list(term_tfs)
+            weights = calculate_article_vector(
+                np.fromiter(term_tfs.values(), dtype=np.int64, count=len(term_tfs)),
+                self.article_repository.get_static_term_statistics().lookup_idfs(terms),
+            )
+            column_ids = tf_idf_matrix.lookup_column_ids(terms)
+
+        with measure_stage("similarity", self.CALCULATION_MODE):
+            in_vocabulary = column_ids >= 0
+            similarities = tf_idf_matrix.calculate_similarities(column_ids[in_vocabulary], weights[in_vocabulary])
+            # One more article is selected, in case the page itself is among them.
+            row_ids = select_top_term_ids(similarities, limit + 1)
+
+        normalized_url = normalize_url(url) if url else ""
+        related_articles = []
+        for row_id in row_ids.tolist():
+            article = tf_idf_matrix.get_article(row_id)
+            if not similarities[row_id] or (normalized_url and normalize_url(article["url"] or "") == normalized_url):
+                continue
+            related_articles.append({**article, "similarity": round(float(similarities[row_id]), 4)})
+
+        return related_articles[:limit]
 
     def calculate_term_tfs(self: StaticStatisticsCalculation, content: str) -> Dict[str, int]:
         """Calculate TF (term frequency) for each term in the given text content.
@@ -68,25 +174,253 @@ class StaticStatisticsCalculation(StatisticsCalculation):
         """
         return Counter(self.tokenize(content))
 
-    def calculate_all_term_dfs(self: StaticStatisticsCalculation) -> Dict[str, int]:
+    def calculate_all_term_dfs(
+        self: StaticStatisticsCalculation,
+        worker_count: Optional[int] = None,
+        batch_size: int = 256,
+        scheduler: str = "processes",
+        articles: Optional[dd.DataFrame] = None,
+    ) -> Dict[str, int]:
         """Calculate the DF (document frequency) for all the available term in corpus.
 
+        The DFs are calculated by map-reduce: the articles of each corpus partition are tokenized in batches and their
+        term DFs are counted in parallel workers, then the partition DFs are merged in a tree reduction.
+
+        Args:
+            worker_count (Optional[int]): Number of parallel workers. Defaults to the number of CPU cores.
+            batch_size (int): Number of articles to be tokenized together.
+            scheduler (str): The dask scheduler to run the workers by (i.e., processes or threads).
+            articles (Optional[dd.DataFrame]): The articles to be counted. Defaults to all the articles in corpus.
+
         Returns:
             Dict[str, int]: A collection of terms as keys and DFs as their values.
         """
-        article_count = self.article_repository.get_static_article_count()
-        progress_bar = tqdm(total=article_count)
-        progress_bar.set_description(f"Calculating document frequency for each term in {article_count} articles:")
-
-        term_dfs: Dict[str, int] = defaultdict(int)
-        articles = self.article_repository.get_static_articles()["content"]
-        for document_content in articles:
-            for term in set(self.tokenize(document_content)):
-                term_dfs[term] += 1
-            progress_bar.update(n=1)
+        # The ETL dependencies are imported on demand, so they're not loaded by the API.
+        import dask
+        from dask.diagnostics import ProgressBar
+
+        if articles is None:
+            articles = self.article_repository.get_static_articles()
+        partition_term_dfs = [
+            dask.delayed(count_article_term_dfs)(partition["content"], batch_size)
+            for partition in articles.to_delayed()
+        ]
+
+        print(f"Calculating document frequency for each term in {articles.npartitions} partitions of articles:")
+        start_time = time.perf_counter()
+        with ProgressBar():
+            article_count, term_dfs = dask.compute(
+                self._merge_in_tree(partition_term_dfs, merge_article_term_dfs, (0, Counter())),
+                scheduler=scheduler,
+                num_workers=worker_count or os.cpu_count(),
+            )[0]
+
+        elapsed_time = time.perf_counter() - start_time
+        print(
+            f"Calculated document frequencies of {article_count} articles ({article_count / elapsed_time:.1f} docs/sec)."
+        )
 
         return term_dfs
 
+    def calculate_all_term_sketch(
+        self: StaticStatisticsCalculation,
+        epsilon: float,
+        delta: float,
+        heavy_hitters: Iterable[str],
+        worker_count: Optional[int] = None,
+        batch_size: int = 256,
+        scheduler: str = "processes",
+        articles: Optional[dd.DataFrame] = None,
+    ) -> TermSketch:
+        """Count the approximate DF (document frequency) of all the terms in corpus by a term sketch.
+
+        The DFs of the articles of each corpus partition are counted exactly in parallel workers and added to a sketch
+        of the partition, then the partition sketches are merged in a tree reduction. So only the DFs of a partition,
+        rather than of the whole corpus, are kept in memory at once.
+
+        Args:
+            epsilon (float): The error of the DFs relative to the mass of the sketch.
+            delta (float): The probability of a DF exceeding the error.
+            heavy_hitters (Iterable[str]): The terms to be counted exactly (e.g., by `select_heavy_hitters`).
+            worker_count (Optional[int]): Number of parallel workers. Defaults to the number of CPU cores.
+            batch_size (int): Number of articles to be tokenized together.
+            scheduler (str): The dask scheduler to run the workers by (i.e., processes or threads).
+            articles (Optional[dd.DataFrame]): The articles to be counted. Defaults to all the articles in corpus.
+
+        Returns:
+            TermSketch:
+        """
+        import dask
+        from dask.diagnostics import ProgressBar
+
+        if articles is None:
+            articles = self.article_repository.get_static_articles()
+        heavy_hitters = list(heavy_hitters)
+        partition_term_sketches = [
+            dask.delayed(sketch_article_term_dfs)(partition["content"], batch_size, epsilon, delta, heavy_hitters)
+            for partition in articles.to_delayed()
+        ]
+
+        print(f"Counting document frequency for each term by sketches of {articles.npartitions} partitions:")
+        start_time = time.perf_counter()
+        with ProgressBar():
+            term_sketch = dask.compute(
+                self._merge_in_tree(
+                    partition_term_sketches, merge_term_sketches, TermSketch.create(epsilon, delta, heavy_hitters)
+                ),
+                scheduler=scheduler,
+                num_workers=worker_count or os.cpu_count(),
+            )[0]
+
+        elapsed_time = time.perf_counter() - start_time
+        print(
+            f"Counted document frequencies of {term_sketch.article_count} articles "
+            f"({term_sketch.article_count / elapsed_time:.1f} docs/sec) with an error bound of "
+            f"{term_sketch.error_bound:.1f}."
+        )
+
+        return term_sketch
+
+    def select_heavy_hitters(
+        self: StaticStatisticsCalculation, contents: Iterable[str], count: int, batch_size: int = 256
+    ) -> List[str]:
+        """Select the terms with the highest DFs in the given sample of articles, to be counted exactly by sketches.
+
+        Args:
+            contents (Iterable[str]): Contents of a sample of articles.
+            count (int): Maximum number of terms to be selected.
+            batch_size (int): Number of articles to be tokenized together.
+
+        Returns:
+            List[str]: The terms sorted by descending order of their DFs in the sample.
+        """
+        return [term for term, _ in count_article_term_dfs(contents, batch_size)[1].most_common(count)]
+
+    def calculate_all_article_terms(
+        self: StaticStatisticsCalculation,
+        worker_count: Optional[int] = None,
+        batch_size: int = 256,
+        scheduler: str = "processes",
+        articles: Optional[dd.DataFrame] = None,
+    ) -> List[Tuple[str, ArticleTerms]]:
+        """Rank the terms of each corpus article with a URL by their TF-IDF, calculated by the current statistics.
+
+        The articles of each corpus partition are tokenized and scored in parallel workers.
+
+        Args:
+            worker_count (Optional[int]): Number of parallel workers. Defaults to the number of CPU cores.
+            batch_size (int): Number of articles to be tokenized together.
+            scheduler (str): The dask scheduler to run the workers by (i.e., processes or threads).
+            articles (Optional[dd.DataFrame]): The articles to be ranked. Defaults to all the articles in corpus.
+
+        Returns:
+            List[Tuple[str, ArticleTerms]]: The normalized URL and the ranked terms of each article.
+        """
+        import dask
+        from dask.diagnostics import ProgressBar
+
+        if articles is None:
+            articles = self.article_repository.get_static_articles(("url", "content"))
+        partition_article_terms = [
+            dask.delayed(rank_article_terms)(partition["url"], partition["content"], batch_size)
+            for partition in articles.to_delayed()
+        ]
+
+        print(f"Ranking the terms of each article in {articles.npartitions} partitions of articles:")
+        start_time = time.perf_counter()
+        with ProgressBar():
+            partition_article_terms = dask.compute(
+                *partition_article_terms, scheduler=scheduler, num_workers=worker_count or os.cpu_count()
+            )
+        article_terms = [article for partition in partition_article_terms for article in partition]
+
+        elapsed_time = time.perf_counter() - start_time
+        print(f"Ranked the terms of {len(article_terms)} articles ({len(article_terms) / elapsed_time:.1f} docs/sec).")
+
+        return article_terms
+
+    def calculate_all_article_vectors(
+        self: StaticStatisticsCalculation,
+        worker_count: Optional[int] = None,
+        batch_size: int = 256,
+        scheduler: str = "processes",
+        articles: Optional[dd.DataFrame] = None,
+    ) -> Iterator[TfIdfMatrixBlock]:
+        """Calculate the TF-IDF vector of each corpus article, calculated by the current statistics.
+
+        The articles of each corpus partition are vectorized in parallel workers, a wave of partitions at a time, so
+        only the vectors of a wave are kept in memory while they're consumed.
+
+        Args:
+            worker_count (Optional[int]): Number of parallel workers. Defaults to the number of CPU cores.
+            batch_size (int): Number of articles to be tokenized together.
+            scheduler (str): The dask scheduler to run the workers by (i.e., processes or threads).
+            articles (Optional[dd.DataFrame]): The articles to be vectorized. Defaults to all the articles in corpus.
+
+        Yields:
+            TfIdfMatrixBlock: The vectors of the articles of each partition, in the order of partitions.
+        """
+        import dask
+        from dask.diagnostics import ProgressBar
+
+        key_field = self.article_repository.article_key_field
+        if articles is None:
+            articles = self.article_repository.get_static_articles((key_field, "title", "url", "content"))
+        partitions = articles.to_delayed()
+        worker_count = worker_count or os.cpu_count() or 1
+
+        print(f"Calculating the TF-IDF vector of each article in {articles.npartitions} partitions of articles:")
+        start_time = time.perf_counter()
+        article_count = 0
+        for wave_start in range(0, len(partitions), worker_count):
+            wave_end = wave_start + worker_count
+            with ProgressBar():
+                blocks = dask.compute(
+                    *[
+                        dask.delayed(vectorize_articles)(
+                            partition[key_field], partition["title"], partition["url"], partition["content"], batch_size
+                        )
+                        for partition in partitions[wave_start:wave_end]
+                    ],
+                    scheduler=scheduler,
+                    num_workers=worker_count,
+                )
+            for block in blocks:
+                article_count += len(block.articles)
+                yield block
+
+        elapsed_time = time.perf_counter() - start_time
+        print(
+            f"Calculated the TF-IDF vectors of {article_count} articles ({article_count / elapsed_time:.1f} docs/sec)."
+        )
+
+    def _merge_in_tree(
+        self: StaticStatisticsCalculation, partials: List[Any], merge: Callable[..., Any], empty: Any
+    ) -> Any:
+        """Merge the given delayed partial results (e.g., of the partitions) in a tree, so merging is also parallel.
+
+        Args:
+            partials (List[Any]): The delayed partial results.
+            merge (Callable[..., Any]): The function merging any number of partial results into one.
+            empty (Any): The result if there are no partial results (e.g., no articles).
+
+        Returns:
+            Any: The delayed merged result.
+        """
+        import dask
+
+        if not partials:
+            return dask.delayed(empty)
+
+        while len(partials) > 1:
+            merged_partials = []
+            for merge_start in range(0, len(partials), self.DF_MERGE_FAN_IN):
+                merge_end = merge_start + self.DF_MERGE_FAN_IN
+                merged_partials.append(dask.delayed(merge)(*partials[merge_start:merge_end]))
+            partials = merged_partials
+
+        return partials[0]
+
     def calculate_all_term_idfs(self: StaticStatisticsCalculation) -> pd.DataFrame:
         """Calculate the IDF (inverse document frequency) for all the available term in corpus.
         @deprecated:
@@ -98,6 +432,8 @@ class StaticStatisticsCalculation(StatisticsCalculation):
         Returns:
             pd.DataFrame
         """
+        import pandas as pd
+        from sklearn.feature_extraction.text import TfidfVectorizer
 
         vectorizer = TfidfVectorizer(use_idf=True, smooth_idf=True, tokenizer=self.tokenize)
         vectorizer.fit_transform(self.article_repository.get_static_articles()["content"])
@@ -116,28 +452,177 @@ class StaticStatisticsCalculation(StatisticsCalculation):
         Returns:
             List[str]: A collection of terms.
         """
-        return [term for token in self.analyzer(text) if (term := self.convert_token_to_term(token))]
+        return self.analyzer.analyze(text)
 
-    def convert_token_to_term(self: StaticStatisticsCalculation, token: Token) -> Optional[str]:
-        """Convert the given token to a term in our desired format if possible.
+    def tokenize_batch(
+        self: StaticStatisticsCalculation, texts: Iterable[str], batch_size: Optional[int] = None
+    ) -> List[List[str]]:
+        """Tokenize the given texts into terms by the class analyzer in batches.
 
         Args:
-            token (Token):
+            texts (Iterable[str]):
+            batch_size (Optional[int]): Number of texts to be tokenized together.
 
         Returns:
-            (str, optional): A textual term in our desired format.
+            List[List[str]]: A collection of terms for each text in the same order.
         """
-        if token.is_stop:
-            return None
+        return self.analyzer.analyze_batch(texts, batch_size or self.TOKENIZATION_BATCH_SIZE)
+
+
+def count_article_term_dfs(contents: Iterable[str], batch_size: int) -> Tuple[int, Counter]:
+    """Count the DF (document frequency) of the terms in the given articles.
+
+    Args:
+        contents (Iterable[str]): Contents of the articles.
+        batch_size (int): Number of articles to be tokenized together.
+
+    Returns:
+        Tuple[int, Counter]: Number of the articles, and a collection of terms as keys and DFs as values.
+    """
+    article_count = 0
+    term_dfs: Counter = Counter()
+    for terms in StaticStatisticsCalculation().tokenize_batch(contents, batch_size):
+        article_count += 1
+        term_dfs.update(set(terms))
+
+    return article_count, term_dfs
+
+
+def merge_article_term_dfs(*article_term_dfs: Tuple[int, Counter]) -> Tuple[int, Counter]:
+    """Merge the given article counts and term DFs (document frequencies) counted in separate partitions."""
+    article_count, term_dfs = article_term_dfs[0]
+    for partition_article_count, partition_term_dfs in article_term_dfs[1:]:
+        article_count += partition_article_count
+        term_dfs.update(partition_term_dfs)
+
+    return article_count, term_dfs
+
+
+def sketch_article_term_dfs(
+    contents: Iterable[str], batch_size: int, epsilon: float, delta: float, heavy_hitters: List[str]
+) -> TermSketch:
+    """Count the DF (document frequency) of the terms in the given articles into a term sketch.
+
+    Args:
+        contents (Iterable[str]): Contents of the articles.
+        batch_size (int): Number of articles to be tokenized together.
+        epsilon (float): The error of the DFs relative to the mass of the sketch.
+        delta (float): The probability of a DF exceeding the error.
+        heavy_hitters (List[str]): The terms to be counted exactly.
+
+    Returns:
+        TermSketch:
+    """
+    article_count, term_dfs = count_article_term_dfs(contents, batch_size)
+    term_sketch = TermSketch.create(epsilon, delta, heavy_hitters)
+    term_sketch.add(term_dfs, article_count)
+
+    return term_sketch
+
+
+def merge_term_sketches(*term_sketches: TermSketch) -> TermSketch:
+    """Merge the given term sketches counted in separate partitions."""
+    term_sketch = term_sketches[0]
+    for partition_term_sketch in term_sketches[1:]:
+        term_sketch.merge(partition_term_sketch)
+
+    return term_sketch
+
+
+def rank_article_terms(urls: Iterable[Any], contents: Iterable[str], batch_size: int) -> List[Tuple[str, ArticleTerms]]:
+    """Rank the terms of the given articles by their TF-IDF. The articles without a URL are skipped.
+
+    Args:
+        urls (Iterable[Any]): URLs of the articles.
+        contents (Iterable[str]): Contents of the articles in the same order.
+        batch_size (int): Number of articles to be tokenized together.
+
+    Returns:
+        List[Tuple[str, ArticleTerms]]: The normalized URL and the ranked terms of each article with a URL.
+    """
+    articles = [
+        (normalized_url, content)
+        for url, content in zip(urls, contents)
+        if isinstance(url, str) and (normalized_url := normalize_url(url))
+    ]
+    statistics_calculation = StaticStatisticsCalculation()
+    term_statistics = statistics_calculation.article_repository.get_static_term_statistics()
+
+    article_terms = []
+    for (normalized_url, _), terms in zip(
+        articles, statistics_calculation.tokenize_batch([content for _, content in articles], batch_size)
+    ):
+        term_tfs = Counter(terms)
+        unique_terms = list(term_tfs)
+        tfs = np.fromiter(term_tfs.values(), dtype=np.int64, count=len(term_tfs))
+        tf_idfs = calculate_tf_idfs(
+            tfs, term_statistics.lookup_idfs(unique_terms), StaticStatisticsCalculation.TF_IDF_DECIMAL_PLACE_COUNT
+        )
+
+        ranked_term_ids = select_top_term_ids(tf_idfs)
+        ranked_terms = [unique_terms[i] for i in ranked_term_ids.tolist()]
+        article_terms.append(
+            (normalized_url, ArticleTerms(ranked_terms, tfs[ranked_term_ids], tf_idfs[ranked_term_ids]))
+        )
+
+    return article_terms
+
+
+def vectorize_articles(
+    keys: Iterable[Any], titles: Iterable[Any], urls: Iterable[Any], contents: Iterable[str], batch_size: int
+) -> TfIdfMatrixBlock:
+    """Calculate the L2 normalized TF-IDF vectors of the given articles.
+
+    Args:
+        keys (Iterable[Any]): Keys of the articles.
+        titles (Iterable[Any]): Titles of the articles in the same order.
+        urls (Iterable[Any]): URLs of the articles in the same order.
+        contents (Iterable[str]): Contents of the articles in the same order.
+        batch_size (int): Number of articles to be tokenized together.
+
+    Returns:
+        TfIdfMatrixBlock: The vectors of the articles by a vocabulary of their terms.
+    """
+    statistics_calculation = StaticStatisticsCalculation()
+    contents = list(contents)
+    articles = [
+        {
+            "id": str(key),
+            "title": title if isinstance(title, str) else None,
+            "url": url if isinstance(url, str) else None,
+        }
+        for key, title, url in zip(keys, titles, urls)
+    ]
+
+    term_ids: Dict[str, int] = {}
+    article_term_ids, article_tfs = [], []
+    for terms in statistics_calculation.tokenize_batch(contents, batch_size):
+        term_tfs = Counter(terms)
+        article_term_ids.append(
+            np.fromiter(
+                (term_ids.setdefault(term, len(term_ids)) for term in term_tfs), dtype=np.int32, count=len(term_tfs)
+            )
+        )
+        article_tfs.append(np.fromiter(term_tfs.values(), dtype=np.int64, count=len(term_tfs)))
+
+    # All the terms of the block are looked up at once.
+    idfs = statistics_calculation.article_repository.get_static_term_statistics().lookup_idfs(list(term_ids))
+    row_offsets = np.zeros(len(article_term_ids) + 1, dtype=np.int64)
+    np.cumsum([len(ids) for ids in article_term_ids], out=row_offsets[1:])
+    weights = [calculate_article_vector(tfs, idfs[ids]) for ids, tfs in zip(article_term_ids, article_tfs)]
+
+    return TfIdfMatrixBlock(
+        articles,
+        list(term_ids),
+        row_offsets,
+        np.concatenate(article_term_ids) if article_term_ids else np.zeros(0, dtype=np.int32),
+        np.concatenate(weights).astype(np.float32) if weights else np.zeros(0, dtype=np.float32),
+    )
 
-        # The desired term format is the word lemma in lower case.
-        term = token.lemma_.lower()
 
-        # Clean the term by removing noisy characters (e.g. digits, punctuations, whitespaces).
-        # - and . are only allowed as infix characters.
-        noise_character_pattern = string.digits + string.whitespace + r"""!"#$%&'()*+,/:;<=>?@[\]^_`{|}~"""
-        noise_suffix_prefix_pattern = r"-."
-        term = term.translate(str.maketrans("", "", noise_character_pattern)).strip(noise_suffix_prefix_pattern)
+def calculate_article_vector(tfs: np.ndarray, idfs: np.ndarray) -> np.ndarray:
+    """Calculate the TF-IDFs of the terms of an article, normalized by their L2 norm (to be compared by cosine)."""
+    tf_idfs = tfs * idfs
+    norm = np.linalg.norm(tf_idfs)
 
-        # Terms should have more than one character.
-        return term if len(term) > 1 else None
+    return tf_idfs / norm if norm else tf_idfs
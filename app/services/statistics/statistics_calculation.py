@@ -1,20 +1,33 @@
 from __future__ import annotations
 
+import hashlib
+import os
+import threading
 from abc import ABC, abstractmethod
-from typing import Final, Dict, Any, List
+from typing import Final, Dict, Any, List, Optional, Tuple, Type
 
 import numpy as np
-import pandas as pd
 
+from app.data_storage.term_statistics_store import calculate_idfs
 from app.repositories.article_repository import ArticleRepository
+from app.services.statistics.term_scores import TermScores
+from app.utility.cache import LRUCache
+from app.utility.metrics import measure_stage
 
 
 class StatisticsCalculation(ABC):
     """An abstract base class for providing text related statistics."""
 
+    # The calculation mode by which the stages of the calculation are measured.
+    CALCULATION_MODE: str
+
     TF_IDF_DECIMAL_PLACE_COUNT: Final[int] = 1
     IDF_DECIMAL_PLACE_COUNT: Final[int] = 5
 
+    # The cache of term scores by content, which is shared by all the calculations in the process.
+    _result_cache: Optional[LRUCache] = None
+    _result_cache_lock = threading.Lock()
+
     def __init__(self: StatisticsCalculation) -> None:
         self._article_repository = ArticleRepository()
 
@@ -22,6 +35,25 @@ class StatisticsCalculation(ABC):
     def article_repository(self: StatisticsCalculation) -> ArticleRepository:
         return self._article_repository
 
+    @property
+    @abstractmethod
+    def statistics_version(self: StatisticsCalculation) -> str:
+        """The version of the statistics (and the calculation mode) the TF-IDFs are calculated by."""
+
+    @classmethod
+    def get_result_cache(cls: Type[StatisticsCalculation]) -> LRUCache:
+        """Get the cache of term scores shared by the whole process."""
+        if StatisticsCalculation._result_cache is None:
+            with StatisticsCalculation._result_cache_lock:
+                if StatisticsCalculation._result_cache is None:
+                    result_cache_ttl = os.getenv("RESULT_CACHE_TTL")
+                    StatisticsCalculation._result_cache = LRUCache(
+                        int(os.getenv("RESULT_CACHE_MAX_SIZE", 10000)),
+                        float(result_cache_ttl) if result_cache_ttl else None,
+                    )
+
+        return StatisticsCalculation._result_cache
+
     def get_terms_with_highest_tf_idf(self: StatisticsCalculation, content: str, limit: int) -> List[Dict[str, Any]]:
         """Find terms in the given content with highest TF-IDF.
 
@@ -32,35 +64,122 @@ class StatisticsCalculation(ABC):
         Returns:
             List[Dict[str, Any]]: A collection of terms and their TF-IDFs sorted by descending order of TF-IDFs.
         """
-        term_tf_idfs = self.calculate_term_tf_idfs(content)
+        return self.rank_terms(content, limit)
+
+    def rank_terms(self: StatisticsCalculation, content: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Rank the terms in the given content by their TF-IDF.
+
+        Args:
+            content (str): The content in which terms are to be analyzed.
+            limit (Optional[int]): Maximum number of terms to be returned. All the terms are returned, if not given.
+
+        Returns:
+            List[Dict[str, Any]]: A collection of terms and their TF-IDFs sorted by descending order of TF-IDFs.
+        """
+        return self.rank_terms_batch([content], limit)[0]
+
+    def rank_terms_batch(
+        self: StatisticsCalculation, contents: List[str], limit: Optional[int] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Rank the terms in each of the given contents by their TF-IDF.
+
+        Args:
+            contents (List[str]): A collection of contents in which terms are to be analyzed.
+            limit (Optional[int]): Maximum number of terms to be returned for each content. All the terms are
+                                   returned, if not given.
+
+        Returns:
+            List[List[Dict[str, Any]]]: A collection of terms and their TF-IDFs sorted by descending order of TF-IDFs
+                                        for each content in the same order.
+        """
+        term_scores_batch = self.score_terms_batch(contents)
+        with measure_stage("rank", self.CALCULATION_MODE):
+            return [term_scores.rank(limit) for term_scores in term_scores_batch]
+
+    def score_terms(self: StatisticsCalculation, content: str) -> TermScores:
+        """Score the terms in the given content by their TF-IDF, to be ranked later (e.g., by different limits).
+
+        Args:
+            content (str): The content in which terms are to be analyzed.
+
+        Returns:
+            TermScores: The TF-IDFs of the terms in the content.
+        """
+        return self.score_terms_batch([content])[0]
+
+    def score_terms_batch(self: StatisticsCalculation, contents: List[str]) -> List[TermScores]:
+        """Score the terms in each of the given contents by their TF-IDF.
+
+        The scores are cached by the hash of the content and the statistics version, so an identical content
+        is not analyzed again until the statistics change. The contents missing in the cache are analyzed together.
+
+        Args:
+            contents (List[str]): A collection of contents in which terms are to be analyzed.
+
+        Returns:
+            List[TermScores]: The TF-IDFs of the terms in each content in the same order.
+        """
+        cache_keys, term_scores_by_key = self.get_cached_term_scores(contents)
+        missing_contents = {key: content for key, content in zip(cache_keys, contents) if key not in term_scores_by_key}
+        if missing_contents:
+            missing_term_scores_by_key = dict(
+                zip(missing_contents.keys(), self.calculate_term_tf_idfs_batch(list(missing_contents.values())))
+            )
+            self.get_result_cache().set_many(missing_term_scores_by_key)
+            term_scores_by_key.update(missing_term_scores_by_key)
+
+        return [term_scores_by_key[key] for key in cache_keys]
+
+    def get_cached_term_scores(
+        self: StatisticsCalculation, contents: List[str]
+    ) -> Tuple[List[Tuple[str, str]], Dict[Tuple[str, str], TermScores]]:
+        """Look up the scores of the given contents in the result cache of the process.
 
-        return (
-            term_tf_idfs.sort_values(by="tf-idf", ascending=False)
-            .head(limit)
-            .reset_index()
-            .rename(columns={"index": "term"})
-            .to_dict(orient="records")
-        )
+        Args:
+            contents (List[str]): A collection of contents whose term scores are to be looked up.
+
+        Returns:
+            Tuple[List[Tuple[str, str]], Dict[Tuple[str, str], TermScores]]: The cache key of each content in the same
+                                                                             order, and the cached term scores by
+                                                                             their keys.
+        """
+        statistics_version = self.statistics_version
+        cache_keys = [
+            (hashlib.blake2b(content.encode("utf-8")).hexdigest(), statistics_version) for content in contents
+        ]
+
+        return cache_keys, self.get_result_cache().get_many(cache_keys)
+
+    def calculate_term_tf_idfs_batch(self: StatisticsCalculation, contents: List[str]) -> List[TermScores]:
+        """Calculate TF-IDF measure for each term in each of the given text contents.
+
+        Args:
+            contents (List[str]): A collection of text contents whose terms should be analyzed.
+
+        Returns:
+            List[TermScores]: The TF-IDFs of each content in the same order.
+        """
+        return [self.calculate_term_tf_idfs(content) for content in contents]
 
-    def calculate_term_idfs(self: StatisticsCalculation, article_count: int, term_df: pd.Series) -> pd.Series:
+    def calculate_term_idfs(self: StatisticsCalculation, article_count: int, term_dfs: np.ndarray) -> np.ndarray:
         """Calculate IDF (inverse document frequency) of the given terms.
 
         Args:
             article_count (int): Number of articles (documents) in the dataset, i.e., `n` in IDF formula
-            term_df: a collection of DFs (document frequencies) for the given terms.
+            term_dfs (np.ndarray): A collection of DFs (document frequencies) for the given terms.
 
         Returns:
-            pd.Series: A collection of IDFs for the given terms.
+            np.ndarray: A collection of IDFs for the given terms.
         """
-        return round(np.log((article_count + 1) / (term_df + 1)) + 1, self.IDF_DECIMAL_PLACE_COUNT)
+        return calculate_idfs(article_count, term_dfs, self.IDF_DECIMAL_PLACE_COUNT)
 
     @abstractmethod
-    def calculate_term_tf_idfs(self: StatisticsCalculation, content: str) -> pd.DataFrame:
+    def calculate_term_tf_idfs(self: StatisticsCalculation, content: str) -> TermScores:
         """Calculate TF-IDF measure for each term in the given text content.
 
         Args:
             content (str): The text content whose terms should be analyzed.
 
         Returns:
-            pd.DataFrame:
+            TermScores:
         """
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Type
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class TermScores:
+    """TF-IDF scores of the terms in a content, kept as parallel arrays in which a term id is the term position.
+
+    The terms are in the order of their first occurrence in the content, which breaks the ties in the ranking.
+    """
+
+    terms: np.ndarray
+    tf_idfs: np.ndarray
+
+    @classmethod
+    def create(cls: Type[TermScores], terms: Sequence[str], tf_idfs: np.ndarray) -> TermScores:
+        return cls(np.asarray(terms, dtype=object), np.asarray(tf_idfs, dtype=np.float64))
+
+    def __len__(self: TermScores) -> int:
+        return len(self.terms)
+
+    def rank(self: TermScores, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Rank the terms by their TF-IDF.
+
+        Args:
+            limit (Optional[int]): Maximum number of terms to be returned. All the terms are returned, if not given.
+
+        Returns:
+            List[Dict[str, Any]]: A collection of terms and their TF-IDFs sorted by descending order of TF-IDFs.
+        """
+        term_ids = select_top_term_ids(self.tf_idfs, limit)
+
+        return [
+            {"term": term, "tf-idf": tf_idf}
+            for term, tf_idf in zip(self.terms[term_ids].tolist(), self.tf_idfs[term_ids].tolist())
+        ]
+
+
+def calculate_tf_idfs(tfs: np.ndarray, idfs: np.ndarray, decimal_place_count: int) -> np.ndarray:
+    """Calculate TF-IDF of terms by their TFs (term frequencies) and IDFs (inverse document frequencies).
+
+    Args:
+        tfs (np.ndarray): TF of each term.
+        idfs (np.ndarray): IDF of each term with the same order.
+        decimal_place_count (int): Number of decimal places to round TF-IDFs to.
+
+    Returns:
+        np.ndarray: TF-IDF of each term with the same order.
+    """
+    return np.round(tfs * idfs, decimal_place_count)
+
+
+def select_top_term_ids(scores: np.ndarray, limit: Optional[int] = None) -> np.ndarray:
+    """Select the ids (i.e., positions) of the terms with the highest scores, sorted by descending order of scores.
+
+    Only the top terms are sorted after selecting them by a partition. The ties are ordered by the term ids,
+    including the ties at the limit boundary, so the result is the same as the head of a stable sort.
+
+    Args:
+        scores (np.ndarray): Score of each term.
+        limit (Optional[int]): Maximum number of term ids to be returned. All the term ids are returned, if not given.
+
+    Returns:
+        np.ndarray: The term ids.
+    """
+    term_count = len(scores)
+    if limit is None or limit >= term_count:
+        return np.argsort(-scores, kind="stable")
+    if limit <= 0:
+        return np.zeros(0, dtype=np.int64)
+
+    # The lowest score among the top scores, whose ties are taken by the term id order up to the limit.
+    boundary_score = scores[np.argpartition(-scores, limit - 1)[limit - 1]]
+    higher_term_ids = np.flatnonzero(scores > boundary_score)
+    boundary_term_ids = np.flatnonzero(scores == boundary_score)[: limit - len(higher_term_ids)]
+    top_term_ids = np.sort(np.concatenate([higher_term_ids, boundary_term_ids]))
+
+    return top_term_ids[np.argsort(-scores[top_term_ids], kind="stable")]
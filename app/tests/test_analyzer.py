@@ -0,0 +1,78 @@
+from pathlib import Path
+
+import pytest
+
+from app.services.analysis.analyzer import AnalyzerError, clean_term
+from app.services.analysis.analyzer_registry import AnalyzerRegistry
+from app.services.analysis.rule_based_analyzer import RuleBasedAnalyzer
+
+lemmas = {"Republicans": "republican", "subsidies": "subsidy", "was": "be", "ca": "can", "Times": "times"}
+stopwords = {"the", "a", "and", "in", "of", "be", "do", "n't", "'s", "’s", "they", "might", "was", "their"}
+
+
+def test_clean_term() -> None:
+    assert clean_term("Health-Care.") == "health-care"
+    assert clean_term("U.S.") == "u.s"
+    assert clean_term("COVID-19") == "covid"
+    assert clean_term("2016") is None
+    assert clean_term("a") is None
+
+
+def test_rule_based_analyze() -> None:
+    analyzer = RuleBasedAnalyzer("en_core_web_sm", lemmas, stopwords)
+
+    assert analyzer.analyze("The Republicans' health-care subsidies were cut.") == [
+        "republican",
+        "health-care",
+        "subsidy",
+        "were",
+        "cut",
+    ]
+    # The clitics are split from their words, and then they're filtered as stopwords.
+    assert analyzer.analyze("They don't know O'Brien’s plan, and we can't win.") == [
+        "know",
+        "obrien",
+        "plan",
+        "we",
+        "can",
+        "win",
+    ]
+    assert analyzer.analyze("The U.S. spent $2.5bn in 2016 — New York Times") == [
+        "u.s",
+        "spent",
+        "bn",
+        "new",
+        "york",
+        "times",
+    ]
+    assert analyzer.analyze_batch(["", "Subsidies"], 2) == [[], ["subsidies"]]
+
+
+def test_rule_based_tables(tmp_path: Path) -> None:
+    tables_path = tmp_path / "analysis" / "en_core_web_sm.json"
+    with pytest.raises(AnalyzerError):
+        RuleBasedAnalyzer.load(tables_path)
+
+    RuleBasedAnalyzer("en_core_web_sm", lemmas, stopwords).save(tables_path)
+    analyzer = RuleBasedAnalyzer.load(tables_path)
+
+    assert analyzer.name == "en_core_web_sm"
+    assert analyzer.analyze("Republicans was") == ["republican"]
+
+
+def test_registry_backend(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(AnalyzerRegistry, "_analyzers", {})
+    monkeypatch.setenv("ANALYZER_TABLES_PATH", str(tmp_path))
+    monkeypatch.setenv("ANALYZER_MODELS", "en_core_web_sm")
+    RuleBasedAnalyzer("en_core_web_sm", lemmas, stopwords).save(
+        AnalyzerRegistry.get_rule_based_tables_path("en_core_web_sm")
+    )
+
+    monkeypatch.setenv("ANALYZER_BACKEND", "rule_based")
+    AnalyzerRegistry.warm_up()
+    assert AnalyzerRegistry.is_loaded()
+    assert isinstance(AnalyzerRegistry.get_analyzer(), RuleBasedAnalyzer)
+
+    monkeypatch.setenv("ANALYZER_BACKEND", "unknown")
+    with pytest.raises(AnalyzerError):
+        AnalyzerRegistry.get_analyzer()
@@ -1,14 +1,38 @@
+import asyncio
+import json
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from urllib import parse
+
+import numpy as np
+import pytest
 from fastapi.testclient import TestClient
 
+import app.main as app_main
+from app.data_storage.article_term_index import ArticleTerms
+from app.data_storage.profile_store import ProfileStore
 from app.main import app
-
-client = TestClient(app)
+from app.repositories.article_repository import ArticleRepository
+from app.services.statistics.dynamic_statistics_calculation import DynamicStatisticsCalculation
+from app.services.statistics.static_statistics_calculation import StaticStatisticsCalculation
+from app.services.statistics.statistics_calculation import StatisticsCalculation
+from app.services.statistics.term_scores import TermScores
+from app.utility.cache import LRUCache
+from app.utility.metrics import Metrics
+from app.utility.profiling import RequestProfiler, run_profiled
 
 page_url = "https%3A%2F%2Fen.wikipedia.org%2Fwiki%2FTf-idf"
 limit = 10
 
 
-def test_static_tfidf() -> None:
+@pytest.fixture(scope="module")
+def client() -> Iterator[TestClient]:
+    # The client is entered, so the app is shut down (e.g., the page fetcher closes its sessions) after the tests.
+    with TestClient(app) as client:
+        yield client
+
+
+def test_static_tfidf(client: TestClient) -> None:
     response = client.get(f"/tfidf?url={page_url}&limit={limit}&dynamic=false")
     assert response.status_code == 200
 
@@ -17,7 +41,23 @@ def test_static_tfidf() -> None:
     assert "idf" in map(lambda term_stats: term_stats["term"], result.get("terms"))
 
 
-def test_dynamic_tfidf() -> None:
+def test_corpus_article_tfidf(client: TestClient, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("DATA_LAKE_PATH", str(tmp_path))
+    monkeypatch.setenv("TERM_STATISTICS_REFRESH_INTERVAL", "0")
+    article_repository = ArticleRepository()
+    article_repository.get_static_term_statistics_segments().rebuild(["trump", "money"], [1, 2], 2, ["1", "2"])
+    article_repository.store_article_term_index(
+        [("example.com/corpus", ArticleTerms(["trump", "money"], np.array([2, 1]), np.array([2.0, 1.0])))],
+        "static:outdated",
+    )
+
+    # The corpus article is answered by its indexed TFs (rescored by the current statistics), without being fetched.
+    response = client.get(f"/tfidf?url={parse.quote('https://example.com/corpus/', safe='')}&limit=1&dynamic=false")
+    assert response.status_code == 200
+    assert [ranked_term["term"] for ranked_term in response.json()["terms"]] == ["trump"]
+
+
+def test_dynamic_tfidf(client: TestClient) -> None:
     response = client.get(f"/tfidf?url={page_url}&limit={limit}")
     assert response.status_code == 200
 
@@ -26,7 +66,7 @@ def test_dynamic_tfidf() -> None:
     assert "idf" in map(lambda term_stats: term_stats["term"], result.get("terms"))
 
 
-def test_page_content() -> None:
+def test_page_content(client: TestClient) -> None:
     response = client.get(f"/page_content?url={page_url}")
 
     assert response.status_code == 200
@@ -37,3 +77,128 @@ def test_page_content() -> None:
     response = client.get(f"/page_content?url={invalid_url}")
 
     assert response.status_code == 400
+
+
+class PageFetcherStub:
+    def __init__(self, failing_url: str) -> None:
+        self.failing_url = failing_url
+        self.fetch_count = 0
+        self.max_fetch_count = 0
+
+    async def __call__(self, url: str) -> str:
+        self.fetch_count += 1
+        self.max_fetch_count = max(self.max_fetch_count, self.fetch_count)
+        try:
+            await asyncio.sleep(0.01)
+            if url == self.failing_url:
+                raise ValueError("Page could not be parsed.")
+            return f"content of {url}"
+        finally:
+            self.fetch_count -= 1
+
+
+def rank_terms_batch(
+    calculation: DynamicStatisticsCalculation, contents: List[str], limit: Optional[int] = None
+) -> List[List[Dict[str, Any]]]:
+    return [[{"term": content.split()[-1], "tf_idf": 1.0}] for content in contents]
+
+
+def post_batch(client: TestClient, urls: List[str], texts: List[str]) -> List[Dict[str, Any]]:
+    response = client.post("/tfidf/batch", json={"urls": urls, "texts": texts, "limit": limit, "dynamic": True})
+    assert response.status_code == 200
+
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_tfidf_batch(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("BATCH_MAX_CONCURRENT_FETCH_COUNT", "2")
+    page_fetcher = PageFetcherStub("https://example.com/failing")
+    monkeypatch.setattr(app_main, "fetch_page_content", page_fetcher)
+    monkeypatch.setattr(DynamicStatisticsCalculation, "rank_terms_batch", rank_terms_batch)
+
+    urls = [f"https://example.com/{i}" for i in range(6)] + ["https://example.com/failing", "http:tfidf"]
+    lines = post_batch(client, urls, ["some text"])
+
+    # Every document gets a line, even if its page can't be fetched.
+    assert len(lines) == len(urls) + 1
+    assert {"text_index": 0, "terms": [{"term": "text", "tf_idf": 1.0}]} in lines
+    for url in urls[:6]:
+        assert {"url": url, "terms": [{"term": url, "tf_idf": 1.0}]} in lines
+    assert {"url": "https://example.com/failing", "error": "Page content could not be extracted."} in lines
+    assert {"url": "http:tfidf", "error": "URL is invalid."} in lines
+    assert page_fetcher.max_fetch_count == 2
+
+
+def test_tfidf_batch_when_analysis_fails(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    def fail(calculation: DynamicStatisticsCalculation, contents: List[str], limit: Optional[int] = None) -> None:
+        raise ConnectionError("Elastic is not available.")
+
+    monkeypatch.setattr(DynamicStatisticsCalculation, "rank_terms_batch", fail)
+
+    lines = post_batch(client, [], ["some text", "other text"])
+    assert sorted(lines, key=lambda line: line["text_index"]) == [
+        {"text_index": 0, "error": "Terms could not be analyzed."},
+        {"text_index": 1, "error": "Terms could not be analyzed."},
+    ]
+
+
+def test_tfidf_batch_caches_static_scores(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(StatisticsCalculation, "_result_cache", LRUCache(10))
+    monkeypatch.setattr(StaticStatisticsCalculation, "statistics_version", "static:1:1")
+    submitted_contents = []
+
+    async def run_scoring_job(function: Callable[..., Any], contents: List[str]) -> List[TermScores]:
+        submitted_contents.append(contents)
+        return [TermScores.create(content.split(), np.ones(len(content.split()))) for content in contents]
+
+    monkeypatch.setattr(app_main, "run_scoring_job", run_scoring_job)
+
+    for texts in (["some text"], ["some text", "other text"]):
+        response = client.post("/tfidf/batch", json={"texts": texts, "limit": 1, "dynamic": False})
+        assert response.status_code == 200
+
+    # The scores are cached by the API process, so only the missing contents are submitted to the scoring workers.
+    assert submitted_contents == [["some text"], ["other text"]]
+    assert StatisticsCalculation.get_result_cache().get_statistics()["size"] == 2
+
+
+def test_tfidf_batch_with_too_many_documents(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("BATCH_MAX_DOCUMENT_COUNT", "2")
+
+    response = client.post("/tfidf/batch", json={"urls": ["https://example.com"], "texts": ["a", "b"], "limit": limit})
+    assert response.status_code == 413
+
+
+def test_request_duration_by_route(client: TestClient) -> None:
+    def get_request_count(endpoint: str) -> int:
+        histogram = Metrics.get_histogram("http_request_duration_seconds", endpoint=endpoint)
+        return histogram.count if histogram is not None else 0
+
+    route_count = get_request_count("/profiles/{profile_id}")
+    unmatched_count = get_request_count("unmatched")
+    client.get("/profiles/first")
+    client.get("/profiles/second")
+    client.get("/unknown/path")
+
+    # The requests are labeled by the path template of their route, so each profile ID doesn't get its own metric.
+    assert get_request_count("/profiles/{profile_id}") == route_count + 2
+    assert get_request_count("unmatched") == unmatched_count + 1
+    assert Metrics.get_histogram("http_request_duration_seconds", endpoint="/profiles/first") is None
+
+
+def test_profiles_require_token(client: TestClient, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    profiler = RequestProfiler(ProfileStore(tmp_path, max_count=10), enabled=True, token="secret")
+    monkeypatch.setattr(RequestProfiler, "_instance", profiler)
+    with profiler.profile("/tfidf", "http://testserver/tfidf") as capture:
+        run_profiled(sorted, [2, 1])
+    assert capture is not None
+    profile_id = capture.profile_id
+
+    for headers in ({}, {"X-Profile": "wrong"}):
+        assert client.get("/profiles", headers=headers).status_code == 403
+        assert client.get(f"/profiles/{profile_id}", headers=headers).status_code == 403
+
+    response = client.get("/profiles", headers={"X-Profile": "secret"})
+    assert response.status_code == 200
+    assert [profile["id"] for profile in response.json()["profiles"]] == [profile_id]
+    assert client.get(f"/profiles/{profile_id}", headers={"X-Profile": "secret"}).status_code == 200
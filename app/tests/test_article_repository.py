@@ -0,0 +1,45 @@
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.data_storage.elastic_database import ElasticDatabase
+from app.repositories.article_repository import ArticleRepository
+
+
+def test_select_new_articles_by_keys() -> None:
+    # The integer keys are read as floats since one of them is missing.
+    articles = pd.DataFrame(
+        {
+            "id": [1, np.nan, 3, np.nan, 5],
+            "url": ["https://example.com/1", "https://example.com/2", None, None, None],
+            "content": ["a", "b", "c", "d", "e"],
+        }
+    )
+
+    # An article without a key is keyed by its URL, and an article with neither of them is left out.
+    assert ArticleRepository._get_partition_article_keys(articles, "id").tolist() == [
+        "1",
+        "https://example.com/2",
+        "3",
+        "5",
+    ]
+    new_articles = ArticleRepository._select_new_partition_articles(
+        articles, "id", frozenset({"1", "https://example.com/2", "nan"})
+    )
+    assert new_articles["content"].tolist() == ["c", "e"]
+
+
+def test_count_articles_by_no_terms(monkeypatch: pytest.MonkeyPatch) -> None:
+    search_bodies: List[Dict[str, Any]] = []
+
+    def search(index: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        search_bodies.append(body)
+        return {"hits": {"total": {"value": 3}}}
+
+    monkeypatch.setattr(ElasticDatabase, "search", search)
+
+    # Only the total articles are requested, since Elastic rejects a filters aggregation without filters.
+    assert ArticleRepository().count_articles_by_terms([], "content") == ({}, 3)
+    assert "aggs" not in search_bodies[0]
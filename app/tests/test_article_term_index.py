@@ -0,0 +1,54 @@
+from pathlib import Path
+
+import numpy as np
+
+from app.data_storage.article_term_index import ArticleTermIndex, ArticleTerms
+
+articles = [
+    (
+        "www.theguardian.com/us-news/trump",
+        ArticleTerms(["trump", "café", "money"], np.array([4, 2, 1]), np.array([9.5, 4.25, 1.5])),
+    ),
+    ("www.theguardian.com/empty", ArticleTerms([], np.array([]), np.array([]))),
+    ("www.theguardian.com/money", ArticleTerms(["money", "sudden"], np.array([3, 1]), np.array([4.5, 2.0]))),
+]
+
+
+def test_lookup(tmp_path: Path) -> None:
+    index = ArticleTermIndex.build(tmp_path / "index", articles, "static:1:1")
+
+    assert index.article_count == len(articles)
+    assert index.statistics_version == "static:1:1"
+
+    article_terms = index.lookup("www.theguardian.com/us-news/trump")
+    assert article_terms is not None
+    assert article_terms.terms == ["trump", "café", "money"]
+    assert article_terms.tfs.tolist() == [4, 2, 1]
+    assert article_terms.tf_idfs.tolist() == [9.5, 4.25, 1.5]
+
+    empty_article_terms = index.lookup("www.theguardian.com/empty")
+    assert empty_article_terms is not None and empty_article_terms.terms == []
+    assert index.lookup("www.theguardian.com/missing") is None
+
+
+def test_lookup_limit(tmp_path: Path) -> None:
+    index = ArticleTermIndex.build(tmp_path / "index", articles, "static:1:1")
+
+    article_terms = index.lookup("www.theguardian.com/money", limit=1)
+    assert article_terms is not None
+    assert article_terms.terms == ["money"] and article_terms.tfs.tolist() == [3]
+
+
+def test_duplicate_urls_and_rebuild(tmp_path: Path) -> None:
+    index = ArticleTermIndex.build(
+        tmp_path / "index",
+        articles + [("www.theguardian.com/money", ArticleTerms(["trump"], np.array([1]), np.array([1.0])))],
+        "static:1:1",
+    )
+    assert index.article_count == len(articles)
+    assert index.lookup("www.theguardian.com/money").terms == ["money", "sudden"]
+
+    rebuilt_index = ArticleTermIndex.build(tmp_path / "index", articles[:1], "static:1:2")
+    assert rebuilt_index.version != index.version
+    assert ArticleTermIndex.read_version(tmp_path / "index") == rebuilt_index.version
+    assert ArticleTermIndex.open(tmp_path / "index").lookup("www.theguardian.com/money") is None
@@ -0,0 +1,46 @@
+import time
+
+from app.utility.cache import LRUCache
+
+
+def test_lru_eviction() -> None:
+    cache = LRUCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get_many(["a", "b", "c"]) == {"a": 1, "c": 3}
+    assert len(cache) == 2
+
+
+def test_ttl_expiry() -> None:
+    cache = LRUCache(max_size=10, ttl=0.01)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_hit_miss_counters() -> None:
+    cache = LRUCache(max_size=10)
+    cache.set_many({"a": 1, "b": 2})
+    cache.get_many(["a", "b", "c"])
+
+    statistics = cache.get_statistics()
+    assert (statistics["hits"], statistics["misses"]) == (2, 1)
+    assert statistics["hit_ratio"] == 2 / 3
+
+
+def test_weight_eviction() -> None:
+    evicted_keys = []
+    cache = LRUCache(max_size=10, on_evict=lambda key, value: evicted_keys.append(key), max_weight=5, get_weight=len)
+    cache.set_many({"a": "aa", "b": "bb"})
+    cache.set("a", "a")
+    cache.set("c", "ccc")
+
+    assert evicted_keys == ["b"]
+    assert cache.get_many(["a", "b", "c"]) == {"a": "a", "c": "ccc"}
+    assert cache.weight == 4
@@ -0,0 +1,46 @@
+from pathlib import Path
+
+import pytest
+
+from app.utility.data_extraction import HtmlTextExtractor, extract_content_from_html, normalize_url
+
+# The golden text of each page is the text extracted by the former BeautifulSoup based extraction.
+html_page_paths = sorted((Path(__file__).parent / "fixtures" / "html_pages").glob("*.html"))
+
+
+def read_fixture(path: Path) -> str:
+    with open(path, encoding="utf-8", newline="") as fixture_file:
+        return fixture_file.read()
+
+
+@pytest.mark.parametrize("html_page_path", html_page_paths, ids=[path.stem for path in html_page_paths])
+def test_extract_content_from_html(html_page_path: Path) -> None:
+    assert extract_content_from_html(read_fixture(html_page_path)) == read_fixture(html_page_path.with_suffix(".txt"))
+
+
+def test_extract_content_from_html_in_chunks(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(HtmlTextExtractor, "CHUNK_SIZE", 7)
+    html_page_path = html_page_paths[0]
+
+    assert extract_content_from_html(read_fixture(html_page_path)) == read_fixture(html_page_path.with_suffix(".txt"))
+
+
+def test_extract_content_from_html_with_length_cap() -> None:
+    html = "<p>first paragraph</p><script>hidden</script><p>second paragraph</p><p>third</p>"
+
+    assert extract_content_from_html(html, 1000) == "first paragraph second paragraph third"
+    assert extract_content_from_html(html, 20) == "first paragraph seco"
+    assert extract_content_from_html("", 20) == ""
+
+
+def test_normalize_url() -> None:
+    normalized_url = "www.theguardian.com/us-news/2016/jul/13/story?a=1&b=2"
+
+    assert normalize_url("https://www.theguardian.com/us-news/2016/jul/13/story?a=1&b=2") == normalized_url
+    assert normalize_url("http://WWW.TheGuardian.com:80/us-news/2016/jul/13/story/?b=2&a=1#comments") == normalized_url
+    assert (
+        normalize_url("https%3A%2F%2Fwww.theguardian.com%2Fus-news%2F2016%2Fjul%2F13%2Fstory%3Fa%3D1%26b%3D2")
+        == normalized_url
+    )
+    assert normalize_url("http://127.0.0.1:8000/") == "127.0.0.1:8000"
+    assert normalize_url("") == ""
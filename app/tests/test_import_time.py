@@ -0,0 +1,35 @@
+import json
+import os
+import subprocess
+import sys
+from typing import Any, Dict
+
+# The modules which are only needed by the ETL, or loaded at the API startup, rather than by importing the API.
+DEFERRED_MODULES = ("dask", "sklearn", "spacy", "pandas", "pyarrow", "tqdm", "elasticsearch")
+# Number of seconds importing the API may take in a fresh interpreter.
+IMPORT_TIME_BUDGET = float(os.getenv("IMPORT_TIME_BUDGET", 3.0))
+
+
+def import_in_fresh_interpreter(module: str) -> Dict[str, Any]:
+    """Import the given module in a new interpreter, and get the import duration and all the imported modules."""
+    code = (
+        "import json, sys, time\n"
+        "start_time = time.perf_counter()\n"
+        f"import {module}\n"
+        "print(json.dumps({'duration': time.perf_counter() - start_time, 'modules': sorted(sys.modules)}))\n"
+    )
+    completed_process = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+
+    return json.loads(completed_process.stdout.splitlines()[-1])
+
+
+def test_api_import_defers_heavy_modules() -> None:
+    imported_modules = import_in_fresh_interpreter("app.main")["modules"]
+
+    assert [
+        module for module in imported_modules if module.split(".")[0] in DEFERRED_MODULES
+    ] == [], "Heavy modules should be imported on demand or at the API startup."
+
+
+def test_api_import_time_budget() -> None:
+    assert import_in_fresh_interpreter("app.main")["duration"] < IMPORT_TIME_BUDGET
@@ -0,0 +1,39 @@
+from app.utility.metrics import Histogram, Metrics, format_server_timing, measure_stage, record_request_stages
+
+
+def test_histogram_cumulative_counts() -> None:
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+
+    assert histogram.get_cumulative_counts() == [(0.1, 2), (1.0, 3), (float("inf"), 4)]
+    assert (histogram.count, histogram.sum) == (4, 2.65)
+
+
+def test_render_prometheus_text() -> None:
+    Metrics.reset()
+    Metrics.observe("request_duration_seconds", 0.003, endpoint="/tfidf")
+    Metrics.increment("elastic_calls_total", operation="search")
+    Metrics.increment("elastic_calls_total", operation="search")
+
+    rendered_metrics = Metrics.render().splitlines()
+    assert "# TYPE request_duration_seconds histogram" in rendered_metrics
+    assert 'request_duration_seconds_bucket{endpoint="/tfidf",le="0.0025"} 0' in rendered_metrics
+    assert 'request_duration_seconds_bucket{endpoint="/tfidf",le="0.005"} 1' in rendered_metrics
+    assert 'request_duration_seconds_count{endpoint="/tfidf"} 1' in rendered_metrics
+    assert "# TYPE elastic_calls_total counter" in rendered_metrics
+    assert 'elastic_calls_total{operation="search"} 2' in rendered_metrics
+
+
+def test_request_stage_durations() -> None:
+    Metrics.reset()
+    with record_request_stages() as stage_durations:
+        for _ in range(2):
+            with measure_stage("tokenize", "static"):
+                pass
+    with measure_stage("tokenize", "static"):
+        pass
+
+    assert list(stage_durations) == ["tokenize"]
+    assert Metrics.get_histogram("tfidf_stage_duration_seconds", stage="tokenize", mode="static").count == 3
+    assert format_server_timing({"fetch": 0.0123, "total": 0.05}) == "fetch;dur=12.3, total;dur=50.0"
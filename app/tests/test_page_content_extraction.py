@@ -0,0 +1,109 @@
+import asyncio
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pytest
+
+from app.data_storage.page_content_cache import CachedPageContent, PageContentCache
+from app.services.extraction import page_content_extraction
+from app.services.extraction.page_content_extraction import PageContentExtraction
+from app.utility.page_fetcher import FetchedPage
+
+page_url = "https://example.com/page"
+page_html = "<html><body><p>Page content</p></body></html>"
+
+
+class PageFetcherStub:
+    def __init__(self, pages: List[FetchedPage]) -> None:
+        self.pages = pages
+        self.requested_headers: List[Dict[str, str]] = []
+
+    async def fetch(self, url: str, headers: Optional[Dict[str, str]] = None) -> FetchedPage:
+        self.requested_headers.append(headers or {})
+        return self.pages.pop(0)
+
+
+@pytest.fixture
+def extraction(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> PageContentExtraction:
+    monkeypatch.setattr(PageContentExtraction, "_cache", PageContentCache(tmp_path, 10, 10))
+    monkeypatch.setattr(
+        PageContentExtraction, "_statistics", {"hits": 0, "revalidations": 0, "misses": 0, "bytes_saved": 0}
+    )
+
+    return PageContentExtraction()
+
+
+def extract_contents(extraction: PageContentExtraction, pages: List[FetchedPage], request_count: int) -> List[str]:
+    page_fetcher = PageFetcherStub(pages)
+    extraction._page_fetcher = page_fetcher  # type: ignore[assignment]
+
+    async def extract() -> List[str]:
+        return [await extraction.extract_content(page_url) for _ in range(request_count)]
+
+    contents = asyncio.run(extract())
+    assert page_fetcher.pages == []
+
+    return contents
+
+
+def test_revalidate_expired_content(extraction: PageContentExtraction, monkeypatch: pytest.MonkeyPatch) -> None:
+    extracted_htmls = []
+
+    def extract_content_from_html(html: str) -> str:
+        extracted_htmls.append(html)
+        return "Page content"
+
+    monkeypatch.setattr(page_content_extraction, "extract_content_from_html", extract_content_from_html)
+    headers = {"ETag": '"v1"', "Last-Modified": "Fri, 16 Oct 2026 00:00:00 GMT", "Cache-Control": "max-age=0"}
+    pages = [
+        FetchedPage(page_url, 200, page_html, headers, len(page_html)),
+        FetchedPage(page_url, 304, "", {"Cache-Control": "max-age=60"}),
+    ]
+
+    # The expired content is revalidated once, and it's fresh afterwards by the `max-age` of the revalidation.
+    assert extract_contents(extraction, pages, 3) == ["Page content"] * 3
+    assert extracted_htmls == [page_html]
+    assert PageContentExtraction.get_statistics()["revalidations"] == 1
+    assert PageContentExtraction.get_statistics()["hits"] == 1
+    assert PageContentExtraction.get_statistics()["bytes_saved"] == 2 * len(page_html)
+
+
+def test_never_store_uncacheable_content(extraction: PageContentExtraction) -> None:
+    headers = {"ETag": '"v1"', "Cache-Control": "no-store"}
+    pages = [FetchedPage(page_url, 200, page_html, headers), FetchedPage(page_url, 200, page_html, headers)]
+
+    assert extract_contents(extraction, pages, 2) == ["Page content"] * 2
+    assert PageContentExtraction.get_statistics()["misses"] == 2
+    assert asyncio.run(extraction.cache.get(page_url)) is None
+
+
+def create_page_content(url: str, content: str) -> CachedPageContent:
+    return CachedPageContent(url, content, time.time() + 60, len(content))
+
+
+def test_spill_evict_and_reload(tmp_path: Path) -> None:
+    cache = PageContentCache(tmp_path, memory_max_size=10, disk_max_size=2, memory_max_bytes=10)
+
+    async def run() -> None:
+        # The memory tier is bounded by the size of the contents, so each content spills the previous one.
+        await cache.set(create_page_content("a", "aaaaaa"))
+        await cache.set(create_page_content("b", "bbbbbb"))
+        assert cache.get_statistics() == {"memory_size": 1, "memory_bytes": 6, "disk_size": 1}
+
+        # A spilled content is reloaded from the disk tier.
+        page_content = await cache.get("a")
+        assert page_content is not None and page_content.content == "aaaaaa"
+        assert cache.get_statistics() == {"memory_size": 1, "memory_bytes": 6, "disk_size": 2}
+
+        # The least recently used files are evicted once the disk tier is full.
+        for file_path in tmp_path.glob("*.json"):
+            os.utime(file_path, (0, 0))
+        await cache.set(create_page_content("c", "cccccc"))
+        await cache.set(create_page_content("d", "dddddd"))
+        assert cache.get_statistics()["disk_size"] == 1
+        assert len(list(tmp_path.glob("*.json"))) == 1
+        assert await cache.get("b") is None
+
+    asyncio.run(run())
@@ -0,0 +1,86 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+
+import aiohttp
+import pytest
+
+from app.utility.page_fetcher import PageFetcher, PageFetchError, PageFetchTimeoutError
+
+page_body = "<html><body><p>Café – naïve</p></body></html>".encode("utf-8")
+
+
+class FixtureRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path == "/slow":
+            time.sleep(1)
+
+        body = page_body * 1000 if self.path == "/large" else page_body
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        if self.path != "/large":
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+@pytest.fixture(scope="module")
+def server_url() -> Iterator[str]:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureRequestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+async def fetch(page_fetcher: PageFetcher, url: str) -> str:
+    try:
+        return (await page_fetcher.fetch(url)).text
+    finally:
+        await page_fetcher.close()
+
+
+def test_fetch_page(server_url: str) -> None:
+    assert asyncio.run(fetch(PageFetcher(), f"{server_url}/page")) == page_body.decode("utf-8")
+
+
+def test_fetch_too_large_page(server_url: str) -> None:
+    with pytest.raises(PageFetchError):
+        asyncio.run(fetch(PageFetcher(max_body_size=len(page_body) * 10), f"{server_url}/large"))
+
+
+def test_fetch_slow_page(server_url: str) -> None:
+    with pytest.raises(PageFetchTimeoutError):
+        asyncio.run(fetch(PageFetcher(read_timeout=0.1), f"{server_url}/slow"))
+
+
+def test_close_sessions_of_all_event_loops(server_url: str) -> None:
+    page_fetcher = PageFetcher()
+    other_loop = asyncio.new_event_loop()
+    other_thread = threading.Thread(target=other_loop.run_forever, daemon=True)
+    other_thread.start()
+
+    async def fetch_page() -> aiohttp.ClientSession:
+        await page_fetcher.fetch(f"{server_url}/page")
+        return page_fetcher._get_session()
+
+    async def fetch_page_and_close() -> aiohttp.ClientSession:
+        session = await fetch_page()
+        assert session is not other_session
+        await page_fetcher.close()
+        return session
+
+    try:
+        other_session = asyncio.run_coroutine_threadsafe(fetch_page(), other_loop).result(5)
+        # Each event loop gets its own session, and closing the fetcher closes the sessions of all of them.
+        session = asyncio.run(fetch_page_and_close())
+        assert session.closed and other_session.closed
+        assert page_fetcher._sessions == {}
+    finally:
+        other_loop.call_soon_threadsafe(other_loop.stop)
+        other_thread.join(5)
+        other_loop.close()
@@ -0,0 +1,167 @@
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+import pytest
+
+from app.data_storage.article_term_index import ArticleTerms
+from app.data_storage.elastic_database import ElasticDatabase
+from app.data_storage.page_spool import PageSpool, SpooledPage
+from app.data_storage.term_sketch import TermSketch, TermSketchStore
+from app.repositories.article_repository import ArticleRepository
+from app.services.ingestion.page_ingestion import PageIngestion
+from app.utility.metrics import Metrics
+
+
+class PageWriter:
+    def __init__(self, fail: bool = False) -> None:
+        self.batches: List[List[str]] = []
+        self.fail = fail
+        self.written = threading.Event()
+
+    def __call__(self, pages: List[SpooledPage]) -> None:
+        if self.fail:
+            raise ConnectionError("Database is not available.")
+        self.batches.append([page.url for page in pages])
+        self.written.set()
+
+
+def test_write_deduplicated_pages_in_batches(tmp_path: Path) -> None:
+    writer = PageWriter()
+    page_ingestion = PageIngestion(tmp_path, batch_size=2, flush_interval=0.1, writer=writer)
+    page_ingestion.start()
+
+    assert page_ingestion.submit("https://example.com/a", "content a", ["content", "a"])
+    assert not page_ingestion.submit("http://EXAMPLE.com/a/", "content a")
+    assert page_ingestion.submit("https://example.com/b", "content b")
+    assert page_ingestion.submit("https://example.com/c", "content a")
+    assert page_ingestion.submit("https://example.com/d", "content d")
+    page_ingestion.shutdown(5)
+
+    # The page with the same content as a written page is dropped by the writer thread.
+    assert writer.batches == [["https://example.com/a", "https://example.com/b"], ["https://example.com/d"]]
+    assert page_ingestion.get_statistics()["queue_depth"] == 0
+    assert Metrics.get_histogram("ingestion_flush_size").count >= 2
+    assert not list((tmp_path / "slot-0").glob("*.json"))
+
+
+def test_drop_pages_when_queue_is_full(tmp_path: Path) -> None:
+    writer = PageWriter()
+    page_ingestion = PageIngestion(tmp_path, max_queue_size=2, batch_size=10, flush_interval=10, writer=writer)
+    page_ingestion.start()
+
+    submitted = [page_ingestion.submit(f"https://example.com/{i}", f"content {i}") for i in range(3)]
+    assert submitted == [True, True, False]
+    page_ingestion.shutdown(5)
+    assert writer.batches == [["https://example.com/0", "https://example.com/1"]]
+
+
+def test_recover_spooled_pages_after_failure(tmp_path: Path) -> None:
+    page_ingestion = PageIngestion(tmp_path, batch_size=10, flush_interval=0.05, writer=PageWriter(fail=True))
+    page_ingestion.start()
+    page_ingestion.submit("https://example.com/a", "content a")
+    time.sleep(0.2)
+    page_ingestion.shutdown(5)
+    assert len(list((tmp_path / "slot-0").glob("*.json"))) == 1
+
+    writer = PageWriter()
+    page_ingestion = PageIngestion(tmp_path, batch_size=10, flush_interval=0.05, writer=writer)
+    page_ingestion.start()
+    assert writer.written.wait(5)
+    assert writer.batches == [["https://example.com/a"]]
+    assert not page_ingestion.submit("https://example.com/a", "content a")
+
+    # A running process holds its own slot, so the pages are recovered only from the slots of stopped processes.
+    page_ingestion.submit("https://example.com/b", "content b")
+    other_spool = PageSpool(tmp_path)
+    assert other_spool.open() == []
+    assert other_spool.slot_directory == tmp_path / "slot-1"
+    other_spool.close()
+    page_ingestion.shutdown(5)
+
+
+class ElasticDatabaseStub:
+    def __init__(self) -> None:
+        self.documents: Dict[str, Dict[str, Any]] = {}
+
+    def insert_bulk(
+        self, index: str, actions: Iterable[dict], chunk_size: int = 500, thread_count: int = 4
+    ) -> Iterator[Tuple[bool, Any]]:
+        for action in actions:
+            self.documents[action["_id"]] = action["_source"]
+            yield True, {}
+
+
+@pytest.mark.parametrize("term_statistics_mode", ["exact", "approximate"])
+def test_write_pages(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, term_statistics_mode: str) -> None:
+    monkeypatch.setenv("DATA_LAKE_PATH", str(tmp_path))
+    monkeypatch.setenv("TERM_STATISTICS_MODE", term_statistics_mode)
+    elastic_database = ElasticDatabaseStub()
+    monkeypatch.setattr(ElasticDatabase, "insert_bulk", elastic_database.insert_bulk)
+
+    # The corpus has two articles, one of which is also requested as a page.
+    article_repository = ArticleRepository()
+    if term_statistics_mode == "exact":
+        article_repository.get_static_term_statistics_segments().rebuild(["trump", "money"], [2, 1], 2, ["1", "2"])
+    else:
+        term_sketch = TermSketch.create(0.001, 0.01, ["trump", "money"])
+        term_sketch.add({"trump": 2, "money": 1}, 2)
+        article_repository.store_static_term_sketch(term_sketch, ["1", "2"])
+    article_repository.store_article_term_index(
+        [("example.com/corpus", ArticleTerms(["trump"], np.array([1]), np.array([1.0])))], "static:1:1"
+    )
+
+    pages = [
+        SpooledPage("https://example.com/corpus/", "trump", "", 0, ["trump"]),
+        SpooledPage("https://example.com/a", "money sudden", "", 0, ["money", "sudden"]),
+        SpooledPage("http://EXAMPLE.com/a/", "money sudden", "", 0, ["money", "sudden"]),
+        SpooledPage("https://example.com/b", "sudden", "", 0, ["sudden", "sudden"]),
+    ]
+    PageIngestion.write_pages(pages)
+    # A retried batch (e.g., once the process stopped before removing it from the spool) is not counted again.
+    PageIngestion.write_pages(pages[1:])
+
+    assert sorted(elastic_database.documents) == sorted(
+        article_repository.get_article_id({"id": url_key}) for url_key in ["example.com/a", "example.com/b"]
+    )
+    if term_statistics_mode == "exact":
+        term_statistics: Any = article_repository.get_static_term_statistics_segments().open_snapshot()
+    else:
+        term_statistics = TermSketchStore.open(tmp_path / "stats" / "term_sketch")
+    assert term_statistics.article_count == 4
+    assert term_statistics.lookup(["trump", "money", "sudden"]).tolist() == [2, 2, 2]
+
+
+def test_shutdown_while_writing(tmp_path: Path) -> None:
+    writing = threading.Event()
+    resumed = threading.Event()
+    errors: List[BaseException] = []
+
+    def write(pages: List[SpooledPage]) -> None:
+        writing.set()
+        resumed.wait(5)
+
+    page_ingestion = PageIngestion(tmp_path, batch_size=1, flush_interval=0.05, writer=write)
+    page_ingestion.start()
+    page_ingestion.submit("https://example.com/a", "content a")
+    assert writing.wait(5)
+
+    # The spool stays open until the batch being written is removed from it.
+    previous_excepthook = threading.excepthook
+    threading.excepthook = lambda arguments: errors.append(arguments.exc_value)
+    try:
+        page_ingestion.shutdown(0.05)
+        other_spool = PageSpool(tmp_path)
+        assert other_spool.open() == []
+        other_spool.close()
+        resumed.set()
+        for thread in threading.enumerate():
+            if thread.name == "page-ingestion":
+                thread.join(5)
+    finally:
+        threading.excepthook = previous_excepthook
+
+    assert errors == []
+    assert not list((tmp_path / "slot-0").glob("*.json"))
@@ -0,0 +1,54 @@
+import pstats
+from pathlib import Path
+
+from app.data_storage.profile_store import ProfileStore
+from app.utility.profiling import RequestProfiler, run_profiled
+
+
+def test_profile_capture(tmp_path: Path) -> None:
+    profiler = RequestProfiler(ProfileStore(tmp_path / "profiles", max_count=10), enabled=True)
+    assert profiler.store.list() == []
+    assert not (tmp_path / "profiles").exists()
+
+    with profiler.profile("/tfidf", "http://testserver/tfidf") as capture:
+        assert run_profiled(sorted, [3, 1, 2]) == [1, 2, 3]
+    assert capture is not None and capture.profile_id is not None
+
+    profile_path = profiler.store.get_profile_path(capture.profile_id)
+    assert profile_path is not None
+    assert any(
+        function_name == "<built-in method builtins.sorted>"
+        for _, _, function_name in pstats.Stats(str(profile_path)).stats
+    )
+    assert profiler.store.list()[0]["endpoint"] == "/tfidf"
+
+    # The work out of the profiled request is not profiled.
+    assert run_profiled(sorted, [2, 1]) == [1, 2]
+
+
+def test_profiling_is_gated(tmp_path: Path) -> None:
+    store = ProfileStore(tmp_path, max_count=10)
+
+    assert not RequestProfiler(store).should_profile("1")
+    assert not RequestProfiler(store, enabled=True).should_profile(None)
+    assert not RequestProfiler(store, enabled=True, sample_rate=0.0).should_profile("1")
+    assert not RequestProfiler(store, enabled=True, token="secret").should_profile("1")
+    assert RequestProfiler(store, enabled=True, token="secret").should_profile("secret")
+
+    profiler = RequestProfiler(store, enabled=True, max_concurrency=1)
+    with profiler.profile("/tfidf", "a") as capture, profiler.profile("/tfidf", "b") as concurrent_capture:
+        assert capture is not None and concurrent_capture is None
+
+
+def test_profile_ring_buffer(tmp_path: Path) -> None:
+    store = ProfileStore(tmp_path, max_count=2)
+    profiler = RequestProfiler(store, enabled=True)
+    profile_ids = []
+    for url in ("a", "b", "c"):
+        with profiler.profile("/page_content", url) as capture:
+            run_profiled(len, url)
+        profile_ids.append(capture.profile_id)
+
+    assert [profile["url"] for profile in store.list()] == ["c", "b"]
+    assert store.get_profile_path(profile_ids[0]) is None
+    assert store.get_profile_path("../../etc/passwd") is None
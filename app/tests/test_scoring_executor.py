@@ -0,0 +1,105 @@
+import asyncio
+import os
+import time
+from pathlib import Path
+from typing import Any, Iterator, List
+
+import pytest
+
+from app.utility.metrics import Metrics, measure_stage, record_request_stages
+from app.utility.scoring_executor import ScoringExecutor, ScoringQueueFullError, ScoringTimeoutError
+
+
+def score(content: str) -> int:
+    with measure_stage("score", "test"):
+        return len(content)
+
+
+def sleep(duration: float) -> float:
+    time.sleep(duration)
+    return duration
+
+
+def wait_for_file(file_path: str) -> str:
+    # The workers are separate processes, so a job is held (rather than timed) until the test creates the file.
+    while not os.path.exists(file_path):
+        time.sleep(0.01)
+    return file_path
+
+
+def wait_until_idle(scoring_executor: ScoringExecutor, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while scoring_executor.get_statistics()["busy_workers"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def fail() -> None:
+    raise ValueError("Scoring failed.")
+
+
+@pytest.fixture(scope="module")
+def scoring_executor() -> Iterator[ScoringExecutor]:
+    scoring_executor = ScoringExecutor(worker_count=1, max_queue_size=1, job_timeout=0.5)
+    scoring_executor.start()
+    yield scoring_executor
+    scoring_executor.shutdown()
+
+
+def test_run_job_in_worker(scoring_executor: ScoringExecutor) -> None:
+    async def run() -> int:
+        with record_request_stages() as stage_durations:
+            result = await scoring_executor.run(score, "content")
+        assert "score" in stage_durations
+        return result
+
+    assert asyncio.run(run()) == len("content")
+    assert Metrics.get_histogram("tfidf_stage_duration_seconds", stage="score", mode="test") is not None
+    assert asyncio.run(scoring_executor.run(os.getpid)) != os.getpid()
+
+
+def test_reject_job_when_queue_is_full(tmp_path: Path) -> None:
+    scoring_executor = ScoringExecutor(worker_count=1, max_queue_size=1)
+    scoring_executor.start()
+    release_path = str(tmp_path / "release")
+
+    async def run() -> List[Any]:
+        # One job holds the worker and another one waits for it, so the queue is full until they're released.
+        jobs = [asyncio.create_task(scoring_executor.run(wait_for_file, release_path)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(ScoringQueueFullError) as error:
+            await scoring_executor.run(wait_for_file, release_path)
+        assert error.value.retry_after >= 1
+        assert scoring_executor.get_statistics()["queue_depth"] == 1
+
+        Path(release_path).touch()
+        return await asyncio.gather(*jobs)
+
+    try:
+        assert asyncio.run(run()) == [release_path, release_path]
+        assert scoring_executor.get_statistics()["queue_depth"] == 0
+    finally:
+        scoring_executor.shutdown()
+
+
+def test_time_out_job(scoring_executor: ScoringExecutor, tmp_path: Path) -> None:
+    release_path = str(tmp_path / "release")
+    with pytest.raises(ScoringTimeoutError):
+        asyncio.run(scoring_executor.run(wait_for_file, release_path))
+
+    # The worker is still busy with the timed out job, so the job waiting for it is not done in time either.
+    with pytest.raises(ScoringTimeoutError):
+        asyncio.run(scoring_executor.run(sleep, 0))
+
+    Path(release_path).touch()
+    wait_until_idle(scoring_executor)
+    assert asyncio.run(scoring_executor.run(sleep, 0)) == 0
+    assert scoring_executor.get_statistics()["busy_workers"] == 0
+
+
+def test_raise_job_error(scoring_executor: ScoringExecutor) -> None:
+    with pytest.raises(ValueError):
+        asyncio.run(scoring_executor.run(fail))
+
+
+def test_run_job_in_thread_without_workers() -> None:
+    assert asyncio.run(ScoringExecutor().run(os.getpid)) == os.getpid()
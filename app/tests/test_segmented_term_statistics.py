@@ -0,0 +1,74 @@
+from pathlib import Path
+
+import numpy as np
+
+from app.data_storage.segmented_term_statistics import SegmentedTermStatistics
+from app.data_storage.term_statistics_store import calculate_idfs
+
+base_term_dfs = {"trump": 5, "money": 2, "sudden": 1}
+delta_term_dfs = {"money": 1, "café": 2}
+
+
+def build_statistics(directory: Path) -> SegmentedTermStatistics:
+    statistics = SegmentedTermStatistics(directory)
+    statistics.rebuild(base_term_dfs.keys(), base_term_dfs.values(), 10, [str(key) for key in range(10)])
+    statistics.add_delta(delta_term_dfs.keys(), delta_term_dfs.values(), 3, ["10", "11", "12"])
+
+    return statistics
+
+
+def test_snapshot_includes_deltas(tmp_path: Path) -> None:
+    statistics = build_statistics(tmp_path / "statistics")
+    snapshot = statistics.open_snapshot()
+
+    assert snapshot.version == 2
+    assert snapshot.delta_count == 1
+    assert snapshot.article_count == 13
+    assert snapshot.lookup(["money", "café", "trump", "missing"]).tolist() == [3, 2, 5, 0]
+    assert snapshot.lookup_idfs(["money", "missing"]).tolist() == calculate_idfs(13, np.array([3, 0]), 5).tolist()
+    assert statistics.get_article_keys() == {str(key) for key in range(13)}
+
+
+def test_snapshot_is_consistent_after_change(tmp_path: Path) -> None:
+    statistics = build_statistics(tmp_path / "statistics")
+    snapshot = statistics.open_snapshot()
+    statistics.add_delta(["money"], [4], 4, ["13", "14", "15", "16"])
+    statistics.compact()
+
+    assert snapshot.lookup(["money"]).tolist() == [3]
+    assert statistics.open_snapshot().lookup(["money"]).tolist() == [7]
+
+
+def test_compact(tmp_path: Path) -> None:
+    statistics = build_statistics(tmp_path / "statistics")
+    snapshot = statistics.open_snapshot()
+    statistics.compact()
+    compacted_snapshot = statistics.open_snapshot()
+
+    terms = ["trump", "money", "sudden", "café", "missing"]
+    assert compacted_snapshot.version == 3
+    assert compacted_snapshot.delta_count == 0
+    assert compacted_snapshot.base_version != snapshot.base_version
+    assert compacted_snapshot.lookup(terms).tolist() == snapshot.lookup(terms).tolist()
+    assert compacted_snapshot.lookup_idfs(terms).tolist() == snapshot.lookup_idfs(terms).tolist()
+    assert statistics.get_article_keys() == {str(key) for key in range(13)}
+    assert len([path for path in statistics.directory.iterdir() if path.is_dir()]) == 1
+
+
+def test_add_new_articles(tmp_path: Path) -> None:
+    statistics = build_statistics(tmp_path / "statistics")
+
+    assert statistics.add_new_articles({"12": ["money"], "13": ["money", "café"], "14": ["trump", "trump"]}) == [
+        "13",
+        "14",
+    ]
+    assert statistics.add_new_articles({"13": ["money"], "0": ["trump"]}) == []
+
+    snapshot = statistics.open_snapshot()
+    assert (snapshot.version, snapshot.article_count) == (3, 15)
+    assert snapshot.lookup(["money", "café", "trump"]).tolist() == [4, 3, 6]
+
+    # The article keys read by this process are checked again once the segments are compacted.
+    statistics.compact()
+    assert statistics.add_new_articles({"14": ["trump"], "15": ["trump"]}) == ["15"]
+    assert statistics.open_snapshot().article_count == 16
@@ -0,0 +1,65 @@
+import asyncio
+from typing import List
+
+import pytest
+
+from app.utility.metrics import Metrics
+from app.utility.single_flight import SingleFlight
+
+
+def test_coalesce_concurrent_calls() -> None:
+    single_flight = SingleFlight("test_coalesce")
+    calls: List[str] = []
+
+    async def calculate(key: str) -> str:
+        calls.append(key)
+        await asyncio.sleep(0.05)
+        return key.upper()
+
+    async def run() -> List[str]:
+        return await asyncio.gather(
+            *(single_flight.run(key, lambda key=key: calculate(key)) for key in ("a", "a", "b", "a"))
+        )
+
+    assert asyncio.run(run()) == ["A", "A", "B", "A"]
+    assert calls == ["a", "b"]
+    assert Metrics.get_counter("coalesced_requests_total", operation="test_coalesce") == 2
+    assert len(single_flight) == 0
+
+    # The calls made after the call in flight is done are not coalesced.
+    assert asyncio.run(single_flight.run("a", lambda: calculate("a"))) == "A"
+    assert calls == ["a", "b", "a"]
+
+
+def test_share_error_of_coalesced_calls() -> None:
+    single_flight = SingleFlight("test_error")
+
+    async def fail() -> None:
+        await asyncio.sleep(0.05)
+        raise ValueError("Calculation failed.")
+
+    async def run() -> List[BaseException]:
+        return await asyncio.gather(*(single_flight.run("a", fail) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(error, ValueError) for error in asyncio.run(run()))
+
+
+def test_keep_call_of_cancelled_caller() -> None:
+    single_flight = SingleFlight("test_cancel")
+
+    async def calculate() -> str:
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def run() -> str:
+        first_call = asyncio.create_task(single_flight.run("a", calculate))
+        await asyncio.sleep(0)
+        second_call = asyncio.create_task(single_flight.run("a", calculate))
+        await asyncio.sleep(0)
+        first_call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first_call
+
+        return await second_call
+
+    assert asyncio.run(run()) == "result"
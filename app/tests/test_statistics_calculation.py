@@ -0,0 +1,59 @@
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pytest
+
+from app.repositories.article_repository import ArticleRepository
+from app.services.statistics.static_statistics_calculation import StaticStatisticsCalculation
+from app.services.statistics.statistics_calculation import StatisticsCalculation
+from app.services.statistics.term_scores import TermScores
+from app.utility.cache import LRUCache
+
+
+class CountingStatisticsCalculation(StatisticsCalculation):
+    CALCULATION_MODE = "counting"
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.version = "1"
+        self.calculated_contents: List[str] = []
+
+    @property
+    def statistics_version(self) -> str:
+        return self.version
+
+    def calculate_term_tf_idfs(self, content: str) -> TermScores:
+        self.calculated_contents.append(content)
+        terms = content.split()
+        return TermScores.create(terms, np.arange(len(terms), 0, -1, dtype=np.float64))
+
+
+def test_result_cache(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(StatisticsCalculation, "_result_cache", LRUCache(10))
+    calculation = CountingStatisticsCalculation()
+
+    assert calculation.rank_terms("trump money", 1) == [{"term": "trump", "tf-idf": 2.0}]
+    # The cached scores of a content are ranked by any limit, and only the missing contents are calculated.
+    assert calculation.rank_terms_batch(["trump money", "sudden"]) == [
+        [{"term": "trump", "tf-idf": 2.0}, {"term": "money", "tf-idf": 1.0}],
+        [{"term": "sudden", "tf-idf": 1.0}],
+    ]
+    assert calculation.calculated_contents == ["trump money", "sudden"]
+
+    # The cached scores are not used once the statistics change.
+    calculation.version = "2"
+    calculation.rank_terms("trump money")
+    assert calculation.calculated_contents == ["trump money", "sudden", "trump money"]
+
+
+def test_static_statistics_version_changes_with_articles(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("DATA_LAKE_PATH", str(tmp_path))
+    monkeypatch.setenv("TERM_STATISTICS_REFRESH_INTERVAL", "0")
+    article_repository = ArticleRepository()
+    article_repository.get_static_term_statistics_segments().rebuild(["trump", "money"], [2, 1], 2, ["1", "2"])
+
+    calculation = StaticStatisticsCalculation()
+    statistics_version = calculation.statistics_version
+    article_repository.add_static_articles({"3": ["money"]})
+    assert calculation.statistics_version != statistics_version
@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+from app.services.statistics.term_scores import TermScores, calculate_tf_idfs, select_top_term_ids
+
+
+@pytest.mark.parametrize("limit", [None, 0, 1, 5, 37, 200])
+def test_select_top_term_ids_is_head_of_stable_sort(limit: int) -> None:
+    # Many ties to check they are ordered by the term ids, also at the limit boundary.
+    scores = np.random.default_rng(7).integers(0, 10, 100) / 10
+    expected_term_ids = np.argsort(-scores, kind="stable")[:limit]
+
+    assert select_top_term_ids(scores, limit).tolist() == expected_term_ids.tolist()
+
+
+def test_rank() -> None:
+    tf_idfs = calculate_tf_idfs(np.array([1, 3, 2, 1]), np.array([2.54321, 1.2, 1.80001, 3.6]), 1)
+    term_scores = TermScores.create(["money", "trump", "sudden", "café"], tf_idfs)
+
+    assert term_scores.rank(3) == [
+        {"term": "trump", "tf-idf": 3.6},
+        {"term": "sudden", "tf-idf": 3.6},
+        {"term": "café", "tf-idf": 3.6},
+    ]
+    assert [ranked_term["term"] for ranked_term in term_scores.rank()] == ["trump", "sudden", "café", "money"]
+    assert TermScores.create([], np.zeros(0)).rank(10) == []
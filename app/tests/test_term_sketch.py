@@ -0,0 +1,119 @@
+import random
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import List, Set
+
+import numpy as np
+import pytest
+
+from app.data_storage.term_sketch import TermSketch, TermSketchStore
+from app.repositories.article_repository import ArticleRepository
+
+heavy_hitters = ["trump", "money"]
+
+
+def create_articles(article_count: int, seed: int = 0) -> List[Set[str]]:
+    # The terms follow a Zipf-like distribution, as in natural language.
+    generator = random.Random(seed)
+    vocabulary = ["trump", "money"] + [f"term{i}" for i in range(5000)]
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    return [set(generator.choices(vocabulary, weights, k=50)) for _ in range(article_count)]
+
+
+def count_term_dfs(articles: List[Set[str]]) -> Counter:
+    term_dfs: Counter = Counter()
+    for article_terms in articles:
+        term_dfs.update(article_terms)
+
+    return term_dfs
+
+
+def test_estimate_within_error_bound() -> None:
+    articles = create_articles(1000)
+    term_dfs = count_term_dfs(articles)
+    term_sketch = TermSketch.create(0.005, 0.01, heavy_hitters)
+    for article_terms in articles:
+        term_sketch.add(Counter(article_terms), 1)
+
+    terms = [term for term in term_dfs if term not in heavy_hitters]
+    errors = term_sketch.estimate(terms) - np.array([term_dfs[term] for term in terms])
+    assert term_sketch.article_count == len(articles)
+    assert term_sketch.mass == sum(term_dfs[term] for term in terms)
+    # The DFs are never underestimated, and exceed the error bound with a probability of at most delta.
+    assert errors.min() >= 0
+    assert np.mean(errors > term_sketch.error_bound) <= term_sketch.delta
+    assert term_sketch.heavy_hitter_dfs == {term: term_dfs[term] for term in heavy_hitters}
+
+
+def test_merge_partition_sketches() -> None:
+    articles = create_articles(1000)
+    term_dfs = count_term_dfs(articles)
+    term_sketch = TermSketch.create(0.005, 0.01, heavy_hitters)
+    for partition_start in range(0, len(articles), 250):
+        partition_term_sketch = TermSketch.create(0.005, 0.01, heavy_hitters)
+        partition_end = partition_start + 250
+        partition_articles = articles[partition_start:partition_end]
+        partition_term_sketch.add(count_term_dfs(partition_articles), len(partition_articles))
+        term_sketch.merge(partition_term_sketch)
+
+    terms = [term for term in term_dfs if term not in heavy_hitters]
+    errors = term_sketch.estimate(terms) - np.array([term_dfs[term] for term in terms])
+    assert term_sketch.article_count == len(articles)
+    assert errors.min() >= 0
+    assert np.mean(errors > term_sketch.error_bound) <= term_sketch.delta
+
+    with pytest.raises(ValueError):
+        term_sketch.merge(TermSketch.create(0.01, 0.01, heavy_hitters))
+
+
+def test_lookup_stored_sketch(tmp_path: Path) -> None:
+    articles = create_articles(200)
+    term_dfs = count_term_dfs(articles)
+    term_sketch = TermSketch.create(0.001, 0.01, heavy_hitters)
+    term_sketch.add(term_dfs, len(articles))
+
+    store = TermSketchStore.build(tmp_path / "sketch", term_sketch, ["1", "2"])
+    assert isinstance(TermSketchStore.open(tmp_path / "sketch")._counters, np.memmap)
+    assert store.article_count == len(articles)
+    assert store.get_article_keys() == ["1", "2"]
+
+    dfs = store.lookup(["trump", "missing", "term10", "money"])
+    assert dfs[[0, 3]].tolist() == [term_dfs["trump"], term_dfs["money"]]
+    assert term_dfs["term10"] <= dfs[2] <= term_dfs["term10"] + store.error_bound
+    assert 0 <= dfs[1] <= store.error_bound
+
+    expected_idfs = np.round(np.log((len(articles) + 1) / (dfs + 1)) + 1, 5)
+    assert store.lookup_idfs(["trump", "missing", "term10", "money"]).tolist() == expected_idfs.tolist()
+
+    loaded_term_sketch = store.load_sketch()
+    assert loaded_term_sketch.mass == term_sketch.mass
+    assert np.array_equal(loaded_term_sketch.counters, term_sketch.counters)
+
+    rebuilt_store = TermSketchStore.build(tmp_path / "sketch", loaded_term_sketch.merge(term_sketch))
+    assert rebuilt_store.version != store.version
+    assert rebuilt_store.article_count == 2 * len(articles)
+    assert rebuilt_store.lookup(["trump"]).tolist() == [2 * term_dfs["trump"]]
+
+
+def test_merge_stored_sketch_concurrently(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("DATA_LAKE_PATH", str(tmp_path))
+    article_repository = ArticleRepository()
+    article_repository.store_static_term_sketch(TermSketch.create(0.001, 0.01, heavy_hitters), [])
+
+    def merge(article_key: str) -> None:
+        term_sketch = article_repository.get_static_term_sketch().create_sketch()
+        term_sketch.add({"trump": 1, "sudden": 1}, 1)
+        article_repository.merge_static_term_sketch(term_sketch, [article_key])
+
+    threads = [threading.Thread(target=merge, args=(str(i),)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # No merge is lost, even though each of them replaces the whole sketch.
+    store = TermSketchStore.open(tmp_path / "stats" / "term_sketch")
+    assert store.article_count == 8
+    assert store.lookup(["trump"]).tolist() == [8]
+    assert sorted(store.get_article_keys()) == [str(i) for i in range(8)]
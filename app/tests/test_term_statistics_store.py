@@ -0,0 +1,33 @@
+from pathlib import Path
+
+import numpy as np
+
+from app.data_storage.term_statistics_store import TermStatisticsStore
+
+term_dfs = {"trump": 5, "money": 2, "sudden": 1, "café": 3}
+article_count = 10
+
+
+def test_lookup(tmp_path: Path) -> None:
+    store = TermStatisticsStore.build(tmp_path / "store", term_dfs.keys(), term_dfs.values(), article_count)
+
+    assert store.term_count == len(term_dfs)
+    assert store.article_count == article_count
+    assert store.lookup(["money", "missing", "café", "trump"]).tolist() == [2, 0, 3, 5]
+    assert store.lookup([]).tolist() == []
+
+
+def test_lookup_idfs(tmp_path: Path) -> None:
+    store = TermStatisticsStore.build(tmp_path / "store", term_dfs.keys(), term_dfs.values(), article_count)
+
+    expected_idfs = np.round(np.log((article_count + 1) / (np.array([5, 0]) + 1)) + 1, 5)
+    assert store.lookup_idfs(["trump", "missing"]).tolist() == expected_idfs.tolist()
+    assert store.missing_term_idf == expected_idfs[1]
+
+
+def test_rebuild_changes_version(tmp_path: Path) -> None:
+    store = TermStatisticsStore.build(tmp_path / "store", term_dfs.keys(), term_dfs.values(), article_count)
+    rebuilt_store = TermStatisticsStore.build(tmp_path / "store", ["money"], [7], article_count + 1)
+
+    assert rebuilt_store.version != store.version
+    assert TermStatisticsStore(tmp_path / "store").lookup(["money", "trump"]).tolist() == [7, 0]
@@ -0,0 +1,119 @@
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pytest
+
+from app.data_storage.segmented_term_statistics import SegmentedTermStatistics
+from app.data_storage.tf_idf_matrix import TfIdfMatrix, TfIdfMatrixBlock, concatenate_ranges
+from app.repositories.article_repository import ArticleRepository
+from app.services.statistics.static_statistics_calculation import StaticStatisticsCalculation
+
+
+def create_block(article_term_weights: List[Dict[str, float]], first_article_id: int) -> TfIdfMatrixBlock:
+    terms = list(dict.fromkeys(term for term_weights in article_term_weights for term in term_weights))
+    return TfIdfMatrixBlock(
+        [{"id": str(first_article_id + i), "title": None, "url": None} for i in range(len(article_term_weights))],
+        terms,
+        np.cumsum([0] + [len(term_weights) for term_weights in article_term_weights]),
+        np.array([terms.index(term) for term_weights in article_term_weights for term in term_weights]),
+        np.array([weight for term_weights in article_term_weights for weight in term_weights.values()]),
+    )
+
+
+article_term_weights = [
+    {"trump": 0.8, "money": 0.6},
+    {"money": 1.0},
+    {},
+    {"café": 0.6, "trump": 0.8},
+    {"sudden": 0.6, "money": 0.8},
+]
+
+
+def build_matrix(directory: Path) -> TfIdfMatrix:
+    return TfIdfMatrix.build(
+        directory, [create_block(article_term_weights[:3], 0), create_block(article_term_weights[3:], 3)], "static:1:1"
+    )
+
+
+def test_build(tmp_path: Path) -> None:
+    matrix = build_matrix(tmp_path / "matrix")
+
+    assert (matrix.article_count, matrix.term_count, matrix.nonzero_count) == (5, 4, 7)
+    assert matrix.statistics_version == "static:1:1"
+    assert matrix.get_article(3) == {"id": "3", "title": None, "url": None}
+
+    column_ids, weights = matrix.get_row(3)
+    trump_column_id, cafe_column_id = matrix.lookup_column_ids(["trump", "café"]).tolist()
+    assert column_ids.tolist() == [cafe_column_id, trump_column_id]
+    assert weights.tolist() == pytest.approx([0.6, 0.8])
+    assert matrix.get_row(2)[0].tolist() == []
+    assert matrix.lookup_column_ids(["missing", "money"])[0] == -1
+
+
+@pytest.mark.parametrize("transpose_chunk_size", [1, 3, 1 << 22])
+def test_calculate_similarities(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, transpose_chunk_size: int) -> None:
+    monkeypatch.setattr(TfIdfMatrix, "TRANSPOSE_CHUNK_SIZE", transpose_chunk_size)
+    matrix = build_matrix(tmp_path / "matrix")
+
+    query_term_weights = {"money": 0.6, "trump": 0.8, "missing": 0.0}
+    column_ids = matrix.lookup_column_ids(list(query_term_weights))
+    in_vocabulary = column_ids >= 0
+    similarities = matrix.calculate_similarities(
+        column_ids[in_vocabulary], np.array(list(query_term_weights.values()))[in_vocabulary]
+    )
+
+    # The similarities are the dot products of the query vector and the article vectors.
+    expected_similarities = [
+        sum(weight * term_weights.get(term, 0) for term, weight in query_term_weights.items())
+        for term_weights in article_term_weights
+    ]
+    assert similarities.tolist() == pytest.approx(expected_similarities)
+    assert matrix.calculate_similarities(np.zeros(0, dtype=np.int64), np.zeros(0)).tolist() == [0] * 5
+
+
+def test_empty_matrix(tmp_path: Path) -> None:
+    matrix = TfIdfMatrix.build(tmp_path / "matrix", [], "static:1:1")
+
+    assert (matrix.article_count, matrix.term_count) == (0, 0)
+    assert matrix.lookup_column_ids(["trump"]).tolist() == [-1]
+
+
+def test_rebuild(tmp_path: Path) -> None:
+    matrix = build_matrix(tmp_path / "matrix")
+    rebuilt_matrix = TfIdfMatrix.build(tmp_path / "matrix", [create_block(article_term_weights[:1], 0)], "static:2:1")
+
+    # The matrix opened before the rebuild keeps reading its own version.
+    assert matrix.article_count == 5 and matrix.get_article(4)["id"] == "4"
+    assert TfIdfMatrix.read_version(tmp_path / "matrix") == rebuilt_matrix.version != matrix.version
+    assert TfIdfMatrix.open(tmp_path / "matrix").article_count == 1
+
+
+def test_find_related_articles(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("DATA_LAKE_PATH", str(tmp_path))
+    statistics = SegmentedTermStatistics(tmp_path / "term_statistics")
+    statistics.rebuild(["trump", "money", "café", "sudden"], [2, 3, 1, 1], 5)
+    snapshot = statistics.open_snapshot()
+    monkeypatch.setattr(ArticleRepository, "get_static_term_statistics", lambda self: snapshot)
+    monkeypatch.setattr(StaticStatisticsCalculation, "tokenize", lambda self, text: text.split())
+
+    block = create_block(article_term_weights, 0)
+    articles = [{**article, "url": f"https://example.com/{article['id']}"} for article in block.articles]
+    ArticleRepository().store_tf_idf_matrix(
+        [TfIdfMatrixBlock(articles, block.terms, block.row_offsets, block.term_ids, block.weights)], "static:1:1"
+    )
+
+    statistics_calculation = StaticStatisticsCalculation()
+    related_articles = statistics_calculation.find_related_articles("trump money money", 10, "http://example.com/0/")
+    similarities = [article["similarity"] for article in related_articles]
+
+    # The page's own article and the articles without any common terms are excluded.
+    assert sorted(article["id"] for article in related_articles) == ["1", "3", "4"]
+    assert similarities == sorted(similarities, reverse=True) and all(similarities)
+    assert len(statistics_calculation.find_related_articles("trump money money", 1)) == 1
+    assert statistics_calculation.find_related_articles("missing", 10) == []
+
+
+def test_concatenate_ranges() -> None:
+    assert concatenate_ranges(np.array([5, 0, 2]), np.array([7, 0, 3])).tolist() == [5, 6, 2]
+    assert concatenate_ranges(np.zeros(0), np.zeros(0)).tolist() == []
@@ -0,0 +1,75 @@
+import threading
+from pathlib import Path
+
+import pytest
+
+from app.data_storage.versioned_directory import SharedVersion, VersionedDirectory
+
+
+def publish(versioned_directory: VersionedDirectory, content: str) -> str:
+    with versioned_directory.publish() as (version, version_directory):
+        (version_directory / "content.txt").write_text(content)
+
+    return version
+
+
+def read_content(version_directory: Path) -> str:
+    return (version_directory / "content.txt").read_text()
+
+
+def test_publish(tmp_path: Path) -> None:
+    versioned_directory = VersionedDirectory(tmp_path / "artifact")
+    assert versioned_directory.read_version() is None
+    with pytest.raises(FileNotFoundError):
+        versioned_directory.open(read_content)
+
+    publish(versioned_directory, "first")
+    version = publish(versioned_directory, "second")
+    assert versioned_directory.open(read_content) == (version, "second")
+
+    # A failed version is discarded, and only the current version is kept.
+    with pytest.raises(ValueError):
+        with versioned_directory.publish():
+            raise ValueError("Building failed.")
+    assert versioned_directory.read_version() == version
+    assert [path.name for path in (tmp_path / "artifact").iterdir() if path.is_dir()] == [f"version-{version}"]
+
+
+def test_open_while_publishing(tmp_path: Path) -> None:
+    versioned_directory = VersionedDirectory(tmp_path / "artifact")
+    publish(versioned_directory, "0")
+    errors = []
+    stopped = threading.Event()
+
+    def read() -> None:
+        while not stopped.is_set():
+            try:
+                versioned_directory.open(read_content)
+            except Exception as e:
+                errors.append(e)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    for i in range(1, 100):
+        publish(versioned_directory, str(i))
+    stopped.set()
+    reader.join()
+
+    assert errors == []
+    assert versioned_directory.open(read_content)[1] == "99"
+
+
+def test_shared_version(tmp_path: Path) -> None:
+    shared_version: SharedVersion[str] = SharedVersion(read_content)
+    assert shared_version.get(tmp_path / "artifact", 60) is None
+
+    versioned_directory = VersionedDirectory(tmp_path / "artifact")
+    publish(versioned_directory, "first")
+    assert shared_version.get(tmp_path / "artifact", 60) is None
+    shared_version.invalidate()
+    assert shared_version.get(tmp_path / "artifact", 60) == "first"
+
+    # A newer version is opened once it's checked after the refresh interval.
+    publish(versioned_directory, "second")
+    assert shared_version.get(tmp_path / "artifact", 60) == "first"
+    assert shared_version.get(tmp_path / "artifact", 0) == "second"
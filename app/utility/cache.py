@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Mapping, Optional, Tuple
+
+
+class LRUCache:
+    """A thread-safe cache bounded by the number of entries, which evicts the least recently used entries first.
+
+    The cache can also be bounded by the total weight of its entries (e.g., their sizes in bytes). Entries can also
+    expire after a TTL (time to live). Hits and misses are counted for monitoring.
+    """
+
+    def __init__(
+        self: LRUCache,
+        max_size: int,
+        ttl: Optional[float] = None,
+        on_evict: Optional[Callable[[Hashable, Any], None]] = None,
+        max_weight: Optional[int] = None,
+        get_weight: Optional[Callable[[Any], int]] = None,
+    ) -> None:
+        """
+        Args:
+            max_size (int): Maximum number of entries in the cache.
+            ttl (Optional[float]): Number of seconds after which an entry expires. Entries never expire, if not given.
+            on_evict (Optional[Callable[[Hashable, Any], None]]): A function to be called by the key and the value of
+                                                                  each entry evicted due to the size limit.
+            max_weight (Optional[int]): Maximum total weight of the entries. Only the number of entries is bounded,
+                                        if not given.
+            get_weight (Optional[Callable[[Any], int]]): A function weighing a value. Each value weighs 1, if not
+                                                         given.
+        """
+        self._max_size = max_size
+        self._ttl = ttl
+        self._on_evict = on_evict
+        self._max_weight = max_weight
+        self._get_weight = get_weight
+        self._weight = 0
+        self._entries: OrderedDict[Hashable, Tuple[Any, float, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def hits(self: LRUCache) -> int:
+        return self._hits
+
+    @property
+    def misses(self: LRUCache) -> int:
+        return self._misses
+
+    @property
+    def weight(self: LRUCache) -> int:
+        return self._weight
+
+    def __len__(self: LRUCache) -> int:
+        return len(self._entries)
+
+    def get(self: LRUCache, key: Hashable, default: Any = None) -> Any:
+        """Get the value of the given key, or the default value if the key is missing or expired."""
+        with self._lock:
+            return self._get(key, default)
+
+    def get_many(self: LRUCache, keys: Iterable[Hashable]) -> Dict[Any, Any]:
+        """Get the values of the given keys which are available in the cache.
+
+        Returns:
+            Dict[Any, Any]: A collection of the found keys and their values.
+        """
+        missing = object()
+        with self._lock:
+            values = {key: self._get(key, missing) for key in keys}
+
+        return {key: value for key, value in values.items() if value is not missing}
+
+    def set(self: LRUCache, key: Hashable, value: Any) -> None:
+        self.set_many({key: value})
+
+    def set_many(self: LRUCache, values: Mapping[Any, Any]) -> None:
+        with self._lock:
+            evicted_entries = [
+                evicted_entry for key, value in values.items() for evicted_entry in self._set(key, value)
+            ]
+
+        # The evicted entries are handled out of the lock, since handling them may be slow (e.g., writing to disk).
+        if self._on_evict:
+            for key, value in evicted_entries:
+                self._on_evict(key, value)
+
+    def clear(self: LRUCache) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._weight = 0
+
+    def get_statistics(self: LRUCache) -> Dict[str, Any]:
+        """Get the size and the hit/miss counters of the cache."""
+        lookup_count = self._hits + self._misses
+        return {
+            "size": len(self._entries),
+            "max_size": self._max_size,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_ratio": self._hits / lookup_count if lookup_count else 0.0,
+        }
+
+    def _get(self: LRUCache, key: Hashable, default: Any) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None and self._ttl is not None and entry[1] < time.monotonic():
+            del self._entries[key]
+            self._weight -= entry[2]
+            entry = None
+
+        if entry is None:
+            self._misses += 1
+            return default
+
+        self._entries.move_to_end(key)
+        self._hits += 1
+
+        return entry[0]
+
+    def _set(self: LRUCache, key: Hashable, value: Any) -> List[Tuple[Hashable, Any]]:
+        expires_at = time.monotonic() + self._ttl if self._ttl is not None else 0.0
+        weight = self._get_weight(value) if self._get_weight else 1
+        previous_entry = self._entries.get(key)
+        if previous_entry is not None:
+            self._weight -= previous_entry[2]
+        self._entries[key] = (value, expires_at, weight)
+        self._entries.move_to_end(key)
+        self._weight += weight
+
+        evicted_entries = []
+        while len(self._entries) > self._max_size or (
+            self._max_weight is not None and self._weight > self._max_weight and self._entries
+        ):
+            evicted_key, (evicted_value, _, evicted_weight) = self._entries.popitem(last=False)
+            self._weight -= evicted_weight
+            evicted_entries.append((evicted_key, evicted_value))
+
+        return evicted_entries
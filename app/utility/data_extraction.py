@@ -1,8 +1,14 @@
-import requests
+from __future__ import annotations
+
+import asyncio
+import os
+from typing import Dict, Final, FrozenSet, List, Optional
 from urllib import parse
 
-from bs4 import BeautifulSoup
 import validators
+from lxml import etree
+
+from app.utility.page_fetcher import PageFetcher
 
 
 def validate_url(url: str) -> bool:
@@ -17,7 +23,36 @@ def validate_url(url: str) -> bool:
     return validators.url(parse.unquote(url))
 
 
-def scrape_page(page_url: str) -> str:
+def normalize_url(url: str) -> str:
+    """Normalize the given page URL, so different forms of the same page URL are the same.
+
+    The scheme, the fragment and the default port are dropped, the host is lower cased, the trailing slash of the path
+    is removed, and the query parameters are sorted.
+
+    Args:
+        url (str):
+
+    Returns:
+        str: The normalized URL, or an empty string if the URL has no host.
+    """
+    split_url = parse.urlsplit(parse.unquote(url.strip()))
+    host = (split_url.hostname or "").rstrip(".")
+    if not host:
+        return ""
+
+    try:
+        port = split_url.port
+    except ValueError:
+        port = None
+    if port is not None and port not in (80, 443):
+        host = f"{host}:{port}"
+
+    query = parse.urlencode(sorted(parse.parse_qsl(split_url.query, keep_blank_values=True)))
+
+    return f"{host}{split_url.path.rstrip('/')}" + (f"?{query}" if query else "")
+
+
+async def scrape_page(page_url: str) -> str:
     """Get the HTML text content of a page by its URL.
 
     Args:
@@ -26,28 +61,112 @@ def scrape_page(page_url: str) -> str:
     Returns:
         str: The HTML text content
     """
-    response = requests.get(parse.unquote(page_url))
+    page = await PageFetcher.get_instance().fetch(page_url)
 
-    return response.text
+    return page.text
 
 
-def extract_content_from_page(page_url: str) -> str:
+async def extract_content_from_page(page_url: str) -> str:
     """Get the text content of an HTML page (inside the body tag).
 
+    The page is fetched asynchronously, and its content is extracted in a worker thread to not block the event loop.
+
     Args:
         page_url (str): The page URL.
 
     Returns:
         str:
     """
-    soup = BeautifulSoup(scrape_page(page_url), "html.parser")
+    return await asyncio.to_thread(extract_content_from_html, await scrape_page(page_url))
 
-    # Remove tags whose content is not important for us.
-    for tag in soup(["style", "script", "math"]):
-        tag.decompose()
 
-    # Strip extra whitespaces from the text.
-    return " ".join(soup.stripped_strings)
+def extract_content_from_html(html: str, max_text_length: Optional[int] = None) -> str:
+    """Get the text content of an HTML document (inside the body tag).
+
+    The document is parsed in chunks by a streaming parser, which stops once the text content reaches the length cap.
+
+    Args:
+        html (str): The HTML text content.
+        max_text_length (Optional[int]): Maximum length of the text content. Defaults to `EXTRACTION_MAX_TEXT_LENGTH`
+                                         variable.
+
+    Returns:
+        str:
+    """
+    extractor = HtmlTextExtractor(max_text_length or int(os.getenv("EXTRACTION_MAX_TEXT_LENGTH", 1000000)))
+    parser = etree.HTMLParser(target=extractor)
+
+    for chunk_start in range(0, len(html), HtmlTextExtractor.CHUNK_SIZE):
+        chunk_end = chunk_start + HtmlTextExtractor.CHUNK_SIZE
+        parser.feed(html[chunk_start:chunk_end])
+        if extractor.is_complete:
+            break
+
+    # The parser target returns the text content on closing.
+    return parser.close() if html else ""
+
+
+class HtmlTextExtractor:
+    """A target of the streaming lxml HTML parser, which collects the text content of an HTML document on the fly.
+
+    The text of the ignored tags (e.g., scripts) is dropped as soon as it's parsed, without building a tree. Each text
+    node is stripped of extra whitespaces, and the non-empty texts are joined by a single space.
+    """
+
+    CHUNK_SIZE: Final[int] = 64 * 1024
+    IGNORED_TAGS: Final[FrozenSet[str]] = frozenset({"style", "script", "math", "template"})
+
+    def __init__(self: HtmlTextExtractor, max_text_length: Optional[int] = None) -> None:
+        """
+        Args:
+            max_text_length (Optional[int]): Maximum length of the text content. The text is not capped, if not given.
+        """
+        self._max_text_length = max_text_length
+        self._texts: List[str] = []
+        self._text_length = 0
+        self._pending_data: List[str] = []
+        self._ignored_depth = 0
+
+    @property
+    def is_complete(self: HtmlTextExtractor) -> bool:
+        """Whether the text content has reached the length cap, so the rest of the document can be skipped."""
+        return self._max_text_length is not None and self._text_length >= self._max_text_length
+
+    def start(self: HtmlTextExtractor, tag: str, attributes: Dict[str, str]) -> None:
+        self._flush_data()
+        if self._ignored_depth or tag in self.IGNORED_TAGS:
+            self._ignored_depth += 1
+
+    def end(self: HtmlTextExtractor, tag: str) -> None:
+        self._flush_data()
+        if self._ignored_depth:
+            self._ignored_depth -= 1
+
+    def data(self: HtmlTextExtractor, data: str) -> None:
+        if not self._ignored_depth and not self.is_complete:
+            self._pending_data.append(data)
+
+    def comment(self: HtmlTextExtractor, text: str) -> None:
+        # A comment separates the texts around it.
+        self._flush_data()
+
+    def close(self: HtmlTextExtractor) -> str:
+        self._flush_data()
+        text_content = " ".join(self._texts)
+        max_text_length = self._max_text_length
+
+        return text_content[:max_text_length] if self.is_complete else text_content
+
+    def _flush_data(self: HtmlTextExtractor) -> None:
+        """Add the data parsed since the last tag as a text node."""
+        if not self._pending_data:
+            return
+
+        text = "".join(self._pending_data).strip()
+        self._pending_data = []
+        if text:
+            self._texts.append(text)
+            self._text_length += len(text) + (1 if len(self._texts) > 1 else 0)
 
 
 # def download_dataset(dataset_id: str, destination_path: Path) -> None:
@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Final, Iterable, Iterator, List, Optional, Tuple, Type
+
+# The labels of a metric, kept as sorted (name, value) pairs.
+Labels = Tuple[Tuple[str, str], ...]
+# A collector returns the current values of metrics kept elsewhere (e.g., cache sizes and hit counters) by their names
+# and labels when scraped. The collected metrics whose names end with `_total` are counters, and the rest are gauges.
+Collector = Callable[[], Iterable[Tuple[str, Dict[str, str], float]]]
+
+# The duration of each stage in the current request, for the `Server-Timing` header.
+_request_stage_durations: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_stage_durations", default=None)
+# The stages measured in the current context (e.g., a job of a worker process) as (stage, mode, duration) measurements,
+# to be recorded again in another process.
+_stage_measurements: ContextVar[Optional[List[Tuple[str, str, float]]]] = ContextVar("stage_measurements", default=None)
+
+
+class Histogram:
+    """A thread-safe histogram of observed values in cumulative buckets, along with their sum and count."""
+
+    def __init__(self: Histogram, bucket_bounds: Tuple[float, ...]) -> None:
+        """
+        Args:
+            bucket_bounds (Tuple[float, ...]): The sorted upper bounds of the buckets (excluding the infinite one).
+        """
+        self._bucket_bounds = bucket_bounds
+        self._bucket_counts = [0] * (len(bucket_bounds) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def count(self: Histogram) -> int:
+        return sum(self._bucket_counts)
+
+    @property
+    def sum(self: Histogram) -> float:
+        return self._sum
+
+    def observe(self: Histogram, value: float) -> None:
+        bucket_index = bisect.bisect_left(self._bucket_bounds, value)
+        with self._lock:
+            self._bucket_counts[bucket_index] += 1
+            self._sum += value
+
+    def get_cumulative_counts(self: Histogram) -> List[Tuple[float, int]]:
+        """Get the count of values less than or equal to each bucket bound, including the infinite bound."""
+        with self._lock:
+            bucket_counts = list(self._bucket_counts)
+
+        cumulative_counts = []
+        cumulative_count = 0
+        for bucket_bound, bucket_count in zip(self._bucket_bounds + (float("inf"),), bucket_counts):
+            cumulative_count += bucket_count
+            cumulative_counts.append((bucket_bound, cumulative_count))
+
+        return cumulative_counts
+
+
+class Metrics:
+    """A process-wide registry of the metrics (i.e., histograms, counters and collected metrics) of the API.
+
+    Recording a metric only costs a lock and a few additions, and the metrics are formatted only when they're scraped
+    (i.e., by `render` in Prometheus text format).
+    """
+
+    DURATION_BUCKET_BOUNDS: Final[Tuple[float, ...]] = (
+        0.001,
+        0.0025,
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.1,
+        0.25,
+        0.5,
+        1.0,
+        2.5,
+        5.0,
+        10.0,
+    )
+    SIZE_BUCKET_BOUNDS: Final[Tuple[float, ...]] = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+    _histograms: Dict[Tuple[str, Labels], Histogram] = {}
+    _counters: Dict[Tuple[str, Labels], float] = {}
+    _collectors: List[Collector] = []
+    _lock = threading.Lock()
+
+    @classmethod
+    def observe(
+        cls: Type[Metrics], name: str, value: float, bucket_bounds: Optional[Tuple[float, ...]] = None, **labels: str
+    ) -> None:
+        """Observe a value (e.g., a duration in seconds) in the histogram of the given name and labels.
+
+        The buckets of a histogram are given when it's first observed, and they're the duration buckets by default.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        histogram = cls._histograms.get(key)
+        if histogram is None:
+            with cls._lock:
+                histogram = cls._histograms.setdefault(key, Histogram(bucket_bounds or cls.DURATION_BUCKET_BOUNDS))
+
+        histogram.observe(value)
+
+    @classmethod
+    def increment(cls: Type[Metrics], name: str, amount: float = 1, **labels: str) -> None:
+        """Increment the counter of the given name and labels."""
+        key = (name, tuple(sorted(labels.items())))
+        with cls._lock:
+            cls._counters[key] = cls._counters.get(key, 0) + amount
+
+    @classmethod
+    def register_collector(cls: Type[Metrics], collector: Collector) -> None:
+        with cls._lock:
+            cls._collectors.append(collector)
+
+    @classmethod
+    def get_histogram(cls: Type[Metrics], name: str, **labels: str) -> Optional[Histogram]:
+        return cls._histograms.get((name, tuple(sorted(labels.items()))))
+
+    @classmethod
+    def get_counter(cls: Type[Metrics], name: str, **labels: str) -> float:
+        return cls._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    @classmethod
+    def render(cls: Type[Metrics]) -> str:
+        """Format all the metrics in Prometheus text format."""
+        with cls._lock:
+            histograms = sorted(cls._histograms.items())
+            counters = sorted(cls._counters.items())
+            collectors = list(cls._collectors)
+
+        lines: List[str] = []
+        typed_names = set()
+
+        def add_type(name: str, metric_type: str) -> None:
+            if name not in typed_names:
+                typed_names.add(name)
+                lines.append(f"# TYPE {name} {metric_type}")
+
+        for (name, labels), histogram in histograms:
+            add_type(name, "histogram")
+            for bucket_bound, cumulative_count in histogram.get_cumulative_counts():
+                bucket_labels = labels + (("le", "+Inf" if bucket_bound == float("inf") else repr(bucket_bound)),)
+                lines.append(f"{name}_bucket{format_labels(bucket_labels)} {cumulative_count}")
+            lines.append(f"{name}_sum{format_labels(labels)} {histogram.sum}")
+            lines.append(f"{name}_count{format_labels(labels)} {histogram.count}")
+
+        for (name, labels), value in counters:
+            add_type(name, "counter")
+            lines.append(f"{name}{format_labels(labels)} {value}")
+
+        collected_metrics = sorted(
+            (name, tuple(sorted(labels.items())), value)
+            for collector in collectors
+            for name, labels, value in collector()
+        )
+        for name, labels, value in collected_metrics:
+            add_type(name, "counter" if name.endswith("_total") else "gauge")
+            lines.append(f"{name}{format_labels(labels)} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    @classmethod
+    def reset(cls: Type[Metrics]) -> None:
+        """Remove all the recorded metrics, but keep the collectors."""
+        with cls._lock:
+            cls._histograms.clear()
+            cls._counters.clear()
+
+
+def format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+
+    escaped_labels = (
+        (name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped_labels) + "}"
+
+
+@contextmanager
+def measure_stage(stage: str, mode: str) -> Iterator[None]:
+    """Measure the duration of a stage of analyzing a page (e.g., fetch, tokenize) in the given calculation mode.
+
+    The duration is observed in the `tfidf_stage_duration_seconds` histogram, and added to the stage durations of
+    the current request (if they're being recorded).
+
+    Args:
+        stage (str): Name of the stage.
+        mode (str): The calculation mode (e.g., static or dynamic), or `any` for the stages independent of the mode.
+    """
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, mode, time.perf_counter() - start_time)
+
+
+def record_stage(stage: str, mode: str, duration: float) -> None:
+    """Record the duration of a stage measured in the given calculation mode (e.g., by a worker process).
+
+    Args:
+        stage (str): Name of the stage.
+        mode (str): The calculation mode (e.g., static or dynamic), or `any` for the stages independent of the mode.
+        duration (float): The duration of the stage in seconds.
+    """
+    Metrics.observe("tfidf_stage_duration_seconds", duration, stage=stage, mode=mode)
+
+    stage_durations = _request_stage_durations.get()
+    if stage_durations is not None:
+        stage_durations[stage] = stage_durations.get(stage, 0.0) + duration
+
+    stage_measurements = _stage_measurements.get()
+    if stage_measurements is not None:
+        stage_measurements.append((stage, mode, duration))
+
+
+@contextmanager
+def record_request_stages() -> Iterator[Dict[str, float]]:
+    """Record the durations of the stages measured in the current request (including its worker threads).
+
+    Yields:
+        Dict[str, float]: The total duration (in seconds) of each measured stage, filled as the stages are measured.
+    """
+    stage_durations: Dict[str, float] = {}
+    token = _request_stage_durations.set(stage_durations)
+    try:
+        yield stage_durations
+    finally:
+        _request_stage_durations.reset(token)
+
+
+@contextmanager
+def record_stage_measurements() -> Iterator[List[Tuple[str, str, float]]]:
+    """Record the stages measured in the current context, so they can be recorded again by `record_stage` elsewhere.
+
+    Yields:
+        List[Tuple[str, str, float]]: The (stage, mode, duration) of each measured stage, filled as they're measured.
+    """
+    stage_measurements: List[Tuple[str, str, float]] = []
+    token = _stage_measurements.set(stage_measurements)
+    try:
+        yield stage_measurements
+    finally:
+        _stage_measurements.reset(token)
+
+
+def format_server_timing(stage_durations: Dict[str, float]) -> str:
+    """Format the given stage durations as the value of a `Server-Timing` header (with durations in milliseconds)."""
+    return ", ".join(f"{stage};dur={duration * 1000:.1f}" for stage, duration in stage_durations.items())
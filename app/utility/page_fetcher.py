@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import asyncio
+import codecs
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Mapping, Optional, Type
+from urllib import parse
+
+import aiohttp
+from multidict import CIMultiDict
+
+
+@dataclass(frozen=True)
+class FetchedPage:
+    """A page fetched by its URL."""
+
+    url: str
+    status: int
+    text: str
+    headers: Mapping[str, str] = field(default_factory=CIMultiDict)
+    size: int = 0
+
+
+class PageFetcher:
+    """An asynchronous page fetcher sharing a pool of connections among all the requests of the process.
+
+    The number of connections is limited in total and per host, and a fetch fails if the page can't be connected to
+    or read in time, or if its body exceeds the maximum size. The page body is decoded while it's being streamed.
+    """
+
+    _instance: Optional[PageFetcher] = None
+    _instance_lock = threading.Lock()
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(
+        self: PageFetcher,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 10.0,
+        total_timeout: float = 30.0,
+        max_body_size: int = 10 * 1024 * 1024,
+        max_connections: int = 100,
+        max_connections_per_host: int = 10,
+    ) -> None:
+        """
+        Args:
+            connect_timeout (float): Number of seconds to wait for connecting to the page host.
+            read_timeout (float): Number of seconds to wait for reading each chunk of the page.
+            total_timeout (float): Number of seconds to wait for the whole page.
+            max_body_size (int): Maximum size of the page body in bytes.
+            max_connections (int): Maximum number of concurrent connections.
+            max_connections_per_host (int): Maximum number of concurrent connections to the same host.
+        """
+        self._timeout = aiohttp.ClientTimeout(total=total_timeout, sock_connect=connect_timeout, sock_read=read_timeout)
+        self._max_body_size = max_body_size
+        self._max_connections = max_connections
+        self._max_connections_per_host = max_connections_per_host
+        # A session is bound to the event loop it's created in, so each event loop (e.g., of a test client) gets its own.
+        self._sessions: Dict[asyncio.AbstractEventLoop, aiohttp.ClientSession] = {}
+        self._sessions_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls: Type[PageFetcher]) -> PageFetcher:
+        """Get the page fetcher shared by the whole process."""
+        if not cls._instance:
+            with cls._instance_lock:
+                if not cls._instance:
+                    cls._instance = cls(
+                        connect_timeout=float(os.getenv("FETCH_CONNECT_TIMEOUT", 5)),
+                        read_timeout=float(os.getenv("FETCH_READ_TIMEOUT", 10)),
+                        total_timeout=float(os.getenv("FETCH_TOTAL_TIMEOUT", 30)),
+                        max_body_size=int(os.getenv("FETCH_MAX_BODY_SIZE", 10 * 1024 * 1024)),
+                        max_connections=int(os.getenv("FETCH_MAX_CONNECTIONS", 100)),
+                        max_connections_per_host=int(os.getenv("FETCH_MAX_CONNECTIONS_PER_HOST", 10)),
+                    )
+
+        return cls._instance
+
+    @property
+    def max_body_size(self: PageFetcher) -> int:
+        return self._max_body_size
+
+    async def fetch(self: PageFetcher, page_url: str, headers: Optional[Dict[str, str]] = None) -> FetchedPage:
+        """Fetch a page by its URL.
+
+        Args:
+            page_url (str): The page URL.
+            headers (Optional[Dict[str, str]]): Additional request headers.
+
+        Returns:
+            FetchedPage: The page including its decoded text.
+
+        Raises:
+            PageFetchTimeoutError: If the page can't be connected to or read in time.
+            PageFetchError: If the page can't be fetched or it's too large.
+        """
+        url = parse.unquote(page_url)
+        try:
+            async with self._get_session().get(url, headers=headers) as response:
+                if (response.content_length or 0) > self.max_body_size:
+                    raise PageFetchError(f"Page is larger than {self.max_body_size} bytes.")
+
+                decoder = codecs.getincrementaldecoder(self._get_encoding(response))(errors="replace")
+                text_chunks = []
+                size = 0
+                async for chunk in response.content.iter_chunked(self.CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > self.max_body_size:
+                        raise PageFetchError(f"Page is larger than {self.max_body_size} bytes.")
+                    text_chunks.append(decoder.decode(chunk))
+                text_chunks.append(decoder.decode(b"", final=True))
+
+                return FetchedPage(url, response.status, "".join(text_chunks), CIMultiDict(response.headers), size)
+        except asyncio.TimeoutError:
+            raise PageFetchTimeoutError("Page could not be fetched in time.")
+        except aiohttp.ClientError as error:
+            raise PageFetchError(f"Page could not be fetched: {error}")
+
+    async def close(self: PageFetcher) -> None:
+        """Close all the pooled connections, including those of the sessions of the other running event loops."""
+        running_loop = asyncio.get_running_loop()
+        with self._sessions_lock:
+            sessions, self._sessions = self._sessions, {}
+
+        for loop, session in sessions.items():
+            if loop is running_loop:
+                await session.close()
+            elif loop.is_running():
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(session.close(), loop))
+
+    def _get_session(self: PageFetcher) -> aiohttp.ClientSession:
+        running_loop = asyncio.get_running_loop()
+        session = self._sessions.get(running_loop)
+        if session is not None and not session.closed:
+            return session
+
+        with self._sessions_lock:
+            # The sessions of the closed event loops can't be used (nor closed) anymore, so they're only released.
+            self._sessions = {loop: session for loop, session in self._sessions.items() if not loop.is_closed()}
+            session = self._sessions.get(running_loop)
+            if session is None or session.closed:
+                session = aiohttp.ClientSession(
+                    connector=aiohttp.TCPConnector(
+                        limit=self._max_connections, limit_per_host=self._max_connections_per_host, ttl_dns_cache=300
+                    ),
+                    timeout=self._timeout,
+                )
+                self._sessions[running_loop] = session
+
+        return session
+
+    @staticmethod
+    def _get_encoding(response: aiohttp.ClientResponse) -> str:
+        try:
+            return codecs.lookup(response.charset or "utf-8").name
+        except LookupError:
+            return "utf-8"
+
+
+class PageFetchError(Exception):
+    """Raise when a page can not be fetched."""
+
+    def __init__(self: PageFetchError, error_message: str) -> None:
+        super(PageFetchError, self).__init__(error_message)
+
+
+class PageFetchTimeoutError(PageFetchError):
+    """Raise when a page can not be fetched in time."""
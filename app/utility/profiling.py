@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import cProfile
+import hmac
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional, Type, TypeVar
+
+from app.data_storage.profile_store import ProfileStore
+
+T = TypeVar("T")
+
+# The profile of the current request, if it's being profiled.
+_active_profile: ContextVar[Optional[cProfile.Profile]] = ContextVar("active_profile", default=None)
+
+
+@dataclass
+class ProfileCapture:
+    """A profile being captured, whose ID is set once it's saved."""
+
+    profile: cProfile.Profile
+    profile_id: Optional[str] = None
+
+
+class RequestProfiler:
+    """An opt-in profiler of single requests by a deterministic profiler (i.e., cProfile).
+
+    A request is profiled only if profiling is enabled, the request has the profile header (whose value should match
+    the profiling token, if one is configured), and it's sampled by the sample rate. At most a limited number of
+    requests are profiled concurrently, and the rest are served without profiling.
+    Only the CPU-bound work of the request, which is run by `run_profiled` (e.g., in worker threads), is profiled,
+    so the other requests served by the event loop in the meantime are not included in the profile.
+    """
+
+    PROFILE_HEADER = "X-Profile"
+
+    _instance: Optional[RequestProfiler] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(
+        self: RequestProfiler,
+        store: ProfileStore,
+        enabled: bool = False,
+        sample_rate: float = 1.0,
+        max_concurrency: int = 1,
+        token: Optional[str] = None,
+    ) -> None:
+        """
+        Args:
+            store (ProfileStore): The store in which the captured profiles are saved.
+            enabled (bool): Whether profiling is enabled.
+            sample_rate (float): The fraction of the requests with the profile header to be profiled.
+            max_concurrency (int): Maximum number of requests profiled at the same time.
+            token (Optional[str]): The value the profile header should have. Any value is accepted, if not given.
+        """
+        self._store = store
+        self._enabled = enabled
+        self._sample_rate = sample_rate
+        self._token = token
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+
+    @classmethod
+    def get_instance(cls: Type[RequestProfiler]) -> RequestProfiler:
+        """Get the profiler shared by the whole process."""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls(
+                        ProfileStore(
+                            Path(os.getenv("PROFILING_PATH", "data_lake/profiles")),
+                            int(os.getenv("PROFILING_MAX_COUNT", 20)),
+                        ),
+                        enabled=os.getenv("PROFILING_ENABLED", "false").lower() == "true",
+                        sample_rate=float(os.getenv("PROFILING_SAMPLE_RATE", 1.0)),
+                        max_concurrency=int(os.getenv("PROFILING_MAX_CONCURRENCY", 1)),
+                        token=os.getenv("PROFILING_TOKEN") or None,
+                    )
+
+        return cls._instance
+
+    @property
+    def enabled(self: RequestProfiler) -> bool:
+        return self._enabled
+
+    @property
+    def store(self: RequestProfiler) -> ProfileStore:
+        return self._store
+
+    def should_profile(self: RequestProfiler, profile_header: Optional[str]) -> bool:
+        """Check whether a request with the given value of the profile header should be profiled."""
+        if not self._enabled or not profile_header or not self.is_authorized(profile_header):
+            return False
+
+        return random.random() < self._sample_rate
+
+    def is_authorized(self: RequestProfiler, profile_header: Optional[str]) -> bool:
+        """Check whether the given value of the profile header matches the profiling token, if one is configured."""
+        if self._token is None:
+            return True
+
+        return profile_header is not None and hmac.compare_digest(profile_header.encode(), self._token.encode())
+
+    @contextmanager
+    def profile(self: RequestProfiler, endpoint: str, url: str) -> Iterator[Optional[ProfileCapture]]:
+        """Profile the work run by `run_profiled` in this context, and save the profile in the store.
+
+        Args:
+            endpoint (str): The path of the profiled endpoint.
+            url (str): The URL of the profiled request.
+
+        Yields:
+            Optional[ProfileCapture]: The captured profile, or None if too many requests are being profiled.
+        """
+        if not self._semaphore.acquire(blocking=False):
+            yield None
+            return
+
+        capture = ProfileCapture(cProfile.Profile())
+        token = _active_profile.set(capture.profile)
+        start_time = time.perf_counter()
+        try:
+            yield capture
+        finally:
+            duration = time.perf_counter() - start_time
+            _active_profile.reset(token)
+            try:
+                capture.profile_id = self._store.save(
+                    capture.profile, {"endpoint": endpoint, "url": url, "duration": duration}
+                )
+            finally:
+                self._semaphore.release()
+
+
+def is_profiled() -> bool:
+    """Check whether the current request is being profiled."""
+    return _active_profile.get() is not None
+
+
+def run_profiled(function: Callable[..., T], *args: Any) -> T:
+    """Call the given function by the given arguments, under the profile of the current request if it's profiled."""
+    profile = _active_profile.get()
+    if profile is None:
+        return function(*args)
+
+    return profile.runcall(function, *args)
@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type, TypeVar
+
+from app.utility.metrics import Metrics, record_stage, record_stage_measurements
+from app.utility.profiling import is_profiled, run_profiled
+
+T = TypeVar("T")
+
+
+class ScoringExecutor:
+    """An executor of CPU-bound scoring jobs (e.g., tokenizing and scoring a page) by a pool of worker processes.
+
+    The jobs run in separate processes, so they're not serialized by the GIL of the API process, and each worker
+    is initialized (e.g., loads the analyzers and the term statistics) once before it takes any jobs.
+    At most a limited number of jobs are queued for the busy workers, and further jobs are rejected at once rather
+    than waiting in an unbounded queue. A caller stops waiting for its job after the job timeout. The job is cancelled
+    if it hasn't started yet, but a running job can't be interrupted, so its worker (and its place in the queue) is
+    only released once it's done.
+    The stages measured by a job in its worker are recorded again in the API process, so they're still reported by
+    the metrics and the `Server-Timing` header of the request.
+    If there're no workers, the jobs run in worker threads of the API process as they're submitted.
+    """
+
+    _instance: Optional[ScoringExecutor] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(
+        self: ScoringExecutor,
+        worker_count: int = 0,
+        max_queue_size: int = 0,
+        job_timeout: Optional[float] = None,
+        initializer: Optional[Callable[[], Any]] = None,
+    ) -> None:
+        """
+        Args:
+            worker_count (int): Number of worker processes. The jobs run in worker threads, if it's zero.
+            max_queue_size (int): Maximum number of jobs waiting for a worker, after which the jobs are rejected.
+            job_timeout (Optional[float]): Number of seconds to wait for a job, including its time in the queue.
+            initializer (Optional[Callable[[], Any]]): A picklable function called once by each worker process to
+                                                        load what the jobs need.
+        """
+        self._worker_count = worker_count
+        self._max_queue_size = max_queue_size
+        self._job_timeout = job_timeout
+        self._initializer = initializer
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending_job_count = 0
+        self._completed_job_count = 0
+        self._busy_duration = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls: Type[ScoringExecutor]) -> ScoringExecutor:
+        """Get the scoring executor shared by the whole process, whose workers load the static calculation."""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    from app.services.statistics.static_statistics_calculation import StaticStatisticsCalculation
+
+                    job_timeout = os.getenv("SCORING_JOB_TIMEOUT")
+                    cls._instance = cls(
+                        worker_count=int(os.getenv("SCORING_WORKER_COUNT") or 0),
+                        max_queue_size=int(os.getenv("SCORING_MAX_QUEUE_SIZE", 32)),
+                        job_timeout=float(job_timeout) if job_timeout else None,
+                        initializer=StaticStatisticsCalculation.warm_up,
+                    )
+
+        return cls._instance
+
+    @property
+    def worker_count(self: ScoringExecutor) -> int:
+        return self._worker_count
+
+    def start(self: ScoringExecutor) -> None:
+        """Start all the worker processes, and wait until they're initialized (e.g., at the API startup)."""
+        if not self._worker_count:
+            return
+
+        # The workers are only started when there's no idle worker for a submitted job, so all of them are started
+        # by as many jobs submitted at once. Each worker is initialized before it takes its first job.
+        wait([self._get_pool().submit(os.getpid) for _ in range(self._worker_count)])
+
+    def shutdown(self: ScoringExecutor) -> None:
+        """Stop the worker processes, and cancel the jobs which haven't started yet."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self: ScoringExecutor, function: Callable[..., T], *args: Any) -> T:
+        """Run the given function by the given arguments in a worker, and wait for its result.
+
+        The function and its arguments should be picklable (e.g., a method of a picklable object).
+        The jobs of the profiled requests run in worker threads, so they're included in the profiles.
+
+        Raises:
+            ScoringQueueFullError: If too many jobs are already waiting for a worker.
+            ScoringTimeoutError: If the job is not done in time.
+            ScoringError: If the worker of the job stops unexpectedly.
+        """
+        if not self._worker_count or is_profiled():
+            return await asyncio.to_thread(run_profiled, function, *args)
+
+        with self._lock:
+            if self._pending_job_count >= self._worker_count + self._max_queue_size:
+                Metrics.increment("scoring_jobs_total", result="rejected")
+                raise ScoringQueueFullError("Too many scoring jobs are waiting.", self._estimate_retry_after())
+            self._pending_job_count += 1
+
+        deadline = time.time() + self._job_timeout if self._job_timeout is not None else None
+        pool = self._get_pool()
+        try:
+            future = pool.submit(run_job, function, args, deadline)
+        except BaseException:
+            self._release_job()
+            raise
+        future.add_done_callback(self._complete_job)
+
+        submission_time = time.perf_counter()
+        try:
+            result, stage_measurements, busy_duration = await asyncio.wait_for(
+                asyncio.wrap_future(future), self._job_timeout
+            )
+        except (asyncio.TimeoutError, ScoringTimeoutError):
+            future.cancel()
+            Metrics.increment("scoring_jobs_total", result="timed_out")
+            raise ScoringTimeoutError(f"Scoring job is not done in {self._job_timeout} seconds.")
+        except BrokenProcessPool:
+            self._replace_pool(pool)
+            Metrics.increment("scoring_jobs_total", result="failed")
+            raise ScoringError("Scoring worker stopped unexpectedly.")
+
+        Metrics.increment("scoring_jobs_total", result="completed")
+        Metrics.observe("scoring_queue_wait_seconds", max(time.perf_counter() - submission_time - busy_duration, 0.0))
+        for stage_measurement in stage_measurements:
+            record_stage(*stage_measurement)
+
+        return result
+
+    def get_statistics(self: ScoringExecutor) -> Dict[str, float]:
+        """Get the number of workers, the busy workers and the queued jobs, and the total busy time of the workers."""
+        with self._lock:
+            pending_job_count = self._pending_job_count
+            busy_duration = self._busy_duration
+
+        busy_worker_count = min(pending_job_count, self._worker_count)
+        return {
+            "workers": self._worker_count,
+            "busy_workers": busy_worker_count,
+            "utilization": busy_worker_count / self._worker_count if self._worker_count else 0.0,
+            "queue_depth": pending_job_count - busy_worker_count,
+            "max_queue_size": self._max_queue_size,
+            "busy_seconds": busy_duration,
+        }
+
+    def _get_pool(self: ScoringExecutor) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # The workers are spawned rather than forked, since forking a process with running threads (e.g.,
+                # of the event loop) is not safe.
+                self._pool = ProcessPoolExecutor(
+                    self._worker_count, multiprocessing.get_context("spawn"), initializer=self._initializer
+                )
+
+            return self._pool
+
+    def _replace_pool(self: ScoringExecutor, broken_pool: ProcessPoolExecutor) -> None:
+        """Replace the given pool, once one of its workers stops unexpectedly (which breaks the whole pool)."""
+        with self._lock:
+            if self._pool is not broken_pool:
+                return
+            self._pool = None
+        broken_pool.shutdown(wait=False, cancel_futures=True)
+
+    def _complete_job(self: ScoringExecutor, future: Future) -> None:
+        busy_duration = 0.0
+        if not future.cancelled() and future.exception() is None:
+            busy_duration = future.result()[2]
+
+        with self._lock:
+            self._pending_job_count -= 1
+            self._completed_job_count += 1
+            self._busy_duration += busy_duration
+
+    def _release_job(self: ScoringExecutor) -> None:
+        with self._lock:
+            self._pending_job_count -= 1
+
+    def _estimate_retry_after(self: ScoringExecutor) -> int:
+        """Estimate the number of seconds until the workers are done with the current jobs (at least one second)."""
+        mean_job_duration = self._busy_duration / self._completed_job_count if self._completed_job_count else 1.0
+        return max(math.ceil(self._pending_job_count * mean_job_duration / self._worker_count), 1)
+
+
+def run_job(
+    function: Callable[..., T], args: Tuple[Any, ...], deadline: Optional[float]
+) -> Tuple[T, List[Tuple[str, str, float]], float]:
+    """Run a job in a worker process, unless its caller stopped waiting for it while it was queued.
+
+    Args:
+        function (Callable[..., T]): The function of the job.
+        args (Tuple[Any, ...]): The arguments of the function.
+        deadline (Optional[float]): The time (since the epoch) after which the caller doesn't wait for the job.
+
+    Returns:
+        Tuple[T, List[Tuple[str, str, float]], float]: The result of the function, the stages measured by it,
+                                                       and the duration of the job in seconds.
+    """
+    if deadline is not None and time.time() > deadline:
+        raise ScoringTimeoutError("Scoring job is expired before it's started.")
+
+    start_time = time.perf_counter()
+    with record_stage_measurements() as stage_measurements:
+        result = function(*args)
+
+    return result, stage_measurements, time.perf_counter() - start_time
+
+
+class ScoringError(Exception):
+    """Raise when a scoring job can not be done."""
+
+    def __init__(self: ScoringError, error_message: str) -> None:
+        super(ScoringError, self).__init__(error_message)
+
+
+class ScoringTimeoutError(ScoringError):
+    """Raise when a scoring job is not done in time."""
+
+
+class ScoringQueueFullError(ScoringError):
+    """Raise when a scoring job is rejected, since too many jobs are already waiting for a worker."""
+
+    def __init__(self: ScoringQueueFullError, error_message: str, retry_after: int) -> None:
+        """
+        Args:
+            error_message (str):
+            retry_after (int): The estimated number of seconds after which a job may be accepted.
+        """
+        super(ScoringQueueFullError, self).__init__(error_message)
+        self.retry_after = retry_after
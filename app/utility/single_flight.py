@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+from app.utility.metrics import Metrics
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """A coalescer of concurrent identical calls, so only one of them is in flight and the rest share its result.
+
+    The first call of a key runs the given function in a task, and the calls of the same key made while the task is
+    running await the same task (and get the same result or error), instead of running the function again.
+    The task is shielded from the cancellation of its callers, so the rest of them still get its result if one of them
+    (e.g., the first caller) is cancelled. Once the task is done, the next call of the key runs the function again.
+    The coalesced calls are counted in the `coalesced_requests_total` counter by the name of the single flight.
+    """
+
+    def __init__(self: SingleFlight, name: str) -> None:
+        """
+        Args:
+            name (str): Name of the coalesced operation (e.g., the endpoint), by which its metrics are labeled.
+        """
+        self._name = name
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+
+    @property
+    def name(self: SingleFlight) -> str:
+        return self._name
+
+    def __len__(self: SingleFlight) -> int:
+        """Number of calls in flight."""
+        return len(self._tasks)
+
+    async def run(self: SingleFlight, key: Hashable, function: Callable[[], Awaitable[T]]) -> T:
+        """Run the given function, or wait for the call of the same key in flight.
+
+        Args:
+            key (Hashable): The key of identical calls (e.g., the normalized URL of the page).
+            function (Callable[[], Awaitable[T]]): The function to be called, if there's no call of the key in flight.
+
+        Returns:
+            T: The result of the call.
+        """
+        task = self._tasks.get(key)
+        # The tasks of another event loop (e.g., of another test client) can't be awaited.
+        if task is not None and task.get_loop() is asyncio.get_running_loop():
+            Metrics.increment("coalesced_requests_total", operation=self._name)
+            return await asyncio.shield(task)
+
+        task = asyncio.ensure_future(function())
+        self._tasks[key] = task
+        task.add_done_callback(lambda done_task: self._remove_task(key, done_task))
+
+        return await asyncio.shield(task)
+
+    def _remove_task(self: SingleFlight, key: Hashable, task: asyncio.Task) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        # The error of a task whose callers are all cancelled is not retrieved otherwise.
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,109 @@
+"""Compare the rule-based analyzer with the spaCy analyzer it follows, by agreement and throughput.
+
+The tables of the rule-based analyzer are built from the first articles of the test corpus, and both analyzers are
+compared on the next (held out) articles:
+- Agreement: the precision, recall and F1 of the terms of the rule-based analyzer against the terms of the spaCy
+  analyzer (as multisets per article), and the mean Jaccard similarity of the term sets of each article.
+- Throughput: input tokens (i.e., whitespace separated words) analyzed per second, by the best of the repeats.
+
+Usage:
+    python -m benchmarks.analyzer_benchmarks --table-sample-size 200 --evaluation-sample-size 100
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from dotenv import load_dotenv
+
+from benchmarks.tfidf_benchmarks import CORPUS_DIRECTORY, read_corpus_contents
+
+
+def calculate_agreement(expected_terms: List[List[str]], terms: List[List[str]]) -> Dict[str, float]:
+    """Calculate the agreement of the given terms of each text with the expected terms of the text."""
+    matched_count = expected_count = count = 0
+    jaccard_similarities = []
+    for text_expected_terms, text_terms in zip(expected_terms, terms):
+        matched_count += sum((Counter(text_expected_terms) & Counter(text_terms)).values())
+        expected_count += len(text_expected_terms)
+        count += len(text_terms)
+
+        expected_term_set, term_set = set(text_expected_terms), set(text_terms)
+        if expected_term_set or term_set:
+            jaccard_similarities.append(len(expected_term_set & term_set) / len(expected_term_set | term_set))
+
+    precision = matched_count / count if count else 1.0
+    recall = matched_count / expected_count if expected_count else 1.0
+    return {
+        "precision": precision,
+        "recall": recall,
+        "f1": 2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+        "jaccard": sum(jaccard_similarities) / len(jaccard_similarities) if jaccard_similarities else 1.0,
+    }
+
+
+def measure_throughput(
+    analyze_batch: Callable[[List[str], int], List[List[str]]], texts: List[str], batch_size: int, repeat: int
+) -> float:
+    """Measure the input tokens (i.e., whitespace separated words) analyzed per second, by the best of the repeats."""
+    token_count = sum(len(text.split()) for text in texts)
+    durations = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        analyze_batch(texts, batch_size)
+        durations.append(time.perf_counter() - start_time)
+
+    return token_count / min(durations)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", type=Path, default=CORPUS_DIRECTORY)
+    parser.add_argument("--model", help="Name of the spaCy model. Defaults to the configured analyzer.")
+    parser.add_argument("--table-sample-size", type=int, default=200, help="Number of articles to build tables by.")
+    parser.add_argument("--evaluation-sample-size", type=int, default=100, help="Number of articles to compare by.")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--repeat", type=int, default=3)
+    arguments = parser.parse_args()
+    load_dotenv(".env")
+
+    from app.services.analysis.analyzer_registry import AnalyzerRegistry
+    from app.services.analysis.rule_based_analyzer import RuleBasedAnalyzer
+    from app.services.analysis.spacy_analyzer import SpacyAnalyzer
+
+    contents = read_corpus_contents(arguments.corpus, arguments.table_sample_size + arguments.evaluation_sample_size)
+    table_sample_size = arguments.table_sample_size
+    table_contents, evaluation_contents = contents[:table_sample_size], contents[table_sample_size:]
+    if not evaluation_contents:
+        parser.error(f"The corpus has no articles beyond the {len(table_contents)} articles to build tables by.")
+
+    spacy_analyzer = SpacyAnalyzer.load(arguments.model or AnalyzerRegistry.get_default_analyzer_name())
+    rule_based_analyzer = RuleBasedAnalyzer.build(spacy_analyzer, table_contents, arguments.batch_size)
+
+    agreement = calculate_agreement(
+        spacy_analyzer.analyze_batch(evaluation_contents, arguments.batch_size),
+        rule_based_analyzer.analyze_batch(evaluation_contents, arguments.batch_size),
+    )
+    print(
+        f"Agreement of the rule-based analyzer with {spacy_analyzer.name} on {len(evaluation_contents)} held out "
+        f"articles (tables by {len(table_contents)} articles):"
+    )
+    for measure, value in agreement.items():
+        print(f"    {measure:<10} {value:.4f}")
+
+    spacy_throughput, rule_based_throughput = [
+        measure_throughput(analyzer.analyze_batch, evaluation_contents, arguments.batch_size, arguments.repeat)
+        for analyzer in (spacy_analyzer, rule_based_analyzer)
+    ]
+    print("Throughput (tokens/sec):")
+    print(f"    {AnalyzerRegistry.SPACY_BACKEND:<12} {spacy_throughput:>12,.0f}")
+    print(f"    {AnalyzerRegistry.RULE_BASED_BACKEND:<12} {rule_based_throughput:>12,.0f}")
+    print(f"    {'speedup':<12} {rule_based_throughput / spacy_throughput:>11.1f}x")
+
+
+if __name__ == "__main__":
+    main()
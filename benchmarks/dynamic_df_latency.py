@@ -0,0 +1,56 @@
+"""Compare the latency of the dynamic DF modes against a running Elastic database.
+
+Usage:
+    python -m benchmarks.dynamic_df_latency --sample-size 20 --repeat 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+from typing import Dict, List
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from app.services.statistics.dynamic_statistics_calculation import DynamicStatisticsCalculation
+
+
+def measure_df_mode_latencies(df_mode: str, contents: List[str], repeat: int) -> List[float]:
+    """Measure the latency (in milliseconds) of calculating TF-IDFs for each content by the given DF mode."""
+    calculation_service = DynamicStatisticsCalculation(df_mode)
+    latencies = []
+    for _ in range(repeat):
+        for content in contents:
+            start_time = time.perf_counter()
+            calculation_service.calculate_term_tf_idfs(content)
+            latencies.append((time.perf_counter() - start_time) * 1000)
+
+    return latencies
+
+
+def summarize_latencies(latencies: List[float]) -> Dict[str, float]:
+    """Summarize the given latencies (in milliseconds) by their median, 95th percentile and mean."""
+    percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {"p50": percentiles[49], "p95": percentiles[94], "mean": statistics.fmean(latencies)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default="data_lake/test/corpus/articles1.csv")
+    parser.add_argument("--sample-size", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    arguments = parser.parse_args()
+
+    load_dotenv(".env")
+    contents = pd.read_csv(arguments.corpus, usecols=["content"]).dropna()["content"].head(arguments.sample_size)
+
+    print(f"{'DF mode':<15}{'p50 (ms)':>12}{'p95 (ms)':>12}{'mean (ms)':>12}")
+    for df_mode in DynamicStatisticsCalculation.DF_MODES:
+        summary = summarize_latencies(measure_df_mode_latencies(df_mode, contents.tolist(), arguments.repeat))
+        print(f"{df_mode:<15}{summary['p50']:>12.1f}{summary['p95']:>12.1f}{summary['mean']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""Offline stand-ins for the benchmarks: an HTTP server of corpus pages and an in-memory Elastic database."""
+
+from __future__ import annotations
+
+import html
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Type
+from urllib import parse
+
+from app.data_storage.elastic_database import ElasticDatabase
+
+# Number of corpus articles in a page of each size.
+PAGE_SIZES: Dict[str, int] = {"small": 1, "medium": 5, "large": 25}
+
+
+def build_page(title: str, contents: List[str]) -> str:
+    """Build an HTML page of the given article contents, along with the usual page noise (e.g., scripts)."""
+    paragraphs = "\n".join(
+        f"      <p>{html.escape(sentence.strip())}.</p>"
+        for content in contents
+        for sentence in content.split(". ")
+        if sentence.strip()
+    )
+
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+  <meta charset="utf-8">
+  <title>{html.escape(title)}</title>
+  <style>body {{ font-family: serif; }}</style>
+  <script>window.dataLayer = [{{"event": "page_view"}}];</script>
+</head>
+<body>
+  <nav><ul><li><a href="/">Home</a></li><li><a href="/news">News</a></li></ul></nav>
+  <article>
+    <h1>{html.escape(title)}</h1>
+{paragraphs}
+  </article>
+  <footer><p>All rights reserved.</p></footer>
+</body>
+</html>
+"""
+
+
+class PageServer:
+    """A local HTTP server of pages built from corpus articles, at `/pages/<page size>/<page number>`.
+
+    Any query string (e.g., a nonce) is ignored by the server, so the same page can be requested by unique URLs.
+    The pages are served with `Cache-Control: no-store` to not be cached by the API.
+    """
+
+    def __init__(self: PageServer, contents: List[str], page_count: int) -> None:
+        """
+        Args:
+            contents (List[str]): The article contents to build the pages from.
+            page_count (int): Number of pages of each size.
+        """
+        self._pages: Dict[str, bytes] = {}
+        for page_size, article_count in PAGE_SIZES.items():
+            for page_number in range(page_count):
+                start = (page_number * article_count) % max(len(contents) - article_count, 1)
+                end = start + article_count
+                page = build_page(f"{page_size} page {page_number}", contents[start:end])
+                self._pages[f"/pages/{page_size}/{page_number}"] = page.encode("utf-8")
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._create_request_handler())
+
+    @property
+    def url(self: PageServer) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def get_page_url(self: PageServer, page_size: str, page_number: int, nonce: Optional[int] = None) -> str:
+        page_url = f"{self.url}/pages/{page_size}/{page_number}"
+        return f"{page_url}?nonce={nonce}" if nonce is not None else page_url
+
+    def get_page(self: PageServer, page_size: str, page_number: int) -> str:
+        return self._pages[f"/pages/{page_size}/{page_number}"].decode("utf-8")
+
+    def __enter__(self: PageServer) -> PageServer:
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self: PageServer, *args: Any) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _create_request_handler(self: PageServer) -> Type[BaseHTTPRequestHandler]:
+        pages = self._pages
+
+        class PageRequestHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:
+                page = pages.get(parse.urlsplit(self.path).path)
+                if page is None:
+                    self.send_error(404)
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(page)))
+                self.send_header("Cache-Control", "no-store")
+                self.end_headers()
+                self.wfile.write(page)
+
+            def log_message(self, *args: object) -> None:
+                pass
+
+        return PageRequestHandler
+
+
+class StubElasticDatabase:
+    """An in-memory stand-in of the Elastic database calls made by the dynamic calculation.
+
+    The articles are analyzed by a simple approximation of the index analyzer (i.e., lowercase letter tokens without
+    English stop words) into an inverted index. An optional latency is added to each call to simulate the network.
+    """
+
+    STOP_WORDS = frozenset(
+        "a an and are as at be but by for if in into is it no not of on or such that the their then there these they "
+        "this to was will with has have".split()
+    )
+    TOKEN_PATTERN = re.compile(r"[^\W\d_]+")
+
+    def __init__(self: StubElasticDatabase, contents: List[str], latency: float = 0.0) -> None:
+        """
+        Args:
+            contents (List[str]): Contents of the articles in the index.
+            latency (float): Number of seconds to be added to each call.
+        """
+        self._latency = latency
+        self._term_dfs: Counter = Counter()
+        for content in contents:
+            self._term_dfs.update(set(self.analyze(content)))
+        self._article_count = len(contents)
+        self._original_methods: Dict[str, Any] = {}
+
+    def analyze(self: StubElasticDatabase, text: str) -> List[str]:
+        return [
+            token
+            for token in self.TOKEN_PATTERN.findall(text.lower())
+            if len(token) > 1 and token not in self.STOP_WORDS
+        ]
+
+    def __enter__(self: StubElasticDatabase) -> StubElasticDatabase:
+        """Replace the calls of the Elastic database by the calls of the stub."""
+        for method_name in ("get_term_vectors", "search", "multi_search", "count", "get_index_stats"):
+            self._original_methods[method_name] = ElasticDatabase.__dict__[method_name]
+            setattr(ElasticDatabase, method_name, classmethod(self._create_method(getattr(self, method_name))))
+        return self
+
+    def __exit__(self: StubElasticDatabase, *args: Any) -> None:
+        for method_name, original_method in self._original_methods.items():
+            setattr(ElasticDatabase, method_name, original_method)
+
+    def get_term_vectors(
+        self: StubElasticDatabase, index: str, doc: dict, fields: List[str], **options: Any
+    ) -> SimpleNamespace:
+        term_tfs = Counter(self.analyze(doc[fields[0]]))
+        terms = {term: {"term_freq": term_tf} for term, term_tf in term_tfs.items()}
+        term_vectors: Dict[str, Any] = {"terms": terms}
+        if options.get("term_statistics"):
+            for term, term_statistics in terms.items():
+                term_statistics["doc_freq"] = self._term_dfs[term]
+        if options.get("field_statistics"):
+            term_vectors["field_statistics"] = {"doc_count": self._article_count}
+
+        return SimpleNamespace(body={"term_vectors": {fields[0]: term_vectors}})
+
+    def search(self: StubElasticDatabase, index: str, body: dict) -> Dict[str, Any]:
+        term_filters = body.get("aggs", {}).get("term_counts", {}).get("filters", {}).get("filters", {})
+        return {
+            "hits": {"total": {"value": self._article_count}},
+            "aggregations": {
+                "term_counts": {"buckets": {term: {"doc_count": self._term_dfs[term]} for term in term_filters}}
+            },
+        }
+
+    def multi_search(self: StubElasticDatabase, index: str, queries: List[Dict[Any, Any]]) -> Dict[str, Any]:
+        searches = queries[1::2]
+        return {
+            "responses": [
+                {"hits": {"total": self._term_dfs[search["query"]["multi_match"]["query"]], "hits": []}}
+                for search in searches
+            ]
+        }
+
+    def count(self: StubElasticDatabase, index: str, query: Optional[dict] = None) -> Dict[str, Any]:
+        return {"count": self._article_count}
+
+    def get_index_stats(self: StubElasticDatabase, index: str, metrics: List[str]) -> Dict[str, Any]:
+        return {
+            "_all": {
+                "primaries": {"docs": {"count": self._article_count}, "refresh": {"total": 1, "external_total": 1}}
+            }
+        }
+
+    def _create_method(self: StubElasticDatabase, stub_method: Any) -> Any:
+        def method(cls: Any, *args: Any, **kwargs: Any) -> Any:
+            if self._latency:
+                time.sleep(self._latency)
+            return stub_method(*args, **kwargs)
+
+        return method
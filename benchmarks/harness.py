@@ -0,0 +1,172 @@
+"""Measurement utilities shared by the benchmarks: latency percentiles, throughput, peak RSS and baselines."""
+
+from __future__ import annotations
+
+import json
+import resource
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from benchmarks.dynamic_df_latency import summarize_latencies
+
+BASELINE_DIRECTORY = Path(__file__).parent / "baselines"
+
+
+@dataclass(frozen=True)
+class BenchmarkResult:
+    """The measurements of a benchmark case (i.e., a benchmark on inputs of a page size)."""
+
+    name: str
+    page_size: str
+    sample_count: int
+    p50: float
+    p95: float
+    mean: float
+    throughput: float
+    peak_rss: float
+
+    @property
+    def key(self: BenchmarkResult) -> str:
+        return f"{self.name}[{self.page_size}]"
+
+
+class PeakMemorySampler:
+    """A sampler of the peak RSS (resident set size) of the process while a benchmark case runs.
+
+    The RSS is sampled from `/proc` in a background thread. Where it isn't available, the peak RSS of the whole process
+    lifetime is reported instead.
+    """
+
+    STATUS_PATH = Path("/proc/self/status")
+
+    def __init__(self: PeakMemorySampler, interval: float = 0.005) -> None:
+        """
+        Args:
+            interval (float): Number of seconds between two samples.
+        """
+        self._interval = interval
+        self._peak_rss = 0
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def __enter__(self: PeakMemorySampler) -> PeakMemorySampler:
+        if self.STATUS_PATH.exists():
+            self._thread.start()
+        return self
+
+    def __exit__(self: PeakMemorySampler, *args: Any) -> None:
+        self._stopped.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    @property
+    def peak_rss(self: PeakMemorySampler) -> float:
+        """The peak RSS in megabytes."""
+        if self._peak_rss:
+            return self._peak_rss / 1024
+        # The maximum RSS is in kilobytes on Linux and in bytes on macOS.
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return max_rss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+    def _sample(self: PeakMemorySampler) -> None:
+        while True:
+            self._peak_rss = max(self._peak_rss, self._read_rss())
+            if self._stopped.wait(self._interval):
+                break
+
+    def _read_rss(self: PeakMemorySampler) -> int:
+        """Read the current RSS in kilobytes."""
+        with open(self.STATUS_PATH) as status_file:
+            for line in status_file:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+        return 0
+
+
+def run_benchmark(
+    name: str,
+    page_size: str,
+    function: Callable[[Any], Any],
+    inputs: Sequence[Any],
+    repeat: int = 3,
+    warmup_count: int = 1,
+) -> BenchmarkResult:
+    """Measure the latency of calling the given function by each of the given inputs.
+
+    Args:
+        name (str): Name of the benchmark.
+        page_size (str): Name of the page size of the inputs.
+        function (Callable[[Any], Any]): The function to be measured.
+        inputs (Sequence[Any]): The inputs to call the function by, once per repeat.
+        repeat (int): Number of times to call the function by all the inputs.
+        warmup_count (int): Number of unmeasured calls before the measurement.
+
+    Returns:
+        BenchmarkResult:
+    """
+    for warmup_input in list(inputs)[:warmup_count]:
+        function(warmup_input)
+
+    latencies = []
+    with PeakMemorySampler() as memory_sampler:
+        start_time = time.perf_counter()
+        for _ in range(repeat):
+            for benchmark_input in inputs:
+                call_start_time = time.perf_counter()
+                function(benchmark_input)
+                latencies.append((time.perf_counter() - call_start_time) * 1000)
+        elapsed_time = time.perf_counter() - start_time
+
+    return BenchmarkResult(
+        name=name,
+        page_size=page_size,
+        sample_count=len(latencies),
+        throughput=len(latencies) / elapsed_time,
+        peak_rss=memory_sampler.peak_rss,
+        **summarize_latencies(latencies),
+    )
+
+
+def print_results(results: List[BenchmarkResult], baseline: Optional[Dict[str, BenchmarkResult]] = None) -> None:
+    """Print the given results as a table, including the change of p50 and p95 from the baseline if given."""
+    header = f"{'benchmark':<32}{'page':>8}{'p50 (ms)':>11}{'p95 (ms)':>11}{'ops/sec':>11}{'peak RSS (MB)':>15}"
+    print(header + (f"{'Δp50':>9}{'Δp95':>9}" if baseline else ""))
+    for result in results:
+        line = (
+            f"{result.name:<32}{result.page_size:>8}{result.p50:>11.2f}{result.p95:>11.2f}"
+            f"{result.throughput:>11.1f}{result.peak_rss:>15.1f}"
+        )
+        baseline_result = baseline.get(result.key) if baseline else None
+        if baseline_result:
+            line += f"{format_change(baseline_result.p50, result.p50):>9}{format_change(baseline_result.p95, result.p95):>9}"
+        print(line)
+
+
+def format_change(baseline_value: float, value: float) -> str:
+    return f"{(value - baseline_value) / baseline_value * 100:+.0f}%" if baseline_value else "n/a"
+
+
+def save_baseline(name: str, results: List[BenchmarkResult], metadata: Dict[str, Any]) -> Path:
+    """Save the given results as a named baseline to be compared with later.
+
+    Returns:
+        Path: Path to the baseline file.
+    """
+    BASELINE_DIRECTORY.mkdir(exist_ok=True)
+    baseline_path = BASELINE_DIRECTORY / f"{name}.json"
+    with open(baseline_path, "w") as baseline_file:
+        json.dump({"metadata": metadata, "results": [asdict(result) for result in results]}, baseline_file, indent=2)
+
+    return baseline_path
+
+
+def load_baseline(name: str) -> Dict[str, BenchmarkResult]:
+    """Load the results of the named baseline by their keys."""
+    with open(BASELINE_DIRECTORY / f"{name}.json") as baseline_file:
+        results = [BenchmarkResult(**result) for result in json.load(baseline_file)["results"]]
+
+    return {result.key: result for result in results}
@@ -0,0 +1,146 @@
+"""Compare the approximate DFs of a term sketch with the exact DFs, by their errors and the top-k terms they rank.
+
+The DFs of the articles of the test corpus are counted both exactly and by a term sketch, which is counted in
+partitions and merged (as the ETL does), with the heavy hitters selected from the first articles. Then:
+- DF error: the overestimation of the DFs of the terms in the sketch (i.e., except the heavy hitters) against their
+  error bound, which they may exceed with a probability of at most delta.
+- Size: the size of the exact term statistics store against the size of the sketch (i.e., its counters and its
+  heavy hitter table), both as they're memory-mapped by the API.
+- Top-k agreement: the precision of the top k terms of each article ranked by the TF-IDFs of the approximate DFs
+  against the top k terms ranked by the exact DFs, and the fraction of articles whose top k terms are identical
+  (in the same order).
+
+Usage:
+    python -m benchmarks.term_sketch_benchmarks --epsilon 0.0001 --heavy-hitter-count 1000
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+import numpy as np
+from dotenv import load_dotenv
+
+from benchmarks.tfidf_benchmarks import CORPUS_DIRECTORY, read_corpus_contents
+
+
+def get_directory_size(directory: Path) -> int:
+    return sum(file_path.stat().st_size for file_path in directory.rglob("*") if file_path.is_file())
+
+
+def calculate_top_k_agreement(
+    expected_rankings: List[List[str]], rankings: List[List[str]], k_values: Sequence[int]
+) -> Dict[int, Dict[str, float]]:
+    """Calculate the precision and the identical fraction of the top k terms of each ranking for each given k."""
+    agreement = {}
+    for k in k_values:
+        precisions = []
+        identical_count = 0
+        for expected_ranking, ranking in zip(expected_rankings, rankings):
+            expected_terms, terms = expected_ranking[:k], ranking[:k]
+            if expected_terms:
+                precisions.append(len(set(expected_terms) & set(terms)) / len(expected_terms))
+            identical_count += expected_terms == terms
+        agreement[k] = {
+            "precision": sum(precisions) / len(precisions) if precisions else 1.0,
+            "identical": identical_count / len(expected_rankings) if expected_rankings else 1.0,
+        }
+
+    return agreement
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", type=Path, default=CORPUS_DIRECTORY)
+    parser.add_argument("--article-count", type=int, default=100000, help="Maximum number of articles to count.")
+    parser.add_argument("--epsilon", type=float, default=1e-4)
+    parser.add_argument("--delta", type=float, default=0.01)
+    parser.add_argument("--heavy-hitter-count", type=int, default=1000)
+    parser.add_argument("--heavy-hitter-sample-size", type=int, default=100, help="Number of articles to select by.")
+    parser.add_argument("--partition-count", type=int, default=4, help="Number of partition sketches to merge.")
+    parser.add_argument("--top-k", type=int, nargs="+", default=[5, 10, 20])
+    parser.add_argument("--batch-size", type=int, default=32)
+    arguments = parser.parse_args()
+    load_dotenv(".env")
+
+    from app.data_storage.term_sketch import TermSketch, TermSketchStore
+    from app.data_storage.term_statistics_store import TermStatisticsStore
+    from app.services.statistics.static_statistics_calculation import StaticStatisticsCalculation
+    from app.services.statistics.term_scores import TermScores, calculate_tf_idfs
+
+    contents = read_corpus_contents(arguments.corpus, arguments.article_count)
+    statistics_calculation = StaticStatisticsCalculation()
+    article_term_tfs = [
+        Counter(terms) for terms in statistics_calculation.tokenize_batch(contents, arguments.batch_size)
+    ]
+
+    term_dfs: Counter = Counter()
+    for term_tfs in article_term_tfs:
+        term_dfs.update(term_tfs.keys())
+
+    sample_term_dfs: Counter = Counter()
+    for term_tfs in article_term_tfs[: arguments.heavy_hitter_sample_size]:
+        sample_term_dfs.update(term_tfs.keys())
+    heavy_hitters = [term for term, _ in sample_term_dfs.most_common(arguments.heavy_hitter_count)]
+
+    term_sketch = TermSketch.create(arguments.epsilon, arguments.delta, heavy_hitters)
+    partition_size = -(-len(article_term_tfs) // arguments.partition_count)
+    for partition_start in range(0, len(article_term_tfs), partition_size):
+        partition_end = partition_start + partition_size
+        partition_term_tfs = article_term_tfs[partition_start:partition_end]
+        partition_term_dfs: Counter = Counter()
+        for term_tfs in partition_term_tfs:
+            partition_term_dfs.update(term_tfs.keys())
+        partition_term_sketch = TermSketch.create(arguments.epsilon, arguments.delta, heavy_hitters)
+        partition_term_sketch.add(partition_term_dfs, len(partition_term_tfs))
+        term_sketch.merge(partition_term_sketch)
+
+    with tempfile.TemporaryDirectory() as directory:
+        exact_store = TermStatisticsStore.build(
+            Path(directory) / "exact", term_dfs.keys(), term_dfs.values(), len(article_term_tfs)
+        )
+        sketch_store = TermSketchStore.build(Path(directory) / "sketch", term_sketch)
+
+        sketch_terms = [term for term in term_dfs if term not in term_sketch.heavy_hitter_dfs]
+        errors = sketch_store.lookup(sketch_terms) - np.array([term_dfs[term] for term in sketch_terms], dtype=np.int64)
+
+        expected_rankings: List[List[str]] = []
+        rankings: List[List[str]] = []
+        for term_tfs in article_term_tfs:
+            terms = list(term_tfs)
+            tfs = np.fromiter(term_tfs.values(), dtype=np.int64, count=len(term_tfs))
+            for statistics, article_rankings in ((exact_store, expected_rankings), (sketch_store, rankings)):
+                term_scores = TermScores.create(
+                    terms,
+                    calculate_tf_idfs(
+                        tfs, statistics.lookup_idfs(terms), StaticStatisticsCalculation.TF_IDF_DECIMAL_PLACE_COUNT
+                    ),
+                )
+                article_rankings.append([term["term"] for term in term_scores.rank(max(arguments.top_k))])
+
+        print(
+            f"Term sketch of {sketch_store.article_count} articles in {arguments.partition_count} merged partitions "
+            f"({term_sketch.counters.shape[0]} x {term_sketch.counters.shape[1]} counters, "
+            f"{len(heavy_hitters)} heavy hitters selected from {arguments.heavy_hitter_sample_size} articles):"
+        )
+        print(f"    {'terms':<24} {len(term_dfs):>12,}")
+        print(f"    {'exact store bytes':<24} {get_directory_size(exact_store.directory):>12,}")
+        print(f"    {'sketch store bytes':<24} {get_directory_size(sketch_store.directory):>12,}")
+        print("DF error of the terms in the sketch:")
+        print(f"    {'error bound':<24} {sketch_store.error_bound:>12.1f}")
+        if len(errors):
+            print(f"    {'mean error':<24} {errors.mean():>12.3f}")
+            print(f"    {'max error':<24} {errors.max():>12}")
+            print(f"    {'exact fraction':<24} {np.mean(errors == 0):>12.4f}")
+            print(f"    {'over bound fraction':<24} {np.mean(errors > sketch_store.error_bound):>12.4f}")
+        print(f"Top-k agreement with the exact DFs on {len(article_term_tfs)} articles:")
+        for k, agreement in calculate_top_k_agreement(expected_rankings, rankings, arguments.top_k).items():
+            print(f"    top-{k:<4} precision {agreement['precision']:.4f}    identical {agreement['identical']:.4f}")
+
+
+if __name__ == "__main__":
+    main()
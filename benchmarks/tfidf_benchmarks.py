@@ -0,0 +1,184 @@
+"""Benchmark the static and dynamic TF-IDF paths offline, across page sizes.
+
+The pages are built from the test corpus and served by a local HTTP server, and the Elastic database is replaced by
+an in-memory stand-in, so neither the internet nor a running Elastic database is needed.
+The result cache is disabled (unless `--result-cache` is given), so every call measures the calculation itself.
+
+Usage:
+    python -m benchmarks.tfidf_benchmarks --save-baseline main
+    python -m benchmarks.tfidf_benchmarks --compare main --benchmark static
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import platform
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from benchmarks.fixtures import PAGE_SIZES, PageServer, StubElasticDatabase
+from benchmarks.harness import BenchmarkResult, load_baseline, print_results, run_benchmark, save_baseline
+
+CORPUS_DIRECTORY = Path("data_lake/test/corpus")
+
+# A benchmark is a name and a function of the benchmark inputs of a page size, by which it's measured.
+Benchmark = Tuple[str, Callable[[Any], Any], Callable[[str], Sequence[Any]]]
+
+
+def read_corpus_contents(corpus_directory: Path, sample_size: int) -> List[str]:
+    """Read contents of the first articles in the CSV files of the given corpus directory."""
+    contents = pd.concat(
+        pd.read_csv(corpus_file, usecols=["content"]) for corpus_file in sorted(corpus_directory.glob("*.csv"))
+    )["content"].dropna()
+
+    return contents.head(sample_size).tolist()
+
+
+def create_micro_benchmarks(page_contents: Dict[str, List[str]], limit: int) -> List[Benchmark]:
+    """Create the benchmarks of the calculation steps, called by the extracted contents of the pages."""
+    # The app modules are imported here, so the environment is set up before they're loaded.
+    from app.repositories.article_repository import ArticleRepository
+    from app.services.statistics.dynamic_statistics_calculation import DynamicStatisticsCalculation
+    from app.services.statistics.static_statistics_calculation import StaticStatisticsCalculation
+
+    article_repository = ArticleRepository()
+    static_calculation = StaticStatisticsCalculation()
+    dynamic_calculation = DynamicStatisticsCalculation(DynamicStatisticsCalculation.EXACT_DF_MODE)
+    page_terms = {
+        page_size: static_calculation.tokenize_batch(contents) for page_size, contents in page_contents.items()
+    }
+
+    def get_contents(page_size: str) -> List[str]:
+        return page_contents[page_size]
+
+    def get_terms(page_size: str) -> List[List[str]]:
+        return [list(dict.fromkeys(terms)) for terms in page_terms[page_size]]
+
+    return [
+        ("static.tokenize", static_calculation.tokenize, get_contents),
+        ("static.calculate_term_tfs", static_calculation.calculate_term_tfs, get_contents),
+        ("static.df_lookup", lambda terms: article_repository.get_static_term_statistics().lookup(terms), get_terms),
+        (
+            "static.get_terms_with_highest_tf_idf",
+            lambda content: static_calculation.get_terms_with_highest_tf_idf(content, limit),
+            get_contents,
+        ),
+        ("dynamic.calculate_term_tfs", dynamic_calculation.calculate_term_tfs, get_contents),
+        ("dynamic.df_lookup", lambda terms: article_repository.count_articles_by_terms(terms, "content"), get_terms),
+        (
+            "dynamic.get_terms_with_highest_tf_idf",
+            lambda content: dynamic_calculation.get_terms_with_highest_tf_idf(content, limit),
+            get_contents,
+        ),
+    ]
+
+
+def create_end_to_end_benchmarks(client: Any, page_server: PageServer, page_count: int, limit: int) -> List[Benchmark]:
+    """Create the benchmarks of the `/tfidf` endpoint, called by the URLs of the served pages."""
+    nonces = iter(range(1 << 62))
+
+    def get_pages(page_size: str) -> List[Tuple[str, int]]:
+        return [(page_size, page_number) for page_number in range(page_count)]
+
+    def create_request(dynamic: bool) -> Callable[[Tuple[str, int]], Any]:
+        def request(page: Tuple[str, int]) -> Any:
+            # Each request is by a unique URL, so the page is fetched and extracted every time.
+            page_url = page_server.get_page_url(*page, nonce=next(nonces))
+            response = client.get("/tfidf", params={"url": page_url, "limit": limit, "dynamic": dynamic})
+            response.raise_for_status()
+            return response
+
+        return request
+
+    return [(f"api.tfidf[{mode}]", create_request(mode == "dynamic"), get_pages) for mode in ("static", "dynamic")]
+
+
+def run_benchmarks(benchmarks: List[Benchmark], benchmark_filter: Optional[str], repeat: int) -> List[BenchmarkResult]:
+    """Run the benchmarks whose name includes the given filter, by the inputs of each page size."""
+    results = []
+    for name, function, get_inputs in benchmarks:
+        if benchmark_filter and benchmark_filter not in name:
+            continue
+        for page_size in PAGE_SIZES:
+            results.append(run_benchmark(name, page_size, function, get_inputs(page_size), repeat))
+            print_results(results[-1:])
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", type=Path, default=CORPUS_DIRECTORY)
+    parser.add_argument("--sample-size", type=int, default=200, help="Number of corpus articles to build pages from.")
+    parser.add_argument("--page-count", type=int, default=5, help="Number of pages of each size.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--elastic-latency", type=float, default=0.0, help="Seconds added to each Elastic call.")
+    parser.add_argument("--benchmark", help="Only run the benchmarks whose name includes this filter.")
+    parser.add_argument("--skip-end-to-end", action="store_true")
+    parser.add_argument("--result-cache", action="store_true", help="Keep the result cache of ranked terms enabled.")
+    parser.add_argument("--save-baseline", help="Save the results as a baseline by this name.")
+    parser.add_argument("--compare", help="Compare the results with the baseline by this name.")
+    arguments = parser.parse_args()
+
+    if not arguments.result_cache:
+        os.environ["RESULT_CACHE_MAX_SIZE"] = "0"
+    # The pages are served with no-store, but the page content cache is kept apart from the API one anyway.
+    os.environ.setdefault("PAGE_CONTENT_CACHE_PATH", "data_lake/cache/benchmark_page_content")
+    load_dotenv(".env")
+
+    from app.utility.data_extraction import extract_content_from_html
+
+    contents = read_corpus_contents(arguments.corpus, arguments.sample_size)
+    page_server = PageServer(contents, arguments.page_count)
+    page_contents = {
+        page_size: [
+            extract_content_from_html(page_server.get_page(page_size, page_number))
+            for page_number in range(arguments.page_count)
+        ]
+        for page_size in PAGE_SIZES
+    }
+
+    results = []
+    with StubElasticDatabase(contents, arguments.elastic_latency), page_server:
+        results.extend(
+            run_benchmarks(
+                create_micro_benchmarks(page_contents, arguments.limit), arguments.benchmark, arguments.repeat
+            )
+        )
+
+        if not arguments.skip_end_to_end:
+            from fastapi.testclient import TestClient
+
+            from app.main import app
+
+            with TestClient(app) as client:
+                results.extend(
+                    run_benchmarks(
+                        create_end_to_end_benchmarks(client, page_server, arguments.page_count, arguments.limit),
+                        arguments.benchmark,
+                        arguments.repeat,
+                    )
+                )
+
+    print()
+    print_results(results, load_baseline(arguments.compare) if arguments.compare else None)
+
+    if arguments.save_baseline:
+        metadata = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            **{key: value for key, value in vars(arguments).items() if key in ("sample_size", "page_count", "repeat")},
+            "elastic_latency": arguments.elastic_latency,
+            "result_cache": arguments.result_cache,
+        }
+        print(f"Saved the baseline to {save_baseline(arguments.save_baseline, results, metadata)}.")
+
+
+if __name__ == "__main__":
+    main()
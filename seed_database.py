@@ -1,3 +1,5 @@
+import argparse
+
 from dotenv import load_dotenv
 
 from app.services.etl.article_etl import ArticleETL
@@ -6,4 +8,14 @@ load_dotenv(".env")
 
 
 if __name__ == "__main__":
-    ArticleETL().run()
+    parser = argparse.ArgumentParser(description="Seed the database and the data lake with the corpus articles.")
+    parser.add_argument("--reset-data", action="store_true", help="Reset the articles in the data storages.")
+    parser.add_argument("--reset-statistics", action="store_true", help="Recalculate all the article statistics.")
+    parser.add_argument(
+        "--incremental-statistics",
+        action="store_true",
+        help="Add the statistics of only the articles which are new in the corpus.",
+    )
+    arguments = parser.parse_args()
+
+    ArticleETL(arguments.reset_data, arguments.reset_statistics, arguments.incremental_statistics).run()